@@ -0,0 +1,318 @@
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks run on the SDL dummy drivers, so no display or sound is needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from fps_game import FPSGame, InputFrame, REFERENCE_RATE, TILE_SIZE
+from raycaster import camera_path
+from tilemap import TileMap
+
+# name: enemies, bullets, map size in tiles (None for the built-in map),
+# player shots per second
+SCENARIOS = {
+    'default': {'enemies': 10, 'bullets': 20, 'map_size': None, 'fire_rate': 5},
+    'horde': {'enemies': 300, 'bullets': 200, 'map_size': (64, 64), 'fire_rate': 10},
+    'bullet_storm': {'enemies': 50, 'bullets': 1000, 'map_size': None, 'fire_rate': 30},
+    'large_map': {'enemies': 100, 'bullets': 100, 'map_size': (1000, 1000), 'fire_rate': 5},
+    'projectile_storm': {'enemies': 300, 'bullets': 20000, 'map_size': (128, 128), 'fire_rate': 30},
+}
+
+SECTIONS = ('update_enemies', 'update_bullets', 'check_bullet_collisions', 'line_of_sight',
+            'spawn_enemy', 'draw_map', 'draw_entities', 'draw_hud', 'frame', 'raycast', 'first_person')
+
+# Frames in the fixed camera path of the first-person sections
+CAMERA_PATH_FRAMES = 240
+
+# Fresh game processes launched to time startup, when timing everything
+STARTUP_RUNS = 5
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fps_game.py')
+
+DEFAULT_THRESHOLD = 0.10
+# Slowdowns smaller than this are timer noise, whatever their ratio
+DEFAULT_MIN_DELTA_MS = 0.01
+
+
+class Scenario:
+    """A game held at a steady enemy and bullet count for timing"""
+    def __init__(self, name, enemies, bullets, map_size=None, fire_rate=5, seed=1):
+        self.name = name
+        self.params = {'enemies': enemies, 'bullets': bullets,
+                       'map_size': list(map_size) if map_size else None, 'fire_rate': fire_rate}
+        self.enemy_target = enemies
+        self.bullet_target = bullets
+        self.rng = random.Random(seed)
+        
+        map_path = None
+        if map_size:
+            handle, map_path = tempfile.mkstemp(suffix='.tmap')
+            os.close(handle)
+            TileMap.generate(*map_size, seed=seed, tile_size=TILE_SIZE).save(map_path)
+        try:
+            self.game = FPSGame('soldier', map_path=map_path, seed=seed)
+        finally:
+            if map_path:
+                os.remove(map_path)
+        
+        game = self.game
+        game.player.health = game.player.max_health = 10 ** 9
+        game.max_enemies = enemies
+        game.fire_interval = max(1, round(REFERENCE_RATE / fire_rate)) - 1 if fire_rate else 10 ** 9
+        game.enemies.clear()
+        game.camera.follow(game.player.x, game.player.y)
+        self.inputs = InputFrame(up=True, mouse_dx=4, fire=fire_rate > 0, reload=True)
+        
+        # First-person sections follow the same path on every run: a full
+        # turn while circling the player's starting point
+        self.camera_path = camera_path(game.map_data, game.player.x, game.player.y, CAMERA_PATH_FRAMES)
+        self.camera_frame = 0
+        
+        # Entities are scattered over a two-screen area around the player
+        # so that collisions and drawing see a busy fight
+        world_w = game.map_data.pixel_width
+        world_h = game.map_data.pixel_height
+        self.area = (max(0, game.camera.x - game.camera.view_width // 2),
+                     max(0, game.camera.y - game.camera.view_height // 2),
+                     min(world_w, game.camera.x + game.camera.view_width * 3 // 2),
+                     min(world_h, game.camera.y + game.camera.view_height * 3 // 2))
+        self.refill()
+    
+    def next_pose(self):
+        x, y, angle = self.camera_path[self.camera_frame % len(self.camera_path)]
+        self.camera_frame += 1
+        return x, y, angle
+    
+    def random_point(self):
+        left, top, right, bottom = self.area
+        for _ in range(50):
+            x = self.rng.uniform(left, right)
+            y = self.rng.uniform(top, bottom)
+            if not self.game.map_data.is_wall_at(x, y):
+                return x, y
+        return x, y
+    
+    def refill(self):
+        """Top enemies and bullets back up to the scenario's counts"""
+        game = self.game
+        for _ in range(self.enemy_target - game.enemies.alive_count()):
+            game.enemies.spawn(*self.random_point())
+        game.enemies.remove_dead()
+        for _ in range(self.bullet_target - game.bullets.count):
+            x, y = self.random_point()
+            game.bullets.spawn(x, y, self.rng.uniform(0, 2 * np.pi), 'player')
+    
+    def time_section(self, section):
+        """Seconds taken by one call of a section"""
+        game = self.game
+        if section == 'update_enemies':
+            start = time.perf_counter()
+            game.update_enemies()
+        elif section == 'update_bullets':
+            start = time.perf_counter()
+            game.bullets.update()
+        elif section == 'check_bullet_collisions':
+            start = time.perf_counter()
+            game.check_bullet_collisions()
+        elif section == 'line_of_sight':
+            # Worst case: every enemy checks its line to the player at once
+            n = game.enemies.count
+            start = time.perf_counter()
+            game.line_of_sight.can_see(game.enemies.x[:n], game.enemies.y[:n], game.player.x, game.player.y)
+        elif section == 'spawn_enemy':
+            start = time.perf_counter()
+            game.spawn_enemy()
+            elapsed = time.perf_counter() - start
+            game.enemies.release(game.enemies.count - 1)
+            return elapsed
+        elif section == 'draw_map':
+            start = time.perf_counter()
+            game.draw_map()
+        elif section == 'draw_entities':
+            start = time.perf_counter()
+            game.draw_enemies()
+            game.draw_player()
+            game.draw_bullets()
+        elif section == 'draw_hud':
+            start = time.perf_counter()
+            game.draw_hud()
+        elif section == 'frame':
+            start = time.perf_counter()
+            game.step(self.inputs)
+            game.render()
+        elif section == 'raycast':
+            x, y, angle = self.next_pose()
+            start = time.perf_counter()
+            game.raycaster.cast(x, y, angle)
+        elif section == 'first_person':
+            # The view is rendered from the path, not the moving player
+            x, y, angle = self.next_pose()
+            start = time.perf_counter()
+            game.raycaster.render(game.screen, x, y, angle, game.billboards())
+            game.draw_hud()
+            pygame.display.flip()
+        else:
+            raise ValueError(f"unknown section {section!r}")
+        return time.perf_counter() - start
+    
+    def run(self, iterations=200, warmup=20, sections=SECTIONS):
+        timings = {}
+        for section in sections:
+            samples = []
+            for i in range(warmup + iterations):
+                self.refill()
+                elapsed = self.time_section(section)
+                if i >= warmup:
+                    samples.append(elapsed * 1000)
+            timings[section] = summarize(samples)
+        return {'params': self.params, 'timings': timings}
+
+
+def measure_startup(runs):
+    """Launch the game runs times with --startup-probe and summarize its
+    startup timings, in the same shape as a scenario's results"""
+    samples = {}
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    for _ in range(runs):
+        probe = subprocess.run([sys.executable, GAME_SCRIPT, '--startup-probe'],
+                               capture_output=True, text=True, env=env, check=True)
+        for name, ms in json.loads(probe.stdout.splitlines()[-1]).items():
+            samples.setdefault(name, []).append(ms)
+    return {'params': {'runs': runs}, 'timings': {name: summarize(values) for name, values in samples.items()}}
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'mean_ms': statistics.fmean(ordered),
+        'median_ms': statistics.median(ordered),
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'min_ms': ordered[0],
+        'samples': len(ordered),
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'video_driver': os.environ.get('SDL_VIDEODRIVER'),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def is_regression(before, after, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA_MS):
+    return after > before * (1 + threshold) and after - before > min_delta
+    
+    
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA_MS, metric='median_ms'):
+    """Compare two result sets section by section.
+    
+    Returns (scenario, section, baseline, current, ratio) tuples for every
+    section present in both runs, and the subset that regressed.
+    """
+    rows = []
+    for name, scenario in results['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        for section, timing in scenario['timings'].items():
+            old_timing = old['timings'].get(section)
+            if old_timing is None:
+                continue
+            before = old_timing[metric]
+            after = timing[metric]
+            ratio = after / before if before > 0 else 1.0
+            rows.append((name, section, before, after, ratio))
+    regressions = [row for row in rows if is_regression(row[2], row[3], threshold, min_delta)]
+    return rows, regressions
+
+
+def print_results(results):
+    for name, scenario in results['scenarios'].items():
+        print(f"{name} {scenario['params']}")
+        for section, timing in scenario['timings'].items():
+            print(f"  {section:<24} median {timing['median_ms']:8.3f} ms"
+                  f"   p95 {timing['p95_ms']:8.3f} ms")
+
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Time the game's update and draw paths")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument('--enemies', type=int, help="run a custom scenario with this many enemies")
+    parser.add_argument('--bullets', type=int, default=100)
+    parser.add_argument('--map-size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--fire-rate', type=float, default=5, help="player shots per second")
+    parser.add_argument('--section', action='append', choices=SECTIONS, help="section to time (repeatable)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--startup-runs', type=int,
+                        help=f"game launches to time startup over (default: {STARTUP_RUNS} when timing "
+                             f"everything, otherwise 0)")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a section counts as a regression (0.1 = 10%%)")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args(argv)
+    
+    if args.enemies is not None:
+        scenarios = {'custom': {'enemies': args.enemies, 'bullets': args.bullets,
+                                'map_size': args.map_size, 'fire_rate': args.fire_rate}}
+    else:
+        names = args.scenario or list(SCENARIOS)
+        scenarios = {name: SCENARIOS[name] for name in names}
+    sections = args.section or SECTIONS
+    startup_runs = args.startup_runs
+    if startup_runs is None:
+        everything = args.enemies is None and not args.scenario and not args.section
+        startup_runs = STARTUP_RUNS if everything else 0
+    
+    results = {'environment': environment(), 'iterations': args.iterations, 'scenarios': {}}
+    # Startup is reported and compared like a scenario of its own
+    if startup_runs:
+        results['scenarios']['startup'] = measure_startup(startup_runs)
+    for name, params in scenarios.items():
+        scenario = Scenario(name, seed=args.seed, **params)
+        results['scenarios'][name] = scenario.run(args.iterations, args.warmup, sections)
+    print_results(results)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold, args.min_delta)
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        for name, section, before, after, ratio in rows:
+            flag = '  REGRESSION' if is_regression(before, after, args.threshold, args.min_delta) else ''
+            print(f"  {name}/{section:<24} {before:8.3f} -> {after:8.3f} ms  ({ratio - 1:+.1%}){flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
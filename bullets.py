@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+
+from pool import EntityPool
+
+# Owner codes stored in the owner array
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+OWNER_NAMES = ('player', 'enemy')
+
+BULLET_SPEED = 15
+ENEMY_BULLET_DAMAGE = 10
+
+
+class Bullet:
+    """Read-only view of one slot in a BulletSystem.
+    
+    Views are only valid until the system is compacted again, so they are
+    meant for drawing and debugging rather than long-term storage.
+    """
+    __slots__ = ('system', 'index')
+    
+    def __init__(self, system, index):
+        self.system = system
+        self.index = index
+        
+    @property
+    def x(self):
+        return float(self.system.x[self.index])
+        
+    @property
+    def y(self):
+        return float(self.system.y[self.index])
+        
+    @property
+    def angle(self):
+        return float(self.system.angle[self.index])
+        
+    @property
+    def owner(self):
+        return OWNER_NAMES[self.system.owner[self.index]]
+        
+    @property
+    def damage(self):
+        return int(self.system.damage[self.index])
+
+
+class BulletSystem(EntityPool):
+    """Structure-of-arrays store for every live projectile.
+    
+    Velocity is computed once when a bullet is fired; movement, culling and
+    wall lookups then run as batched NumPy operations over the live prefix
+    of each array.
+    """
+    FIELDS = EntityPool.FIELDS + (
+        ('vx', np.float64),
+        ('vy', np.float64),
+        ('angle', np.float64),
+        ('owner', np.uint8),
+        ('damage', np.int32),
+    )
+    
+    def __init__(self, capacity=256, speed=BULLET_SPEED):
+        self.speed = speed
+        super().__init__(capacity)
+        
+    def __iter__(self):
+        for i in range(self.count):
+            yield Bullet(self, i)
+            
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return Bullet(self, index)
+        
+    def spawn(self, x, y, angle, owner, damage=25):
+        i = self.acquire()
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.vx[i] = math.cos(angle) * self.speed
+        self.vy[i] = math.sin(angle) * self.speed
+        self.angle[i] = angle
+        if owner == 'player':
+            self.owner[i] = OWNER_PLAYER
+            self.damage[i] = damage
+        else:
+            self.owner[i] = OWNER_ENEMY
+            self.damage[i] = ENEMY_BULLET_DAMAGE
+        return i
+        
+    def spawn_many(self, x, y, angle, owner, damage=25):
+        """Fire a batch of bullets from arrays of positions and angles"""
+        count = len(x)
+        if count == 0:
+            return
+        s = self.acquire_many(count)
+        self.x[s] = self.prev_x[s] = x
+        self.y[s] = self.prev_y[s] = y
+        self.vx[s] = np.cos(angle) * self.speed
+        self.vy[s] = np.sin(angle) * self.speed
+        self.angle[s] = angle
+        if owner == 'player':
+            self.owner[s] = OWNER_PLAYER
+            self.damage[s] = damage
+        else:
+            self.owner[s] = OWNER_ENEMY
+            self.damage[s] = ENEMY_BULLET_DAMAGE
+        
+    def update(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        
+    def dead_mask(self, walls, width, height, tile_size):
+        """Mask of bullets that left the screen or sit inside a wall tile"""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        off = (x < 0) | (x > width) | (y < 0) | (y > height)
+        
+        rows, cols = walls.shape
+        grid_x = (x / tile_size).astype(np.int64)
+        grid_y = (y / tile_size).astype(np.int64)
+        inside = (grid_x >= 0) & (grid_x < cols) & (grid_y >= 0) & (grid_y < rows)
+        hit_wall = np.zeros(n, dtype=bool)
+        hit_wall[inside] = walls[grid_y[inside], grid_x[inside]] == 1
+        return off | hit_wall
@@ -0,0 +1,25 @@
+class Camera:
+    """Scrolling view onto a world larger than the screen"""
+    def __init__(self, view_width, view_height, world_width, world_height):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.world_width = world_width
+        self.world_height = world_height
+        self.x = 0
+        self.y = 0
+        
+    def follow(self, x, y):
+        """Center the view on a world point, clamped to the world edges"""
+        self.x = int(max(0, min(self.world_width - self.view_width, x - self.view_width // 2)))
+        self.y = int(max(0, min(self.world_height - self.view_height, y - self.view_height // 2)))
+        
+    def to_screen(self, x, y):
+        return x - self.x, y - self.y
+        
+    def to_world(self, x, y):
+        return x + self.x, y + self.y
+        
+    def visible(self, x, y, margin=0):
+        """Mask of points (scalars or arrays) inside the view plus a margin"""
+        return ((x >= self.x - margin) & (x < self.x + self.view_width + margin) &
+                (y >= self.y - margin) & (y < self.y + self.view_height + margin))
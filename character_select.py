@@ -1,5 +1,7 @@
 import pygame
-import asyncio
+
+from scenes import Assets
+from scheduling import FramePacer
 
 # Colors
 WHITE = (255, 255, 255)
@@ -8,16 +10,23 @@ GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
 class CharacterSelect:
-    def __init__(self):
-        self.width = 800
-        self.height = 600
-        self.screen = pygame.display.set_mode((self.width, self.height))
+    def __init__(self, screen=None, assets=None):
+        # Draws to a shared display and loads fonts through a shared asset
+        # registry when given them, otherwise opens its own window
+        if screen is None:
+            pygame.init()
+            screen = pygame.display.set_mode((800, 600))
+        self.screen = screen
+        self.width, self.height = screen.get_size()
         pygame.display.set_caption("Choose Your Character")
-        self.clock = pygame.time.Clock()
+        self.pacer = FramePacer(60)
         self.selected = None
-        self.font_large = pygame.font.Font(None, 72)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
+        # Called once, after the first frame is drawn
+        self.on_first_frame = None
+        assets = assets or Assets()
+        self.font_large = assets.font(72)
+        self.font_medium = assets.font(36)
+        self.font_small = assets.font(24)
         
         self.characters = [
             {'name': 'Soldier', 'color': BLUE, 'stats': 'Balanced', 'key': 'soldier'},
@@ -27,14 +36,47 @@ class CharacterSelect:
         ]
         
         self.hovered = None
+        self.needs_redraw = True
+        
+        # Nothing on this screen changes except the hover highlight, so all
+        # text is rendered once up front
+        self.title = self.font_large.render("Choose Your Character", True, GREEN)
+        self.instructions = self.font_small.render("Click on a character to select or press number keys 1-4", True, WHITE)
+        self.card_text = [
+            (self.font_medium.render(char['name'], True, WHITE),
+             self.font_small.render(char['stats'], True, (200, 200, 200)),
+             self.font_small.render(f"{i + 1}", True, WHITE))
+            for i, char in enumerate(self.characters)
+        ]
+        
+    def hovered_card(self):
+        card_width = 160
+        card_height = 220
+        spacing = 40
+        total_width = len(self.characters) * card_width + (len(self.characters) - 1) * spacing
+        start_x = (self.width - total_width) // 2
+        
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        for i in range(len(self.characters)):
+            x = start_x + i * (card_width + spacing)
+            y = 200
+            if x <= mouse_x <= x + card_width and y <= mouse_y <= y + card_height:
+                return i
+        return None
         
     def draw(self):
+        # Only redraw when the highlighted card changes
+        hovered = self.hovered_card()
+        if hovered == self.hovered and not self.needs_redraw:
+            return
+        self.hovered = hovered
+        self.needs_redraw = False
+        
         self.screen.fill(BLACK)
         
         # Title
-        title = self.font_large.render("Choose Your Character", True, GREEN)
-        title_rect = title.get_rect(center=(self.width // 2, 80))
-        self.screen.blit(title, title_rect)
+        title_rect = self.title.get_rect(center=(self.width // 2, 80))
+        self.screen.blit(self.title, title_rect)
         
         # Draw character cards
         card_width = 160
@@ -46,13 +88,8 @@ class CharacterSelect:
         for i, char in enumerate(self.characters):
             x = start_x + i * (card_width + spacing)
             y = 200
-            
-            # Check if hovering
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            is_hover = (x <= mouse_x <= x + card_width and y <= mouse_y <= y + card_height)
-            
-            if is_hover:
-                self.hovered = i
+            is_hover = i == hovered
+            name_surface, stats_surface, num_surface = self.card_text[i]
             
             # Draw card
             border_color = WHITE if is_hover else (128, 128, 128)
@@ -65,36 +102,35 @@ class CharacterSelect:
             pygame.draw.circle(self.screen, char['color'], (center_x, center_y), 40)
             
             # Draw name
-            name_surface = self.font_medium.render(char['name'], True, WHITE)
             name_rect = name_surface.get_rect(center=(x + card_width // 2, y + 120))
             self.screen.blit(name_surface, name_rect)
             
             # Draw stats
-            stats_surface = self.font_small.render(char['stats'], True, (200, 200, 200))
             stats_rect = stats_surface.get_rect(center=(x + card_width // 2, y + 160))
             self.screen.blit(stats_surface, stats_rect)
             
             # Number
-            num_surface = self.font_small.render(f"{i + 1}", True, WHITE)
             self.screen.blit(num_surface, (x + 10, y + 10))
         
         # Instructions
-        inst = self.font_small.render("Click on a character to select or press number keys 1-4", True, WHITE)
-        inst_rect = inst.get_rect(center=(self.width // 2, self.height - 40))
-        self.screen.blit(inst, inst_rect)
+        inst_rect = self.instructions.get_rect(center=(self.width // 2, self.height - 40))
+        self.screen.blit(self.instructions, inst_rect)
         
         pygame.display.flip()
     
     async def run(self):
         running = True
+        self.pacer.start()
         
         while running and self.selected is None:
             # Handle events
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
                     return None
                     
+                if event.type == pygame.VIDEOEXPOSE:
+                    self.needs_redraw = True
+                    
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left click
                         mouse_x, mouse_y = event.pos
@@ -127,9 +163,11 @@ class CharacterSelect:
                         running = False
             
             self.draw()
-            await asyncio.sleep(0)
-            self.clock.tick(60)
+            if self.on_first_frame is not None:
+                self.on_first_frame()
+                self.on_first_frame = None
+            # Sleep out the rest of the frame without blocking the event loop
+            await self.pacer.wait()
         
-        pygame.quit()
         return self.selected
 
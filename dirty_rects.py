@@ -0,0 +1,73 @@
+import pygame
+
+
+class DirtyRectRenderer:
+    """Redraws and presents only the parts of the screen that changed.
+    
+    Drawn rectangles are collected per group (entities, HUD, ...). At the
+    start of the next frame the background is restored under all of them,
+    and a group's old and new rectangles are only pushed to the display
+    when that group reports a change. When the dirty area grows past
+    max_dirty_fraction of the screen, a plain full flip is used instead.
+    """
+    def __init__(self, screen, restore_background, max_dirty_fraction=0.4, padding=2):
+        self.screen = screen
+        self.restore_background = restore_background
+        self.max_dirty_area = screen.get_width() * screen.get_height() * max_dirty_fraction
+        self.padding = padding
+        self.previous = {}
+        self.current = {}
+        self.changed = set()
+        self.invalid = []
+        self.full_redraw = True
+        self.last_frame_full = True
+        
+    def invalidate(self, rect=None):
+        """Force an area, or the whole screen when rect is None, to redraw"""
+        if rect is None:
+            self.full_redraw = True
+        else:
+            self.invalid.append(pygame.Rect(rect))
+            
+    def begin_frame(self):
+        """Restore the background under last frame's drawing.
+        
+        Returns True when the caller has to draw the full background itself.
+        """
+        self.current = {}
+        self.changed = set()
+        if self.full_redraw:
+            return True
+        for rects in self.previous.values():
+            for rect in rects:
+                self.restore_background(rect)
+        for rect in self.invalid:
+            self.restore_background(rect)
+        return False
+        
+    def add(self, group, rects, changed=True):
+        pad = self.padding
+        self.current.setdefault(group, []).extend(rect.inflate(pad * 2, pad * 2) for rect in rects if rect)
+        if changed:
+            self.changed.add(group)
+            
+    def present(self):
+        if self.full_redraw:
+            pygame.display.flip()
+            self.last_frame_full = True
+        else:
+            dirty = list(self.invalid)
+            for group in self.changed:
+                dirty.extend(self.previous.get(group, ()))
+                dirty.extend(self.current.get(group, ()))
+            area = sum(rect.width * rect.height for rect in dirty)
+            if area > self.max_dirty_area:
+                pygame.display.flip()
+                self.last_frame_full = True
+            else:
+                if dirty:
+                    pygame.display.update(dirty)
+                self.last_frame_full = False
+        self.previous = self.current
+        self.invalid = []
+        self.full_redraw = False
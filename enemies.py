@@ -0,0 +1,309 @@
+import numpy as np
+
+from pool import EntityPool
+
+ENEMY_HEALTH = 50
+ENEMY_SPEED = 2.0
+ENEMY_WIDTH = 20
+ENEMY_COOLDOWN = 60
+
+# Largest cell table built for the neighbor query before falling back to
+# binary search over the sorted cell keys
+DENSE_CELL_LIMIT = 1 << 16
+
+
+class Enemy:
+    """View of one slot in an EnemySwarm.
+    
+    Like bullet views, an Enemy is only valid until the swarm next drops
+    dead enemies.
+    """
+    __slots__ = ('swarm', 'index')
+    width = ENEMY_WIDTH
+    height = ENEMY_WIDTH
+    
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+        
+    @property
+    def x(self):
+        return float(self.swarm.x[self.index])
+        
+    @property
+    def y(self):
+        return float(self.swarm.y[self.index])
+        
+    @property
+    def angle(self):
+        return float(self.swarm.angle[self.index])
+        
+    @property
+    def dist(self):
+        return float(self.swarm.dist[self.index])
+        
+    @property
+    def health(self):
+        return int(self.swarm.health[self.index])
+        
+    @health.setter
+    def health(self, value):
+        self.swarm.set_health(self.index, value)
+
+
+class EnemySwarm(EntityPool):
+    """Structure-of-arrays store and batched AI step for the enemy horde.
+    
+    Every tick the whole horde seeks the player, steers away from close
+    neighbors, ticks its cooldowns and rolls its shots in one pass of
+    array operations.
+    """
+    FIELDS = EntityPool.FIELDS + (
+        ('angle', np.float64),
+        ('dist', np.float64),
+        ('health', np.int32),
+        ('cooldown_timer', np.int32),
+    )
+    
+    def __init__(self, capacity=64, speed=ENEMY_SPEED, cooldown=ENEMY_COOLDOWN,
+                 separation_radius=ENEMY_WIDTH, separation_strength=1.0, max_neighbors=4):
+        self.speed = speed
+        self.cooldown = cooldown
+        self.width = ENEMY_WIDTH
+        self.separation_radius = separation_radius
+        self.separation_strength = separation_strength
+        self.max_neighbors = max_neighbors
+        self.alive = 0
+        super().__init__(capacity)
+        
+    def __iter__(self):
+        for i in range(self.count):
+            yield Enemy(self, i)
+            
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return Enemy(self, index)
+        
+    def spawn(self, x, y):
+        i = self.acquire()
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.angle[i] = 0
+        self.dist[i] = 0
+        self.health[i] = ENEMY_HEALTH
+        self.cooldown_timer[i] = 0
+        self.alive += 1
+        return i
+        
+    def spawn_many(self, x, y):
+        """Spawn a batch of enemies from arrays of positions"""
+        count = len(x)
+        if count == 0:
+            return
+        s = self.acquire_many(count)
+        self.x[s] = self.prev_x[s] = x
+        self.y[s] = self.prev_y[s] = y
+        self.angle[s] = 0
+        self.dist[s] = 0
+        self.health[s] = ENEMY_HEALTH
+        self.cooldown_timer[s] = 0
+        self.alive += count
+        
+    def clear(self):
+        super().clear()
+        self.alive = 0
+        
+    def alive_count(self):
+        # Kept up to date by spawn() and damage() instead of rescanning
+        return self.alive
+        
+    def set_health(self, index, value):
+        was_alive = self.health[index] > 0
+        self.health[index] = value
+        self.alive += int(value > 0) - int(was_alive)
+        
+    def damage(self, index, amount):
+        """Apply damage to a living enemy and return True if it died"""
+        health = int(self.health[index]) - amount
+        self.health[index] = health
+        if health <= 0:
+            self.alive -= 1
+            return True
+        return False
+        
+    def release(self, index):
+        if self.health[index] > 0:
+            self.alive -= 1
+        super().release(index)
+        
+    def remove_dead(self):
+        self.keep(self.health[:self.count] > 0)
+        
+    def separation(self):
+        """Repulsion vectors from at most max_neighbors per neighboring cell.
+        
+        Enemies are bucketed by sorting their cell keys, so each neighbor
+        lookup is a table read or binary search and the work is bounded by
+        4 * max_neighbors per enemy instead of growing with the horde.
+        """
+        n = self.count
+        push_x = np.zeros(n)
+        push_y = np.zeros(n)
+        if n < 2:
+            return push_x, push_y
+            
+        radius = self.separation_radius
+        x = self.x[:n]
+        y = self.y[:n]
+        # With cells twice the radius, every neighbor lies in the enemy's own
+        # cell or one of the three cells toward the nearest corner
+        size = 2 * radius
+        fx = x / size
+        fy = y / size
+        cell_x = np.floor(fx).astype(np.int64)
+        cell_y = np.floor(fy).astype(np.int64)
+        step_x = np.where(fx - cell_x < 0.5, -1, 1)
+        step_y = np.where(fy - cell_y < 0.5, -1, 1)
+        # Pad the grid by one cell on each side so neighbor keys never wrap
+        cell_x -= cell_x.min() - 1
+        cell_y -= cell_y.min() - 1
+        rows = int(cell_y.max()) + 2
+        keys = cell_x * rows + cell_y
+        
+        order = np.argsort(keys, kind='stable')
+        
+        # Gather candidate pairs: up to max_neighbors enemies from each of
+        # the four cells around every enemy
+        neighbor_keys = np.concatenate((
+            keys,
+            keys + step_x * rows,
+            keys + step_y,
+            keys + step_x * rows + step_y,
+        ))
+        cells = (int(cell_x.max()) + 2) * rows
+        if cells <= max(DENSE_CELL_LIMIT, 8 * n):
+            # Compact hordes: a dense per-cell table beats binary search
+            cell_count = np.bincount(keys, minlength=cells)
+            cell_start = np.cumsum(cell_count) - cell_count
+            start = cell_start[neighbor_keys]
+            end = start + cell_count[neighbor_keys]
+        else:
+            sorted_keys = keys[order]
+            start = np.searchsorted(sorted_keys, neighbor_keys, 'left')
+            end = np.searchsorted(sorted_keys, neighbor_keys, 'right')
+        count = np.minimum(end - start, self.max_neighbors)
+        total = int(count.sum())
+        if total == 0:
+            return push_x, push_y
+        pair_row = np.repeat(np.arange(len(neighbor_keys)), count)
+        first = np.cumsum(count) - count
+        slot = start[pair_row] + (np.arange(total) - first[pair_row])
+        i = pair_row % n
+        j = order[slot]
+        
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        dist_sq = dx*dx + dy*dy
+        keep = (i != j) & (dist_sq < radius * radius)
+        i = i[keep]
+        dx = dx[keep]
+        dy = dy[keep]
+        dist_sq = dist_sq[keep]
+        
+        # Enemies stacked on the same point get a fixed per-index direction
+        # so they still fan out
+        stacked = dist_sq == 0
+        if stacked.any():
+            spread = i[stacked] * 2.399963
+            dx[stacked] = np.cos(spread)
+            dy[stacked] = np.sin(spread)
+            dist_sq[stacked] = 1.0
+            
+        dist = np.sqrt(dist_sq)
+        weight = (radius - dist) / (radius * dist)
+        push_x = np.bincount(i, weights=dx * weight, minlength=n)
+        push_y = np.bincount(i, weights=dy * weight, minlength=n)
+        return push_x, push_y
+        
+    def update(self, target_x, target_y, waypoints=None, walls=None, tile_size=64):
+        """Advance the horde one tick toward the target.
+        
+        waypoints is an optional (x, y, valid) triple of per-enemy positions
+        to walk toward instead of the target, e.g. from a FlowField. With a
+        walls grid, moves into wall tiles are cancelled one axis at a time.
+        """
+        n = self.count
+        if n == 0:
+            return
+        x = self.x[:n]
+        y = self.y[:n]
+        
+        # Distance and facing toward the target
+        dx = target_x - x
+        dy = target_y - y
+        dist_sq = dx*dx + dy*dy
+        dist = np.where(dist_sq > 0, np.sqrt(dist_sq), 1.0)
+        self.dist[:n] = dist
+        
+        # Seek the target, or the next waypoint where there is one
+        seek_x = dx
+        seek_y = dy
+        seek_dist = dist
+        if waypoints is not None:
+            waypoint_x, waypoint_y, valid = waypoints
+            seek_x = np.where(valid, waypoint_x - x, dx)
+            seek_y = np.where(valid, waypoint_y - y, dy)
+            seek_sq = seek_x*seek_x + seek_y*seek_y
+            seek_dist = np.where(seek_sq > 0, np.sqrt(seek_sq), 1.0)
+        move_x = seek_x / seek_dist * self.speed
+        move_y = seek_y / seek_dist * self.speed
+        
+        # Crowd separation
+        if self.separation_strength:
+            push_x, push_y = self.separation()
+            scale = self.separation_strength * self.speed
+            move_x += push_x * scale
+            move_y += push_y * scale
+            
+        if walls is None:
+            x += move_x
+            y += move_y
+        else:
+            # Enemies already stuck inside a wall may move freely to get out
+            stuck = self.in_wall(walls, x, y, tile_size)
+            new_x = x + move_x
+            new_y = y + move_y
+            x[:] = np.where(self.in_wall(walls, new_x, y, tile_size) & ~stuck, x, new_x)
+            y[:] = np.where(self.in_wall(walls, x, new_y, tile_size) & ~stuck, y, new_y)
+        self.angle[:n] = np.arctan2(dy, dx)
+        
+        # Update cooldowns
+        timers = self.cooldown_timer[:n]
+        np.subtract(timers, 1, out=timers, where=timers > 0)
+        
+    @staticmethod
+    def in_wall(walls, x, y, tile_size):
+        """Mask of positions inside wall tiles or outside the map"""
+        rows, cols = walls.shape
+        tile_x = np.floor(x / tile_size).astype(np.int64)
+        tile_y = np.floor(y / tile_size).astype(np.int64)
+        inside = (tile_x >= 0) & (tile_x < cols) & (tile_y >= 0) & (tile_y < rows)
+        blocked = ~inside
+        blocked[inside] = walls[tile_y[inside], tile_x[inside]] == 1
+        return blocked
+        
+    def choose_shooters(self, rng, max_range=300, chance=0.02, can_see=None):
+        """Roll shots for the whole horde and start the shooters' cooldowns.
+        
+        can_see, if given, takes the indices of the enemies about to shoot
+        and returns which of them have a clear line to their target; the
+        others hold their fire.
+        """
+        n = self.count
+        ready = (self.cooldown_timer[:n] == 0) & (self.dist[:n] < max_range)
+        shooters = np.flatnonzero(ready & (rng.random(n) < chance))
+        if can_see is not None and len(shooters):
+            shooters = shooters[can_see(shooters)]
+        self.cooldown_timer[shooters] = self.cooldown
+        return shooters
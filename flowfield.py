@@ -0,0 +1,276 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+# Distance stored for tiles the search never reached
+UNREACHED = 1 << 30
+
+# Steering offsets; diagonals only count when both orthogonal tiles are open
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def build_field(walls, width, height, goal):
+    """Breadth-first distances from goal over a padded window of tiles.
+    
+    walls is a bytes object of (width + 2) * (height + 2) tiles with a solid
+    border, so neighbors never need bounds checks.
+    """
+    stride = width + 2
+    dist = [UNREACHED] * len(walls)
+    if walls[goal]:
+        return dist
+    dist[goal] = 0
+    queue = deque([goal])
+    steps = (1, -1, stride, -stride)
+    while queue:
+        index = queue.popleft()
+        next_dist = dist[index] + 1
+        for step in steps:
+            neighbor = index + step
+            if dist[neighbor] == UNREACHED and not walls[neighbor]:
+                dist[neighbor] = next_dist
+                queue.append(neighbor)
+    return dist
+
+
+class FlowField:
+    """Shared distance map toward the player that every enemy samples.
+    
+    The field covers the whole map, or a window of max_radius tiles around
+    the goal on large maps. Each tile points at its lowest-distance
+    neighbor, so steering an enemy is a single array lookup no matter how
+    many enemies there are.
+    """
+    def __init__(self, tile_map, max_radius=None):
+        self.tile_map = tile_map
+        self.tile_size = tile_map.tile_size
+        self.max_radius = max_radius
+        self.goal = None
+        self.origin = (0, 0)
+        self.width = 0
+        self.height = 0
+        self.walls = b''
+        self.dist = []
+        self.next_x = np.zeros((0, 0), dtype=np.int32)
+        self.next_y = np.zeros((0, 0), dtype=np.int32)
+        self.reachable = np.zeros((0, 0), dtype=bool)
+        
+        # Background computation state
+        self.version = 0
+        self.pending = None
+        self.wanted_goal = None
+        
+    def window(self, goal_x, goal_y):
+        """Tile rectangle (x0, y0, x1, y1) the field covers for a goal"""
+        tile_map = self.tile_map
+        if self.max_radius is None:
+            return 0, 0, tile_map.width, tile_map.height
+        r = self.max_radius
+        return (max(0, goal_x - r), max(0, goal_y - r),
+                min(tile_map.width, goal_x + r + 1), min(tile_map.height, goal_y + r + 1))
+                
+    def snapshot(self, goal_x, goal_y):
+        """Copy the padded wall window and goal index for build_field()"""
+        x0, y0, x1, y1 = self.window(goal_x, goal_y)
+        width = x1 - x0
+        height = y1 - y0
+        border = b'\x01' * (width + 2)
+        rows = [border]
+        for row in self.tile_map.region(x0, y0, x1, y1):
+            rows.append(b'\x01' + bytes(row) + b'\x01')
+        rows.append(border)
+        goal = (goal_y - y0 + 1) * (width + 2) + (goal_x - x0 + 1)
+        return b''.join(rows), width, height, goal, (x0, y0)
+        
+    def compute(self, goal_x, goal_y):
+        walls, width, height, goal, origin = self.snapshot(goal_x, goal_y)
+        dist = build_field(walls, width, height, goal)
+        self.apply((goal_x, goal_y), walls, width, height, origin, dist)
+        
+    def compute_async(self, executor, goal_x, goal_y):
+        """Start a background rebuild; poll() installs it when it finishes"""
+        walls, width, height, goal, origin = self.snapshot(goal_x, goal_y)
+        future = executor.submit(build_field, walls, width, height, goal)
+        self.pending = (future, (goal_x, goal_y), walls, width, height, origin, self.version)
+        
+    def poll(self, executor):
+        """Install a finished background field and start the next if needed"""
+        if self.pending is not None:
+            future, goal, walls, width, height, origin, version = self.pending
+            if not future.done():
+                return False
+            self.pending = None
+            # Tiles edited while the worker ran make the result stale
+            if version == self.version:
+                self.apply(goal, walls, width, height, origin, future.result())
+        if self.wanted_goal is not None and self.wanted_goal != self.goal:
+            self.compute_async(executor, *self.wanted_goal)
+        return True
+        
+    def update_goal(self, goal_x, goal_y, executor=None):
+        """Retarget the field when the player has moved to another tile"""
+        if executor is None:
+            if (goal_x, goal_y) != self.goal:
+                self.compute(goal_x, goal_y)
+            return
+        self.wanted_goal = (goal_x, goal_y)
+        self.poll(executor)
+        
+    def apply(self, goal, walls, width, height, origin, dist):
+        self.goal = goal
+        self.walls = bytearray(walls)
+        self.width = width
+        self.height = height
+        self.origin = origin
+        self.goal_index = (goal[1] - origin[1] + 1) * (width + 2) + (goal[0] - origin[0] + 1)
+        self.dist = dist
+        self.update_directions()
+        
+    def update_directions(self):
+        """Point every reached tile at its lowest-distance neighbor"""
+        stride = self.width + 2
+        dist = np.array(self.dist, dtype=np.int64).reshape(self.height + 2, stride)
+        inner = (slice(1, -1), slice(1, -1))
+        best = dist[inner].copy()
+        next_x = np.zeros(best.shape, dtype=np.int32)
+        next_y = np.zeros(best.shape, dtype=np.int32)
+        
+        def shifted(dx, dy):
+            return dist[1 + dy:dist.shape[0] - 1 + dy, 1 + dx:stride - 1 + dx]
+            
+        for dx, dy in DIRECTIONS:
+            neighbor = shifted(dx, dy)
+            if dx and dy:
+                # No cutting corners past walls
+                open_corner = (shifted(dx, 0) < UNREACHED) & (shifted(0, dy) < UNREACHED)
+                neighbor = np.where(open_corner, neighbor, UNREACHED)
+            better = neighbor < best
+            best = np.where(better, neighbor, best)
+            next_x[better] = dx
+            next_y[better] = dy
+            
+        self.next_x = next_x
+        self.next_y = next_y
+        self.reachable = dist[inner] < UNREACHED
+        
+    def tile_changed(self, x, y):
+        """Repair the field after one tile was edited in the tile map"""
+        self.version += 1
+        if self.goal is None:
+            return
+        x0, y0 = self.origin
+        if not (x0 <= x < x0 + self.width and y0 <= y < y0 + self.height):
+            return
+        stride = self.width + 2
+        index = (y - y0 + 1) * stride + (x - x0 + 1)
+        wall = 1 if self.tile_map.is_wall(x, y) else 0
+        if self.walls[index] == wall:
+            return
+        self.walls[index] = wall
+        if wall:
+            self._raise(index)
+        else:
+            self._lower(index)
+        self.update_directions()
+        
+    def _lower(self, index):
+        """An opened tile can only shorten paths: relax outward from it"""
+        dist = self.dist
+        walls = self.walls
+        stride = self.width + 2
+        steps = (1, -1, stride, -stride)
+        if index == self.goal_index:
+            dist[index] = 0
+        else:
+            best = min(dist[index + step] for step in steps)
+            if best == UNREACHED:
+                return
+            dist[index] = best + 1
+        queue = deque([index])
+        while queue:
+            current = queue.popleft()
+            next_dist = dist[current] + 1
+            for step in steps:
+                neighbor = current + step
+                if not walls[neighbor] and dist[neighbor] > next_dist:
+                    dist[neighbor] = next_dist
+                    queue.append(neighbor)
+                    
+    def _raise(self, index):
+        """A new wall can only lengthen paths.
+        
+        Tiles that relied on it are found level by level, since a tile keeps
+        its distance as long as some other neighbor is exactly one closer.
+        Those tiles are then refilled from the unaffected tiles around them.
+        """
+        dist = self.dist
+        walls = self.walls
+        stride = self.width + 2
+        steps = (1, -1, stride, -stride)
+        
+        if dist[index] == 0:
+            # The goal itself was walled in; nothing can reach it
+            for i in range(len(dist)):
+                dist[i] = UNREACHED
+            return
+            
+        invalid = {index}
+        level = [index]
+        dist_level = dist[index]
+        dist[index] = UNREACHED
+        while level:
+            dist_level += 1
+            candidates = {current + step for current in level for step in steps
+                          if dist[current + step] == dist_level}
+            level = []
+            for tile in candidates:
+                supported = any(dist[tile + step] == dist_level - 1 for step in steps
+                                if tile + step not in invalid)
+                if not supported:
+                    invalid.add(tile)
+                    level.append(tile)
+            for tile in level:
+                dist[tile] = UNREACHED
+                
+        # Refill the invalidated region from its valid border
+        heap = []
+        for tile in invalid:
+            for step in steps:
+                neighbor = tile + step
+                if neighbor not in invalid and dist[neighbor] < UNREACHED:
+                    heap.append((dist[neighbor], neighbor))
+        heapq.heapify(heap)
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            for step in steps:
+                neighbor = current + step
+                if not walls[neighbor] and dist[neighbor] > d + 1:
+                    dist[neighbor] = d + 1
+                    heapq.heappush(heap, (d + 1, neighbor))
+                    
+    def waypoints(self, x, y):
+        """Next tile centers toward the goal for arrays of world positions.
+        
+        Returns (waypoint_x, waypoint_y, valid); positions outside the field,
+        on unreachable tiles or already on the goal tile are not valid.
+        """
+        size = self.tile_size
+        x0, y0 = self.origin
+        tile_x = np.floor(x / size).astype(np.int64) - x0
+        tile_y = np.floor(y / size).astype(np.int64) - y0
+        valid = (tile_x >= 0) & (tile_x < self.width) & (tile_y >= 0) & (tile_y < self.height)
+        tile_x = np.where(valid, tile_x, 0)
+        tile_y = np.where(valid, tile_y, 0)
+        if self.width and self.height:
+            step_x = self.next_x[tile_y, tile_x]
+            step_y = self.next_y[tile_y, tile_x]
+            valid &= self.reachable[tile_y, tile_x] & ((step_x != 0) | (step_y != 0))
+        else:
+            step_x = step_y = 0
+            valid &= False
+        waypoint_x = (tile_x + x0 + step_x + 0.5) * size
+        waypoint_y = (tile_y + y0 + step_y + 0.5) * size
+        return waypoint_x, waypoint_y, valid
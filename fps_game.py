@@ -1,16 +1,56 @@
+import time
+
+# As close to process start as this module can tell, for startup timings
+STARTED = time.perf_counter()
+
 import pygame
 import math
 import random
 import asyncio
-from typing import List, Tuple
+import hashlib
+import itertools
+import json
+import logging
+import os
+import struct
+from types import MappingProxyType
+
+import numpy as np
 
-# Initialize Pygame
-pygame.init()
+from bullets import BULLET_SPEED, BulletSystem, OWNER_ENEMY, OWNER_PLAYER
+from camera import Camera
+from enemies import ENEMY_COOLDOWN, ENEMY_SPEED, ENEMY_WIDTH, EnemySwarm
+from flowfield import FlowField
+from governor import FrameGovernor, LoadLevel
+from dirty_rects import DirtyRectRenderer
+from hud import GlyphAtlas, HudField
+from line_of_sight import LineOfSight
+from profiler import FrameProfiler, ProfilerOverlay
+from raycaster import Raycaster
+from scenes import Assets
+from savestate import load_state, read_state, save_state, write_bytes
+from scheduling import FramePacer, WorkerPool
+from spawning import SpawnIndex
+from tilemap import TileMap
+
+logger = logging.getLogger(__name__)
 
 # Constants
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
 FPS = 60
+TILE_SIZE = 64
+
+# Most tuning values are given per frame at 60 FPS; a game running a
+# different simulation rate rescales them from this reference
+REFERENCE_RATE = 60
+MAX_CATCH_UP_TICKS = 5
+
+# Flow fields on large maps only cover this many tiles around the player
+FLOW_FIELD_RADIUS = 48
+
+# Enemies never spawn closer to the player than this many pixels
+SPAWN_MIN_DISTANCE = 200
 
 # Colors
 WHITE = (255, 255, 255)
@@ -22,61 +62,100 @@ GRAY = (128, 128, 128)
 DARK_GRAY = (64, 64, 64)
 YELLOW = (255, 255, 0)
 
+PLAYER_WIDTH = 20
+
+# Character stats, shared read-only by every Player
+CHARACTER_STATS = MappingProxyType({
+    'soldier': MappingProxyType({'health': 100, 'speed': 3, 'color': BLUE, 'damage': 25}),
+    'commando': MappingProxyType({'health': 75, 'speed': 4, 'color': GREEN, 'damage': 20}),
+    'tank': MappingProxyType({'health': 150, 'speed': 2, 'color': (128, 0, 128), 'damage': 30}),
+    'assassin': MappingProxyType({'health': 80, 'speed': 3.5, 'color': (255, 140, 0), 'damage': 35}),
+})
+
+class InputFrame:
+    """Player input for a single simulation tick"""
+    __slots__ = ('up', 'down', 'left', 'right', 'mouse_dx', 'fire', 'reload')
+    
+    def __init__(self, up=False, down=False, left=False, right=False,
+                 mouse_dx=0, fire=False, reload=False):
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.mouse_dx = mouse_dx
+        self.fire = fire
+        self.reload = reload
+        
+    @classmethod
+    def from_pygame(cls):
+        """Sample the live keyboard and mouse state"""
+        keys = pygame.key.get_pressed()
+        return cls(
+            up=keys[pygame.K_w] or keys[pygame.K_UP],
+            down=keys[pygame.K_s] or keys[pygame.K_DOWN],
+            left=keys[pygame.K_a] or keys[pygame.K_LEFT],
+            right=keys[pygame.K_d] or keys[pygame.K_RIGHT],
+            mouse_dx=pygame.mouse.get_rel()[0],
+            fire=pygame.mouse.get_pressed()[0],
+            reload=keys[pygame.K_r],
+        )
+
 class Player:
+    __slots__ = ('x', 'y', 'angle', 'character', 'health', 'max_health', 'ammo',
+                 'speed', 'width', 'height', 'color', 'prev_x', 'prev_y')
+    
+    # Character stats
+    stats = CHARACTER_STATS
+    
+    # Radians of turn per pixel of mouse movement
+    sensitivity = 0.006
+    
     def __init__(self, x, y, character='soldier'):
-        self.x = x
-        self.y = y
-        self.angle = 0  # Viewing angle in radians
+        self.x = float(x)
+        self.y = float(y)
+        self.angle = 0.0  # Viewing angle in radians
         self.character = character
         
-        # Character stats
-        self.stats = {
-            'soldier': {'health': 100, 'speed': 3, 'color': BLUE, 'damage': 25},
-            'commando': {'health': 75, 'speed': 4, 'color': GREEN, 'damage': 20},
-            'tank': {'health': 150, 'speed': 2, 'color': (128, 0, 128), 'damage': 30},
-            'assassin': {'health': 80, 'speed': 3.5, 'color': (255, 140, 0), 'damage': 35}
-        }
-        
         self.health = self.stats[self.character]['health']
         self.max_health = self.health
         self.ammo = 30
         self.speed = self.stats[self.character]['speed']
-        self.width = 20
+        self.width = PLAYER_WIDTH
         self.height = 20
         self.color = self.stats[self.character]['color']
         
-    def move(self, keys, map_data):
+        # Position before the last tick, for render interpolation
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
+    def move(self, inputs, map_data, scale=1.0):
         old_x, old_y = self.x, self.y
+        speed = self.speed * scale
         
         # Calculate movement based on angle
-        if keys[pygame.K_w] or keys[pygame.K_UP]:
-            self.x += math.cos(self.angle) * self.speed
-            self.y += math.sin(self.angle) * self.speed
-        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-            self.x -= math.cos(self.angle) * self.speed
-            self.y -= math.sin(self.angle) * self.speed
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            self.x += math.cos(self.angle - math.pi/2) * self.speed
-            self.y += math.sin(self.angle - math.pi/2) * self.speed
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            self.x += math.cos(self.angle + math.pi/2) * self.speed
-            self.y += math.sin(self.angle + math.pi/2) * self.speed
+        if inputs.up:
+            self.x += math.cos(self.angle) * speed
+            self.y += math.sin(self.angle) * speed
+        if inputs.down:
+            self.x -= math.cos(self.angle) * speed
+            self.y -= math.sin(self.angle) * speed
+        if inputs.left:
+            self.x += math.cos(self.angle - math.pi/2) * speed
+            self.y += math.sin(self.angle - math.pi/2) * speed
+        if inputs.right:
+            self.x += math.cos(self.angle + math.pi/2) * speed
+            self.y += math.sin(self.angle + math.pi/2) * speed
             
         # Check for wall collision
-        grid_x = int(self.x / 64)
-        grid_y = int(self.y / 64)
-        if 0 <= grid_x < len(map_data[0]) and 0 <= grid_y < len(map_data):
-            if map_data[grid_y][grid_x] == 1:
-                self.x, self.y = old_x, old_y
-            else:
-                # Keep player in bounds
-                self.x = max(self.width, min(SCREEN_WIDTH - self.width, self.x))
-                self.y = max(self.height, min(SCREEN_HEIGHT - self.height, self.y))
+        if map_data.is_wall_at(self.x, self.y):
+            self.x, self.y = old_x, old_y
+        else:
+            # Keep player in the world
+            self.x = max(self.width, min(map_data.pixel_width - self.width, self.x))
+            self.y = max(self.height, min(map_data.pixel_height - self.height, self.y))
                 
     def rotate(self, mouse_movement):
-        # Improved sensitivity for better aiming
-        sensitivity = 0.006
-        self.angle += mouse_movement * sensitivity
+        self.angle += mouse_movement * self.sensitivity
         
     def shoot(self):
         if self.ammo > 0:
@@ -84,101 +163,210 @@ class Player:
             return True
         return False
 
-class Enemy:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.angle = 0
-        self.health = 50
-        self.speed = 2.0  # Increased from 1.5
-        self.width = 20
-        self.height = 20
-        self.cooldown = 60
-        self.cooldown_timer = 0
-        self.dist = 0  # Cache distance to avoid recalculation
-        
-    def update(self, player):
-        # Simple AI: move towards player (optimized)
-        dx = player.x - self.x
-        dy = player.y - self.y
-        self.dist = math.sqrt(dx*dx + dy*dy) if dx*dx + dy*dy > 0 else 1
-        
-        # Use cached distance
-        if self.dist > 0:
-            self.x += (dx / self.dist) * self.speed
-            self.y += (dy / self.dist) * self.speed
-            self.angle = math.atan2(dy, dx)
-            
-        # Update cooldown
-        if self.cooldown_timer > 0:
-            self.cooldown_timer -= 1
-            
-    def can_shoot(self):
-        return self.cooldown_timer == 0
-        
-    def shoot(self):
-        if self.can_shoot():
-            self.cooldown_timer = self.cooldown
-            return True
-        return False
-
-class Bullet:
-    def __init__(self, x, y, angle, owner, damage=25):
-        self.x = x
-        self.y = y
-        self.angle = angle
-        self.speed = 15
-        self.owner = owner  # 'player' or 'enemy'
-        self.damage = damage if owner == 'player' else 10
-        
-    def update(self):
-        self.x += math.cos(self.angle) * self.speed
-        self.y += math.sin(self.angle) * self.speed
-        
-    def is_off_screen(self):
-        return (self.x < 0 or self.x > SCREEN_WIDTH or 
-                self.y < 0 or self.y > SCREEN_HEIGHT)
-
 class FPSGame:
-    def __init__(self, selected_character='soldier'):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("FPS Game - WASD to move, Mouse to aim, Left Click to shoot")
-        self.clock = pygame.time.Clock()
+    def __init__(self, selected_character='soldier', headless=False, dirty_rects=False,
+                 glyph_atlas=False, sim_rate=REFERENCE_RATE, map_path=None, seed=None, profile=False,
+                 tile_map=None, first_person=False, governor=True, screen=None, assets=None):
+        # Headless games have no window, fonts or frame cap and are
+        # advanced explicitly with step(). Others draw to screen and load
+        # from assets when given, e.g. by a SceneManager, or open their own
+        self.headless = headless
+        if headless:
+            self.screen = None
+            self.pacer = None
+        else:
+            if screen is None:
+                pygame.init()
+                screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.screen = screen
+            pygame.display.set_caption("FPS Game - WASD to move, Mouse to aim, Left Click to shoot")
+            self.pacer = FramePacer(FPS)
         self.running = True
+        self.ticks = 0
+        
+        # All gameplay randomness comes from this seed so sessions can be
+        # recorded and replayed exactly
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.recorder = None
         
-        # Create simple map (1 = wall, 0 = open space)
-        self.map_data = self.create_map()
+        # The simulation advances in fixed ticks of 1 / sim_rate seconds,
+        # independent of how fast frames are rendered
+        self.sim_rate = sim_rate
+        self.tick_scale = REFERENCE_RATE / sim_rate
         
-        # Create player with selected character
-        self.player = Player(200, 200, selected_character)
+        # Load or create the map (1 = wall, 0 = open space). wall_grid is a
+        # NumPy view of the same tiles for the batched systems
+        if tile_map is not None:
+            self.map_data = tile_map
+        elif map_path:
+            self.map_data = TileMap.load(map_path, tile_size=TILE_SIZE)
+        else:
+            self.map_data = self.create_map()
+        self.wall_grid = self.map_data.as_array()
+        
+        # Create player with selected character, on the nearest open tile
+        start = self.map_data.nearest_open(200 // TILE_SIZE, 200 // TILE_SIZE)
+        if start is None:
+            # Nothing open within reach of the corner; any open tile will do
+            open_y, open_x = np.nonzero(self.wall_grid == 0)
+            if len(open_x) == 0:
+                raise ValueError("map has no open tiles to start on")
+            start = int(open_x[0]), int(open_y[0])
+        start_x, start_y = start
+        self.player = Player(start_x * TILE_SIZE + 8, start_y * TILE_SIZE + 8, selected_character)
+        
+        # Everyone enemy bullets can hit; just the one player outside of
+        # server games
+        self.players = [self.player]
         
         # Create enemies
-        self.enemies = [
-            Enemy(600, 300),
-            Enemy(700, 500),
-            Enemy(800, 200),
-        ]
+        self.enemies = EnemySwarm(capacity=256, speed=ENEMY_SPEED * self.tick_scale,
+                                  cooldown=self.to_ticks(ENEMY_COOLDOWN))
+        self.enemies.spawn(600, 300)
+        self.enemies.spawn(700, 500)
+        self.enemies.spawn(800, 200)
+        self.enemy_rng = np.random.default_rng(self.rng.getrandbits(64))
+        self.enemy_shot_chance = 1 - (1 - 0.02) ** self.tick_scale
+        
+        # Shared pathfinding field toward the player. With flow_executor set,
+        # rebuilds run in the background and are picked up on a later tick
+        radius = None if self.map_data.width * self.map_data.height <= 128 * 128 else FLOW_FIELD_RADIUS
+        self.flow_field = FlowField(self.map_data, radius)
+        self.flow_executor = None
+        
+        # Valid spawn tiles, indexed once. Small maps spawn along the edges;
+        # on large maps enemies spawn anywhere inside the flow field's reach
+        if radius is None:
+            self.spawn_index = SpawnIndex(self.map_data, 'edges')
+            self.spawn_max_distance = None
+        else:
+            self.spawn_index = SpawnIndex(self.map_data, 'all')
+            self.spawn_max_distance = radius * TILE_SIZE
+        
+        # Tile-to-tile visibility, so enemies only shoot at a player they can see
+        self.line_of_sight = LineOfSight(self.map_data)
         
         # Bullets
-        self.bullets = []
+        self.bullets = BulletSystem(capacity=1024, speed=BULLET_SPEED * self.tick_scale)
         
-        # Score
+        # Score, and running totals for balance statistics
         self.score = 0
+        self.kills = 0
+        self.shots_fired = 0
+        self.shots_hit = 0
+        self.damage_dealt = 0
+        self.damage_taken = 0
         
         # Enemy spawning
         self.max_enemies = 10  # Max enemies on screen at once
         self.enemy_spawn_timer = 0
-        self.enemy_spawn_delay = 120  # Spawn every 2 seconds (at 60 FPS)
+        self.enemy_spawn_delay = self.to_ticks(120)  # Spawn every 2 seconds
+        self.spawn_throttle = 1  # Raised by the frame governor under load
+        
+        # Fire rate is counted in simulation ticks so headless runs and slow
+        # frames behave the same
+        self.fire_interval = self.to_ticks(12)  # 200ms
+        self.last_shot_tick = 0
+        
+        # In-memory save state for F5 / F9, also written to quicksave_path
+        # in the background when that is set
+        self.quicksave = None
+        self.quicksave_path = None
+        
+        # Background workers while run() is going; see start_workers()
+        self.workers = None
+        
+        # Frame-loop state carried between frames: simulation time owed and
+        # mouse movement not yet applied by a tick
+        self.accumulator = 0.0
+        self.pending_turn = 0
+        # Called once, after run() has drawn its first frame
+        self.on_first_frame = None
+        
+        # Per-phase frame timings; while disabled the hooks are no-ops
+        self.profiler = FrameProfiler(enabled=profile)
+        
+        if not headless:
+            # Static tile layer, rendered once and blitted every frame
+            assets = assets or Assets()
+            self.map_layer = assets.map_layer(self.map_data, TILE_SIZE)
+            
+            # The view follows the player across maps larger than the screen
+            self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT,
+                                 self.map_data.pixel_width, self.map_data.pixel_height)
+            
+            # Optional dirty-rectangle presentation instead of full flips
+            self.renderer = None
+            if dirty_rects:
+                self.renderer = DirtyRectRenderer(self.screen, self.restore_background)
+            
+            # Font
+            self.font = assets.font(36)
+            self.small_font = assets.font(24)
+            
+            # HUD text is only re-rendered when its value changes; with a
+            # glyph atlas the numbers are assembled from cached digits
+            atlas = GlyphAtlas(self.small_font, WHITE) if glyph_atlas else None
+            self.hud_health = HudField(self.small_font, "Health: {}", WHITE, (20, 15), atlas)
+            self.hud_ammo = HudField(self.small_font, "Ammo: {}", WHITE, (10, 50), atlas)
+            self.hud_score = HudField(self.small_font, "Score: {}", WHITE, (10, 80), atlas)
+            self.hud_enemies = HudField(self.small_font, "Enemies: {}", WHITE, (10, 110), atlas)
+            # HUD values are sampled every hud_interval frames
+            self.hud_interval = 1
+            self.hud_frame = 0
+            self.hud_values = None
+            
+            # Profiler overlay, toggled with F3. Showing it turns profiling
+            # on; hiding it only turns profiling off if profile was not set
+            self.profiler_overlay = ProfilerOverlay(self.profiler, budget_ms=1000 / FPS, font=assets.font(18))
+            self.show_profiler = False
+            self.always_profile = profile
+            
+            # Entities are drawn from sprites pre-rendered at fixed angles
+            self.sprites = assets.sprites
+            self.enemy_sprite = self.sprites.rotated(RED, self.enemies.width // 2)
+            self.bullet_sprites = {OWNER_PLAYER: self.sprites.disc(YELLOW, 5), OWNER_ENEMY: self.sprites.disc(RED, 5)}
+            
+            # Raycast first-person view, toggled with F2
+            self.raycaster = Raycaster(self.map_data, self.screen)
+            self.first_person = first_person
+            
+            # Sheds work in order when frames run over budget, and brings it
+            # back once there is headroom
+            self.interpolate = True
+            self.governor = FrameGovernor(self.load_levels(), budget_ms=1000 / FPS)
+            self.governor.enabled = governor
+            
+            # Mouse control
+            pygame.mouse.set_visible(False)
+            pygame.event.set_grab(True)
         
-        # Font
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+    def state_hash(self):
+        """64-bit digest of the simulation state, for replay checkpoints"""
+        digest = hashlib.blake2b(digest_size=8)
+        player = self.player
+        # Packed rather than repr()'d, so 200 and 200.0 hash the same
+        digest.update(struct.pack('<qqdddqqq', self.ticks, self.score, player.x, player.y, player.angle,
+                                  player.health, player.ammo, self.enemy_spawn_timer))
+        for pool, fields in ((self.enemies, ('x', 'y', 'health', 'cooldown_timer')),
+                             (self.bullets, ('x', 'y', 'owner'))):
+            for name in fields:
+                digest.update(getattr(pool, name)[:pool.count].tobytes())
+        return int.from_bytes(digest.digest(), 'little')
         
-        # Mouse control
-        pygame.mouse.set_visible(False)
-        pygame.event.set_grab(True)
+    def pool_stats(self):
+        """Occupancy and high-water marks of the entity pools"""
+        return {'enemies': self.enemies.stats(), 'bullets': self.bullets.stats()}
         
-    def create_map(self):
+    def to_ticks(self, frames):
+        """Convert a duration in 60 FPS frames to simulation ticks"""
+        return max(1, round(frames / self.tick_scale))
+        
+    @staticmethod
+    def create_map():
         # Create a simple maze-like map
         map_data = [[0 for _ in range(16)] for _ in range(12)]
         
@@ -199,248 +387,595 @@ class FPSGame:
             map_data[i][7] = 1
             map_data[i][12] = 1
             
-        return map_data
+        return TileMap.from_rows(map_data, TILE_SIZE)
         
+    def set_tile(self, x, y, value):
+        """Change one map tile and refresh everything cached from the map"""
+        self.map_data.set(x, y, value)
+        self.flow_field.tile_changed(x, y)
+        self.spawn_index.tile_changed(x, y)
+        self.line_of_sight.tile_changed(x, y)
+        if not self.headless:
+            self.map_layer.invalidate_tile(x, y)
+            if self.renderer:
+                left, top = self.camera.to_screen(x * TILE_SIZE, y * TILE_SIZE)
+                self.renderer.invalidate((left, top, TILE_SIZE, TILE_SIZE))
+            
     def draw_map(self):
-        tile_size = 64
-        
-        # Draw map
-        for y, row in enumerate(self.map_data):
-            for x, cell in enumerate(row):
-                rect = pygame.Rect(x * tile_size, y * tile_size, tile_size, tile_size)
-                if cell == 1:
-                    pygame.draw.rect(self.screen, DARK_GRAY, rect)
-                    pygame.draw.rect(self.screen, BLACK, rect, 2)
-                else:
-                    pygame.draw.rect(self.screen, GRAY, rect)
-                    pygame.draw.rect(self.screen, BLACK, rect, 1)
+        self.map_layer.draw(self.screen, self.camera.x, self.camera.y)
+        
+    def restore_background(self, rect):
+        self.screen.fill(BLACK, rect)
+        self.map_layer.draw_area(self.screen, rect, self.camera.x, self.camera.y)
+        
+    def player_position(self, alpha=1.0):
+        player = self.player
+        return (player.prev_x + (player.x - player.prev_x) * alpha,
+                player.prev_y + (player.y - player.prev_y) * alpha)
                     
-    def draw_player(self):
+    def draw_player(self, alpha=1.0):
         # Draw player as a colored circle based on character
-        pygame.draw.circle(self.screen, self.player.color, (int(self.player.x), int(self.player.y)), self.player.width // 2)
-        pygame.draw.line(
-            self.screen, self.player.color,
-            (self.player.x, self.player.y),
-            (self.player.x + math.cos(self.player.angle) * 30,
-             self.player.y + math.sin(self.player.angle) * 30),
-            3
-        )
+        player = self.player
+        x, y = self.camera.to_screen(*self.player_position(alpha))
+        sprite = self.sprites.rotated(player.color, player.width // 2)
+        return sprite.draw_many(self.screen, [x], [y], [player.angle])
+        
+    def draw_enemies(self, alpha=1.0):
+        enemies = self.enemies
+        xs, ys = enemies.lerp(alpha)
+        angles = enemies.angle[:enemies.count]
         
-    def draw_enemies(self):
-        for enemy in self.enemies:
-            pygame.draw.circle(self.screen, RED, (int(enemy.x), int(enemy.y)), enemy.width // 2)
-            pygame.draw.line(
-                self.screen, RED,
-                (enemy.x, enemy.y),
-                (enemy.x + math.cos(enemy.angle) * 30,
-                 enemy.y + math.sin(enemy.angle) * 30),
-                3
-            )
+        # Only enemies in (or just outside) the view are drawn
+        visible = self.camera.visible(xs, ys, margin=40)
+        xs = xs[visible] - self.camera.x
+        ys = ys[visible] - self.camera.y
+        return self.enemy_sprite.draw_many(self.screen, xs, ys, angles[visible])
                 
-    def draw_bullets(self):
-        for bullet in self.bullets:
-            color = YELLOW if bullet.owner == 'player' else RED
-            pygame.draw.circle(self.screen, color, (int(bullet.x), int(bullet.y)), 5)
+    def draw_bullets(self, alpha=1.0):
+        bullets = self.bullets
+        xs, ys = bullets.lerp(alpha)
+        owners = bullets.owner[:bullets.count]
+        
+        visible = self.camera.visible(xs, ys, margin=10)
+        xs = xs[visible] - self.camera.x
+        ys = ys[visible] - self.camera.y
+        owners = owners[visible]
+        
+        # One batch per bullet color
+        rects = []
+        for owner, sprite in self.bullet_sprites.items():
+            mine = owners == owner
+            rects.extend(sprite.draw_many(self.screen, xs[mine], ys[mine]))
+        return rects
             
     def draw_hud(self):
+        rects = []
+        
+        self.hud_frame += 1
+        if self.hud_values is None or self.hud_frame >= self.hud_interval:
+            self.hud_frame = 0
+            self.hud_values = (self.player.health, self.player.ammo, self.score, self.enemies.alive_count())
+        health, ammo, score, alive = self.hud_values
+        
         # Health bar
         bar_width = 200
         bar_height = 30
         bar_x = 10
         bar_y = 10
-        health_percent = self.player.health / self.player.max_health
+        health_percent = health / self.player.max_health
         
         pygame.draw.rect(self.screen, DARK_GRAY, (bar_x, bar_y, bar_width, bar_height))
         pygame.draw.rect(self.screen, RED, (bar_x, bar_y, bar_width, bar_height))
         pygame.draw.rect(self.screen, GREEN, (bar_x, bar_y, int(bar_width * health_percent), bar_height))
-        pygame.draw.rect(self.screen, WHITE, (bar_x, bar_y, bar_width, bar_height), 2)
+        rects.append(pygame.draw.rect(self.screen, WHITE, (bar_x, bar_y, bar_width, bar_height), 2))
         
-        health_text = self.small_font.render(f"Health: {self.player.health}", True, WHITE)
-        self.screen.blit(health_text, (bar_x + 10, bar_y + 5))
+        rects.append(self.hud_health.draw(self.screen, health))
         
         # Ammo
-        ammo_text = self.small_font.render(f"Ammo: {self.player.ammo}", True, WHITE)
-        self.screen.blit(ammo_text, (10, 50))
+        rects.append(self.hud_ammo.draw(self.screen, ammo))
         
         # Score
-        score_text = self.small_font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 80))
+        rects.append(self.hud_score.draw(self.screen, score))
         
         # Enemies remaining
-        enemies_left = sum(1 for e in self.enemies if e.health > 0)
-        enemies_text = self.small_font.render(f"Enemies: {enemies_left}", True, WHITE)
-        self.screen.blit(enemies_text, (10, 110))
+        rects.append(self.hud_enemies.draw(self.screen, alive))
         
         # Crosshair
         center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-        pygame.draw.line(self.screen, WHITE, (center_x - 10, center_y), (center_x + 10, center_y), 2)
-        pygame.draw.line(self.screen, WHITE, (center_x, center_y - 10), (center_x, center_y + 10), 2)
+        rects.append(pygame.draw.line(self.screen, WHITE, (center_x - 10, center_y), (center_x + 10, center_y), 2))
+        rects.append(pygame.draw.line(self.screen, WHITE, (center_x, center_y - 10), (center_x, center_y + 10), 2))
+        return rects
+        
+    def render(self, alpha=1.0):
+        """Draw one frame, alpha of the way from the previous tick to the latest"""
+        if not self.interpolate:
+            alpha = 1.0
+        if self.first_person:
+            self.render_first_person(alpha)
+            return
+        
+        # Scroll the view with the player; any scroll repaints everything
+        camera = self.camera
+        old_view = (camera.x, camera.y)
+        camera.follow(*self.player_position(alpha))
+        
+        profiler = self.profiler
+        renderer = self.renderer
+        if renderer is None:
+            self.screen.fill(BLACK)
+            self.draw_map()
+            self.draw_enemies(alpha)
+            self.draw_player(alpha)
+            self.draw_bullets(alpha)
+            self.draw_hud()
+            profiler.lap('draw')
+            if self.show_profiler:
+                self.profiler_overlay.draw(self.screen)
+                profiler.lap('overlay')
+            pygame.display.flip()
+            profiler.lap('flip')
+            return
+            
+        if (camera.x, camera.y) != old_view:
+            renderer.invalidate()
+        if renderer.begin_frame():
+            self.screen.fill(BLACK)
+            self.draw_map()
+        renderer.add('enemies', self.draw_enemies(alpha))
+        renderer.add('player', self.draw_player(alpha))
+        renderer.add('bullets', self.draw_bullets(alpha))
+        
+        # The HUD is redrawn over the restored background every frame, but
+        # only pushed to the display when one of its values changed
+        hud_rects = self.draw_hud()
+        hud_changed = (self.hud_health.changed or self.hud_ammo.changed or
+                       self.hud_score.changed or self.hud_enemies.changed)
+        renderer.add('hud', hud_rects, hud_changed)
+        profiler.lap('draw')
+        if self.show_profiler:
+            renderer.add('profiler', [self.profiler_overlay.draw(self.screen)])
+            profiler.lap('overlay')
+        renderer.present()
+        profiler.lap('flip')
+    
+    def render_first_person(self, alpha=1.0):
+        """Draw the raycast view from the player's eyes, with the HUD on top"""
+        profiler = self.profiler
+        x, y = self.player_position(alpha)
+        self.raycaster.render(self.screen, x, y, self.player.angle, self.billboards(alpha))
+        self.draw_hud()
+        profiler.lap('draw')
+        if self.show_profiler:
+            self.profiler_overlay.draw(self.screen)
+            profiler.lap('overlay')
+        pygame.display.flip()
+        profiler.lap('flip')
+    
+    def billboards(self, alpha=1.0):
+        """Enemies and bullets as sprite groups for the raycaster"""
+        enemies = self.enemies
+        bullets = self.bullets
+        enemy_x, enemy_y = enemies.lerp(alpha)
+        bullet_x, bullet_y = bullets.lerp(alpha)
+        mine = bullets.owner[:bullets.count] == OWNER_PLAYER
+        
+        # Enemies stand on the floor; bullets fly just below eye level
+        return [
+            (enemy_x, enemy_y, enemies.width, RED, enemies.width / TILE_SIZE / 2),
+            (bullet_x[mine], bullet_y[mine], 6, YELLOW, 0.45),
+            (bullet_x[~mine], bullet_y[~mine], 6, RED, 0.45),
+        ]
         
     def check_bullet_collisions(self):
-        for bullet in self.bullets[:]:
-            if bullet.is_off_screen():
-                self.bullets.remove(bullet)
-                continue
+        bullets = self.bullets
+        n = bullets.count
+        if n == 0:
+            return
+            
+        # Off-screen and wall hits for every bullet at once
+        dead = bullets.dead_mask(self.wall_grid, self.map_data.pixel_width, self.map_data.pixel_height, TILE_SIZE)
+        x = bullets.x[:n]
+        y = bullets.y[:n]
+        owner = bullets.owner[:n]
+        
+        # Enemy bullets against the players
+        enemy_bullets = ~dead & (owner == OWNER_ENEMY)
+        for player in self.players:
+            dx = x - player.x
+            dy = y - player.y
+            hits = enemy_bullets & (dx*dx + dy*dy < player.width * player.width)
+            if hits.any():
+                taken = int(bullets.damage[:n][hits].sum())
+                player.health -= taken
+                self.damage_taken += taken
+                dead |= hits
+                enemy_bullets &= ~hits
+        if self.player.health <= 0:
+            self.running = False
+            
+        # Player bullets against enemies, with the broadphase done on whole
+        # arrays: each living enemy is listed under every tile its hit
+        # circle overlaps, and only bullets in one of those tiles are tested
+        candidates = np.flatnonzero(~dead & (owner == OWNER_PLAYER))
+        enemies = self.enemies
+        health = enemies.health
+        alive = np.flatnonzero(health[:enemies.count] > 0)
+        # With no enemy alive there is nothing to build or test
+        if len(candidates) and len(alive):
+            radius = enemies.width
+            ex = enemies.x[alive]
+            ey = enemies.y[alive]
+            x0 = np.floor_divide(ex - radius, TILE_SIZE).astype(np.int64)
+            x1 = np.floor_divide(ex + radius, TILE_SIZE).astype(np.int64)
+            y0 = np.floor_divide(ey - radius, TILE_SIZE).astype(np.int64)
+            y1 = np.floor_divide(ey + radius, TILE_SIZE).astype(np.int64)
+            # Tiles are numbered within the box around all enemies, so the
+            # table of them stays small whatever the map size
+            left = int(x0.min(initial=0))
+            top = int(y0.min(initial=0))
+            columns = int(x1.max(initial=0)) - left + 1
+            rows = int(y1.max(initial=0)) - top + 1
+            x0 -= left
+            x1 -= left
+            y0 -= top
+            y1 -= top
+            # A circle smaller than a tile covers at most its 2x2 corner tiles
+            wide = x1 != x0
+            tall = y1 != y0
+            cell_keys = np.concatenate([y0 * columns + x0, (y0 * columns + x1)[wide],
+                                        (y1 * columns + x0)[tall], (y1 * columns + x1)[wide & tall]])
+            cell_enemies = np.concatenate([alive, alive[wide], alive[tall], alive[wide & tall]])
+            order = np.lexsort((cell_enemies, cell_keys))
+            cell_enemies = cell_enemies[order]
+            cell_counts = np.bincount(cell_keys, minlength=columns * rows)
+            cell_starts = np.cumsum(cell_counts) - cell_counts
+            
+            # Bullets in a tile no enemy touches are done with
+            bx = np.floor_divide(x[candidates], TILE_SIZE).astype(np.int64) - left
+            by = np.floor_divide(y[candidates], TILE_SIZE).astype(np.int64) - top
+            inside = (bx >= 0) & (bx < columns) & (by >= 0) & (by < rows)
+            candidates = candidates[inside]
+            bullet_keys = by[inside] * columns + bx[inside]
+            counts = cell_counts[bullet_keys]
+            near = counts > 0
+            candidates = candidates[near]
+            counts = counts[near]
+            if len(candidates):
+                # Every (bullet, enemy) pair sharing a tile, then the radius test
+                pair_bullets = np.repeat(candidates, counts)
+                starts = np.repeat(cell_starts[bullet_keys[near]] - (np.cumsum(counts) - counts), counts)
+                pair_enemies = cell_enemies[starts + np.arange(len(pair_bullets))]
+                dx = x[pair_bullets] - enemies.x[pair_enemies]
+                dy = y[pair_bullets] - enemies.y[pair_enemies]
+                overlap = dx*dx + dy*dy < radius * radius
+                pair_bullets = pair_bullets[overlap]
+                pair_enemies = pair_enemies[overlap]
                 
-            # Check wall collision
-            grid_x = int(bullet.x / 64)
-            grid_y = int(bullet.y / 64)
-            if 0 <= grid_x < len(self.map_data[0]) and 0 <= grid_y < len(self.map_data):
-                if self.map_data[grid_y][grid_x] == 1:
-                    self.bullets.remove(bullet)
-                    continue
+                # Pairs come sorted by bullet, then enemy: a bullet is in one
+                # tile, whose enemies are listed in index order
+                group_starts = np.flatnonzero(np.diff(pair_bullets, prepend=-1))
+                group_sizes = np.diff(np.append(group_starts, len(pair_bullets)))
+                hitters = pair_bullets[group_starts]
+                
+                # Each bullet hits the first enemy it overlaps that is still
+                # alive when the bullet's turn comes, bullets taking turns in
+                # order. Resolved for all bullets at once: a bullet reaching an
+                # enemy already dealt its health by earlier bullets moves on to
+                # its next enemy, until no bullet moves. Earlier bullets never
+                # depend on later ones, so this settles on the in-order result
+                amounts = bullets.damage[hitters].astype(np.int64)
+                choice = np.zeros(len(hitters), dtype=np.int64)
+                while True:
+                    active = np.flatnonzero(choice < group_sizes)
+                    targets = pair_enemies[group_starts[active] + choice[active]]
+                    if len(active) == 0:
+                        break
+                    by_target = np.lexsort((active, targets))
+                    sorted_targets = targets[by_target]
+                    sorted_amounts = amounts[active[by_target]]
+                    # Damage each bullet's target took from earlier bullets
+                    dealt = np.cumsum(sorted_amounts)
+                    runs = np.flatnonzero(np.diff(sorted_targets, prepend=-1))
+                    run_lengths = np.diff(np.append(runs, len(sorted_targets)))
+                    earlier_runs = np.concatenate(([0], dealt[runs[1:] - 1]))
+                    before = dealt - sorted_amounts - np.repeat(earlier_runs, run_lengths)
+                    late = before >= health[sorted_targets]
+                    if not late.any():
+                        break
+                    choice[active[by_target[late]]] += 1
                     
-            # Check player collision
-            if bullet.owner == 'enemy':
-                dx = bullet.x - self.player.x
-                dy = bullet.y - self.player.y
-                dist_sq = dx*dx + dy*dy
-                if dist_sq < self.player.width * self.player.width:
-                    self.player.health -= bullet.damage
-                    self.bullets.remove(bullet)
-                    if self.player.health <= 0:
-                        self.running = False
-                    continue
+                # Only bullets that hit are applied one by one, in order, for
+                # the score and kill credit
+                for i, hit in zip(hitters[active].tolist(), targets.tolist()):
+                    amount = int(bullets.damage[i])
+                    self.shots_hit += 1
+                    self.damage_dealt += min(amount, int(health[hit]))
+                    if enemies.damage(hit, amount):
+                        self.score += 100
+                        self.kills += 1
+                    dead[i] = True
                     
-            # Check enemy collision
-            if bullet.owner == 'player':
-                for enemy in self.enemies:
-                    if enemy.health > 0:
-                        dx = bullet.x - enemy.x
-                        dy = bullet.y - enemy.y
-                        dist_sq = dx*dx + dy*dy
-                        if dist_sq < enemy.width * enemy.width:
-                            enemy.health -= bullet.damage
-                            self.bullets.remove(bullet)
-                            if enemy.health <= 0:
-                                self.score += 100
-                            break
+        bullets.keep(~dead)
                             
     def update_enemies(self):
+        enemies = self.enemies
+        
         # Remove dead enemies
-        self.enemies = [e for e in self.enemies if e.health > 0]
+        enemies.remove_dead()
         
-        for enemy in self.enemies:
-            enemy.update(self.player)
-            
-            # Enemy shoots at player (use cached distance)
-            if enemy.can_shoot():
-                if enemy.dist < 300 and random.random() < 0.02:
-                    enemy.shoot()
-                    self.bullets.append(Bullet(enemy.x, enemy.y, enemy.angle, 'enemy'))
+        # Route around walls along the flow field, which is only rebuilt
+        # when the player reaches a new tile
+        field = self.flow_field
+        field.update_goal(int(self.player.x // TILE_SIZE), int(self.player.y // TILE_SIZE), self.flow_executor)
+        n = enemies.count
+        waypoints = field.waypoints(enemies.x[:n], enemies.y[:n]) if field.goal is not None else None
+        
+        # Seek, separate and tick cooldowns for the whole horde at once
+        enemies.update(self.player.x, self.player.y, waypoints, self.wall_grid, TILE_SIZE)
+        
+        # Enemies shoot at the player when nothing blocks the line of sight
+        player = self.player
+        shooters = enemies.choose_shooters(
+            self.enemy_rng, chance=self.enemy_shot_chance,
+            can_see=lambda i: self.line_of_sight.can_see(enemies.x[i], enemies.y[i], player.x, player.y))
+        self.bullets.spawn_many(enemies.x[shooters], enemies.y[shooters], enemies.angle[shooters], 'enemy')
                     
     def spawn_enemy(self):
-        """Spawn a new enemy at a random position away from player"""
-        attempts = 0
-        max_attempts = 50
-        
-        while attempts < max_attempts:
-            # Spawn at edge of map
-            side = random.randint(0, 3)
-            if side == 0:  # Top
-                x = random.randint(64, SCREEN_WIDTH - 64)
-                y = 64
-            elif side == 1:  # Bottom
-                x = random.randint(64, SCREEN_WIDTH - 64)
-                y = SCREEN_HEIGHT - 64
-            elif side == 2:  # Left
-                x = 64
-                y = random.randint(64, SCREEN_HEIGHT - 64)
-            else:  # Right
-                x = SCREEN_WIDTH - 64
-                y = random.randint(64, SCREEN_HEIGHT - 64)
-            
-            # Check if spawn point is valid (not a wall and not too close to player)
-            grid_x = int(x / 64)
-            grid_y = int(y / 64)
-            dist_to_player = math.sqrt((x - self.player.x)**2 + (y - self.player.y)**2)
-            
-            if (0 <= grid_x < len(self.map_data[0]) and 0 <= grid_y < len(self.map_data) and
-                self.map_data[grid_y][grid_x] == 0 and dist_to_player > 200):
-                self.enemies.append(Enemy(x, y))
-                return
-                
-            attempts += 1
+        """Spawn a new enemy at a random open tile away from player"""
+        x, y = self.spawn_index.choose(self.rng, self.player.x, self.player.y,
+                                       SPAWN_MIN_DISTANCE, self.spawn_max_distance)
+        self.enemies.spawn(x, y)
         
-        # Fallback: spawn at fixed safe location
-        self.enemies.append(Enemy(50, 50))
+    def spawn_wave(self, count):
+        """Spawn count enemies at once, each on a random valid tile"""
+        xs, ys = self.spawn_index.sample(self.rng, self.player.x, self.player.y,
+                                         SPAWN_MIN_DISTANCE, self.spawn_max_distance, count)
+        self.enemies.spawn_many(xs, ys)
                 
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
-        
+    def update_spawning(self):
+        alive_enemies = self.enemies.alive_count()
+        if alive_enemies < self.max_enemies:
+            self.enemy_spawn_timer += 1
+            if self.enemy_spawn_timer >= self.enemy_spawn_delay * self.spawn_throttle:
+                self.spawn_enemy()
+                self.enemy_spawn_timer = 0
+        else:
+            self.enemy_spawn_timer = 0  # Reset timer if at max
+                
+    def handle_input(self, inputs):
         # Player movement
-        self.player.move(keys, self.map_data)
+        self.player.move(inputs, self.map_data, self.tick_scale)
         
         # Mouse look
-        mouse_rel = pygame.mouse.get_rel()
-        self.player.rotate(mouse_rel[0])
+        self.player.rotate(inputs.mouse_dx)
         
         # Shooting
-        if pygame.mouse.get_pressed()[0] and self.player.ammo > 0:
-            current_time = pygame.time.get_ticks()
-            if not hasattr(self, 'last_shot_time'):
-                self.last_shot_time = 0
-                
-            if current_time - self.last_shot_time > 200:  # Fire rate: 200ms
+        if inputs.fire and self.player.ammo > 0:
+            if self.ticks - self.last_shot_tick > self.fire_interval:
                 self.player.shoot()
+                self.shots_fired += 1
                 damage = self.player.stats[self.player.character]['damage']
-                self.bullets.append(Bullet(self.player.x, self.player.y, self.player.angle, 'player', damage))
-                self.last_shot_time = current_time
+                self.bullets.spawn(self.player.x, self.player.y, self.player.angle, 'player', damage)
+                self.last_shot_tick = self.ticks
                 
         # Reload
-        if keys[pygame.K_r]:
+        if inputs.reload:
             if self.player.ammo < 30:
                 self.player.ammo = 30
                 
-    async def run(self):
-        while self.running:
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                        
-            # Handle input
-            self.handle_input()
+    def step(self, inputs=None):
+        """Advance the simulation by one tick without drawing anything"""
+        if inputs is None:
+            inputs = InputFrame()
             
-            # Update enemies
-            self.update_enemies()
+        # Remember where everything was for render interpolation
+        self.player.prev_x = self.player.x
+        self.player.prev_y = self.player.y
+        self.enemies.save_previous()
+        self.bullets.save_previous()
+        
+        if self.recorder is not None:
+            self.recorder.record_input(inputs)
             
-            # Spawn new enemies if needed
-            alive_enemies = sum(1 for e in self.enemies if e.health > 0)
-            if alive_enemies < self.max_enemies:
-                self.enemy_spawn_timer += 1
-                if self.enemy_spawn_timer >= self.enemy_spawn_delay:
-                    self.spawn_enemy()
-                    self.enemy_spawn_timer = 0
-            else:
-                self.enemy_spawn_timer = 0  # Reset timer if at max
+        profiler = self.profiler
+        
+        # Handle input
+        self.handle_input(inputs)
+        profiler.lap('input')
+        
+        # Update enemies
+        self.update_enemies()
+        profiler.lap('enemies')
+        
+        # Spawn new enemies if needed
+        self.update_spawning()
+        profiler.lap('spawn')
+        
+        # Update bullets
+        self.bullets.update()
+        profiler.lap('bullets')
             
-            # Update bullets
-            for bullet in self.bullets:
-                bullet.update()
+        # Check collisions
+        self.check_bullet_collisions()
+        profiler.lap('collisions')
+        
+        self.ticks += 1
+        if self.recorder is not None:
+            self.recorder.checkpoint(self)
+        return self.running
+        
+    def run_headless(self, inputs, max_ticks=None):
+        """Step through InputFrames as fast as possible; returns ticks simulated"""
+        start = self.ticks
+        profiler = self.profiler
+        for frame in inputs:
+            if max_ticks is not None and self.ticks - start >= max_ticks:
+                break
+            profiler.begin_frame()
+            running = self.step(frame)
+            profiler.end_frame()
+            if not running:
+                break
+        return self.ticks - start
+        
+    async def run(self):
+        """Sample input, tick, collect background work, draw and wait, per frame"""
+        profiler = self.profiler
+        pacer = self.pacer
+        self.start_workers()
+        pacer.start()
+        try:
+            while self.running:
+                frame_start = time.perf_counter()
+                profiler.begin_frame()
                 
-            # Check collisions
-            self.check_bullet_collisions()
+                inputs = self.sample_input()
+                profiler.lap('events')
                 
-            # Draw everything
-            self.screen.fill(BLACK)
-            self.draw_map()
-            self.draw_enemies()
-            self.draw_player()
-            self.draw_bullets()
-            self.draw_hud()
+                tick_start = time.perf_counter()
+                alpha = self.simulate(inputs, pacer.elapsed_ms())
+                tick_time = time.perf_counter() - tick_start
+                
+                # Work finished in the background since the last frame
+                self.workers.poll()
+                profiler.lap('workers')
+                
+                # Draw everything, interpolated between the last two ticks
+                self.render(alpha)
+                if self.on_first_frame is not None:
+                    self.on_first_frame()
+                    self.on_first_frame = None
+                busy_time = time.perf_counter() - frame_start
+                
+                # Other tasks and the browser event loop run while we wait
+                await pacer.wait()
+                profiler.lap('wait')
+                profiler.end_frame()
+                self.governor.record(busy_time * 1000, tick_time * 1000)
+        finally:
+            self.stop_workers()
             
-            pygame.display.flip()
-            self.clock.tick(FPS)
+    def sample_input(self):
+        """Handle window and hotkey events, and read this frame's input"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key == pygame.K_F2:
+                    self.toggle_view()
+                elif event.key == pygame.K_F3:
+                    self.toggle_profiler()
+                elif event.key == pygame.K_F5:
+                    self.quick_save()
+                elif event.key == pygame.K_F9:
+                    self.quick_load()
+        inputs = InputFrame.from_pygame()
+        self.pending_turn += inputs.mouse_dx
+        return inputs
+        
+    def simulate(self, inputs, elapsed_ms):
+        """Run the ticks elapsed_ms calls for; returns the interpolation alpha"""
+        tick_ms = 1000 / self.sim_rate
+        self.accumulator += elapsed_ms
+        steps = 0
+        while self.accumulator >= tick_ms and self.running:
+            # Past the catch-up limit the backlog is dropped
+            if steps == MAX_CATCH_UP_TICKS:
+                self.accumulator = 0.0
+                break
+            # Mouse look is applied once, on the first tick that runs
+            inputs.mouse_dx = self.pending_turn
+            self.pending_turn = 0
+            self.step(inputs)
+            self.accumulator -= tick_ms
+            steps += 1
+        return self.accumulator / tick_ms
+        
+    def start_workers(self):
+        """Move work that needn't finish within a frame to background workers"""
+        # Large maps build flow fields in a process; recordings keep them
+        # in-line, as a field arriving a tick later would change the replay
+        windowed = self.flow_field.max_radius is not None
+        self.workers = WorkerPool(processes=1 if windowed else 0)
+        if self.recorder is None:
+            self.flow_executor = self.workers.processes
+        self.line_of_sight.executor = self.workers.threads
+        self.profiler_overlay.executor = self.workers.threads
+        
+    def stop_workers(self):
+        """Finish background work, including pending saves"""
+        self.flow_executor = None
+        self.line_of_sight.executor = None
+        self.profiler_overlay.executor = None
+        self.workers.shutdown()
+        
+    def quick_save(self):
+        # A replay only holds inputs, so a recording can't jump between states
+        if self.recorder is not None:
+            logger.info("quicksave is disabled while recording")
+            return
+        self.quicksave = save_state(self)
+        if self.quicksave_path:
+            self.workers.submit(write_bytes, self.quicksave_path, self.quicksave)
+            
+    def quick_load(self):
+        """Restore the last quicksave, or the one at quicksave_path"""
+        if self.recorder is not None:
+            logger.info("quickload is disabled while recording")
+            return
+        if self.quicksave:
+            load_state(self, self.quicksave)
+        elif self.quicksave_path and os.path.exists(self.quicksave_path):
+            read_state(self, self.quicksave_path)
             
-            # Yield control to browser event loop
-            await asyncio.sleep(0)
+    def toggle_profiler(self):
+        """Show or hide the profiler overlay"""
+        self.show_profiler = not self.show_profiler
+        self.profiler.set_enabled(self.show_profiler or self.always_profile)
+        if self.renderer:
+            self.renderer.invalidate()
             
-        pygame.quit()
+    def load_levels(self):
+        """What the governor may shed, cheapest loss of fidelity first"""
+        return [
+            LoadLevel('spawns', "spawn enemies half as often", self.throttle_spawns,
+                      lambda: self.recorder is None),
+            LoadLevel('hud', "refresh HUD values and profiler table less often", self.slow_hud),
+            LoadLevel('detail', "cast every other first-person ray", self.lower_detail,
+                      lambda: self.first_person),
+            LoadLevel('cosmetic', "skip interpolation and enemy facing lines", self.drop_cosmetics),
+        ]
+        
+    def throttle_spawns(self, on):
+        # Spawn timing is simulation state; recorded sessions leave it alone
+        # so their replays stay exact
+        if self.recorder is None:
+            self.spawn_throttle = 2 if on else 1
+            
+    def slow_hud(self, on):
+        self.hud_interval = 4 if on else 1
+        self.profiler_overlay.refresh_frames = 60 if on else 15
+        
+    def lower_detail(self, on):
+        self.raycaster.column_step = 2 if on else 1
         
+    def drop_cosmetics(self, on):
+        self.interpolate = not on
+        if on:
+            self.enemy_sprite = self.sprites.disc(RED, self.enemies.width // 2)
+        else:
+            self.enemy_sprite = self.sprites.rotated(RED, self.enemies.width // 2)
+        if self.renderer:
+            self.renderer.invalidate()
+            
+    def toggle_view(self):
+        """Switch between the top-down and first-person views"""
+        self.first_person = not self.first_person
+        if self.renderer:
+            self.renderer.invalidate()
+    
     def show_victory_screen(self):
         pygame.time.wait(1000)
         self.screen.fill(BLACK)
@@ -453,17 +988,85 @@ class FPSGame:
         self.screen.blit(restart_text, (SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 50))
         pygame.display.flip()
 
-async def main():
-    # Character selection
+def preload_game(assets):
+    """Build the default map and game assets a step at a time, then return the map"""
+    for size in (36, 24, 18):
+        assets.font(size)
+        yield
+    tile_map = FPSGame.create_map()
+    layer = assets.map_layer(tile_map, TILE_SIZE)
+    whole_map = pygame.Rect(0, 0, layer.width, layer.height)
+    for chunk_x, chunk_y in itertools.islice(layer.visible_chunks(whole_map), layer.max_resident):
+        layer.get_chunk(chunk_x, chunk_y)
+        yield
+    # Every character's sprite, since the choice isn't made yet
+    for stats in CHARACTER_STATS.values():
+        assets.sprites.rotated(stats['color'], PLAYER_WIDTH // 2)
+        yield
+    assets.sprites.rotated(RED, ENEMY_WIDTH // 2)
+    assets.sprites.disc(YELLOW, 5)
+    assets.sprites.disc(RED, 5)
+    return tile_map
+
+async def main(record_path=None, seed=None, profile_path=None, first_person=False, governor=True,
+               quicksave_path=None, startup_probe=False):
     from character_select import CharacterSelect
-    select = CharacterSelect()
-    selected_char = await select.run()
+    from scenes import SceneManager
     
-    if selected_char:
-        # Start game with selected character
-        game = FPSGame(selected_char)
-        await game.run()
+    # One window and asset registry for both scenes. The game's map and
+    # assets are built in the background while a character is chosen
+    manager = SceneManager((SCREEN_WIDTH, SCREEN_HEIGHT), started=STARTED)
+    autopilot = asyncio.ensure_future(manager.autopilot()) if startup_probe else None
+    try:
+        select = CharacterSelect(manager.screen, manager.assets)
+        select.on_first_frame = lambda: manager.mark('first_frame')
+        manager.preload(preload_game(manager.assets))
+        selected_char = await select.run()
+        manager.mark('selected')
+        
+        if selected_char:
+            # Start game with selected character
+            game = FPSGame(selected_char, seed=seed, profile=profile_path is not None, first_person=first_person,
+                           governor=governor, tile_map=await manager.preloaded(), screen=manager.screen,
+                           assets=manager.assets)
+            game.quicksave_path = quicksave_path
+            
+            def first_game_frame():
+                manager.mark('first_game_frame')
+                manager.report()
+            game.on_first_frame = first_game_frame
+            if record_path:
+                from replay import Recorder
+                game.recorder = Recorder.for_game(game)
+            await game.run()
+            if record_path:
+                game.recorder.save(record_path)
+            if profile_path:
+                game.profiler.export(profile_path)
+    finally:
+        if autopilot is not None:
+            autopilot.cancel()
+        manager.close()
+    if startup_probe:
+        print(json.dumps(manager.startup()))
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Top-down FPS game")
+    parser.add_argument('--record', metavar='PATH', help="record inputs to a replay file")
+    parser.add_argument('--seed', type=int, help="random seed for the session")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="profile every frame and export the last 600 on exit (.csv or Chrome trace .json)")
+    parser.add_argument('--first-person', action='store_true', help="start in the first-person view (F2 toggles)")
+    parser.add_argument('--no-governor', action='store_true', help="never shed load when frames run over budget")
+    parser.add_argument('--quicksave', metavar='PATH', help="also write F5 quicksaves to a file, which F9 can load")
+    parser.add_argument('--startup-probe', action='store_true',
+                        help="pick the first character, quit after the first game frame and print startup "
+                             "timings as JSON (used by benchmark.py)")
+    args = parser.parse_args()
+    
+    # Governor decisions and startup timings are logged at INFO
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s: %(message)s')
+    asyncio.run(main(args.record, args.seed, args.profile, args.first_person, not args.no_governor, args.quicksave,
+                     args.startup_probe))
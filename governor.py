@@ -0,0 +1,149 @@
+import logging
+import statistics
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LoadLevel:
+    """One step of load shedding: a name, why it helps, and a switch.
+    
+    effective, if given, tells whether switching the level changes any
+    work right now; a level that does not is passed over.
+    """
+    def __init__(self, name, description, apply, effective=None):
+        self.name = name
+        self.description = description
+        self.apply = apply
+        self.effective = effective
+    
+    def helps(self):
+        return self.effective is None or self.effective()
+
+
+class FrameGovernor:
+    """Keeps frames within a time budget by shedding work in a fixed order.
+    
+    record() is fed the busy time of every frame (everything but waiting
+    for the next one) and the part of it spent in simulation ticks. Once a
+    full window of frames averages over shed_above of the budget, the next
+    level is switched on; once a window averages under restore_below and
+    at least hold_frames have passed since the last change, the most
+    recent level is switched off again. The gap between the two thresholds
+    and the longer hold before restoring keep it from flapping. Levels
+    that would change nothing at the moment are switched along with the
+    next one, so every step makes a difference.
+    
+    Every change is kept in decisions and logged.
+    """
+    def __init__(self, levels, budget_ms, shed_above=0.9, restore_below=0.6,
+                 window=30, hold_frames=180, history=256):
+        self.levels = levels
+        self.budget_ms = budget_ms
+        self.shed_above = shed_above
+        self.restore_below = restore_below
+        self.window = window
+        self.hold_frames = hold_frames
+        self.level = 0
+        self.frames = 0
+        self.last_change = 0
+        self.frame_ms = deque(maxlen=window)
+        self.tick_ms = deque(maxlen=window)
+        self.decisions = deque(maxlen=history)
+        self.enabled = True
+    
+    @property
+    def level_name(self):
+        return self.levels[self.level - 1].name if self.level else 'normal'
+    
+    @property
+    def active(self):
+        """Names of the levels currently shed, in order"""
+        return [level.name for level in self.levels[:self.level]]
+    
+    def record(self, frame_ms, tick_ms=0.0):
+        """Account one frame; returns the decision taken, if any"""
+        self.frames += 1
+        if not self.enabled:
+            return None
+        self.frame_ms.append(frame_ms)
+        self.tick_ms.append(tick_ms)
+        if len(self.frame_ms) < self.window:
+            return None
+        
+        load = statistics.fmean(self.frame_ms) / self.budget_ms
+        since = self.frames - self.last_change
+        if load > self.shed_above and self.level < len(self.levels):
+            return self.change(+1, load)
+        if load < self.restore_below and self.level > 0 and since >= self.hold_frames:
+            return self.change(-1, load)
+        return None
+    
+    def change(self, direction, load):
+        if direction > 0:
+            action = 'shed'
+            reason = f"frames averaged {load:.0%} of the {self.budget_ms:.1f} ms budget (limit {self.shed_above:.0%})"
+        else:
+            action = 'restore'
+            reason = f"frames averaged {load:.0%} of the budget (below {self.restore_below:.0%})"
+        passed = []
+        while True:
+            if direction > 0:
+                level = self.levels[self.level]
+                self.level += 1
+                more = self.level < len(self.levels)
+            else:
+                level = self.levels[self.level - 1]
+                self.level -= 1
+                more = self.level > 0
+            level.apply(direction > 0)
+            if level.helps() or not more:
+                break
+            passed.append(level.name)
+        if passed:
+            reason += f", passing over {', '.join(passed)}"
+        
+        decision = {
+            'frame': self.frames,
+            'time': time.time(),
+            'action': action,
+            'name': level.name,
+            'passed': passed,
+            'level': self.level,
+            'load': load,
+            'frame_ms': statistics.fmean(self.frame_ms),
+            'tick_ms': statistics.fmean(self.tick_ms),
+            'reason': reason,
+        }
+        self.decisions.append(decision)
+        logger.info("frame %d: %s %s (%s) -> level %d: %s", self.frames, action, level.name,
+                    level.description, self.level, reason)
+        
+        # Judge the new level on frames drawn under it only
+        self.last_change = self.frames
+        self.frame_ms.clear()
+        self.tick_ms.clear()
+        return decision
+    
+    def reset(self):
+        """Restore every shed level"""
+        while self.level:
+            self.levels[self.level - 1].apply(False)
+            self.level -= 1
+        self.last_change = self.frames
+        self.frame_ms.clear()
+        self.tick_ms.clear()
+    
+    def status(self):
+        """Current level and recent load, for overlays and monitoring"""
+        return {
+            'level': self.level,
+            'name': self.level_name,
+            'active': self.active,
+            'enabled': self.enabled,
+            'frame_ms': statistics.fmean(self.frame_ms) if self.frame_ms else 0.0,
+            'tick_ms': statistics.fmean(self.tick_ms) if self.tick_ms else 0.0,
+            'budget_ms': self.budget_ms,
+            'decisions': len(self.decisions),
+        }
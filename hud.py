@@ -0,0 +1,64 @@
+import pygame
+
+
+class CachedText:
+    """Text surface that is only re-rendered when its value changes"""
+    def __init__(self, font, template, color):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surface = None
+        
+    def render(self, value):
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.font.render(self.template.format(value), True, self.color)
+        return self.surface
+
+
+class GlyphAtlas:
+    """Pre-rendered glyphs so numbers can be drawn without font.render"""
+    def __init__(self, font, color, chars='0123456789-'):
+        self.glyphs = {char: font.render(char, True, color) for char in chars}
+        self.height = max(glyph.get_height() for glyph in self.glyphs.values())
+        
+    def width(self, text):
+        return sum(self.glyphs[char].get_width() for char in text)
+        
+    def draw(self, screen, text, pos):
+        x, y = pos
+        sequence = []
+        for char in text:
+            glyph = self.glyphs[char]
+            sequence.append((glyph, (x, y)))
+            x += glyph.get_width()
+        screen.blits(sequence, False)
+        return pygame.Rect(pos[0], y, x - pos[0], self.height)
+
+
+class HudField:
+    """One labelled HUD value such as "Ammo: 30".
+    
+    Without an atlas the whole line is a CachedText. With an atlas the label
+    is rendered once and the number is assembled from pre-rendered glyphs.
+    """
+    def __init__(self, font, template, color, pos, atlas=None):
+        self.pos = pos
+        self.atlas = atlas
+        self.last_value = None
+        self.changed = True
+        if atlas is None:
+            self.text = CachedText(font, template, color)
+        else:
+            self.label = font.render(template.replace('{}', ''), True, color)
+            
+    def draw(self, screen, value):
+        self.changed = value != self.last_value
+        self.last_value = value
+        if self.atlas is None:
+            return screen.blit(self.text.render(value), self.pos)
+            
+        rect = screen.blit(self.label, self.pos)
+        number = self.atlas.draw(screen, str(value), (rect.right, self.pos[1]))
+        return rect.union(number)
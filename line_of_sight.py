@@ -0,0 +1,235 @@
+from collections import OrderedDict
+
+import numpy as np
+
+OPEN = 0
+
+# Maps with at most this many open tiles get a full visibility table
+PRECOMPUTE_LIMIT = 512
+# Tile pairs remembered on larger maps before the least recently used go
+CACHE_SIZE = 1 << 16
+# Lines traced per batch while building the table
+BUILD_CHUNK = 1 << 16
+
+
+def trace_lines(walls, ax, ay, bx, by):
+    """Whether each line between tile centers crosses no wall tile.
+    
+    Lines are walked cell by cell with DDA, all of them at once, and stop
+    at their first wall. The end tile counts, the start tile does not. A
+    line passing exactly through a tile corner is blocked by a wall on
+    either side of it, so nothing is seen through diagonal gaps.
+    """
+    ax = np.asarray(ax, dtype=np.int64)
+    ay = np.asarray(ay, dtype=np.int64)
+    dx = np.asarray(bx, dtype=np.int64) - ax
+    dy = np.asarray(by, dtype=np.int64) - ay
+    step_x = np.sign(dx)
+    step_y = np.sign(dy)
+    # Where the line next crosses a vertical/horizontal grid line, as a
+    # fraction of its length scaled by 2 |dx| |dy| so ties compare exactly.
+    # Lines that never cross one direction get a value that never wins
+    size_x = np.abs(dx)
+    size_y = np.abs(dy)
+    never = 4 * (int(size_x.max(initial=0)) + 1) * (int(size_y.max(initial=0)) + 1)
+    side_x = np.where(dx != 0, size_y, never)
+    side_y = np.where(dy != 0, size_x, never)
+    x = ax.copy()
+    y = ay.copy()
+    remaining = size_x + size_y
+    clear = np.ones(len(ax), dtype=bool)
+    
+    active = np.flatnonzero(remaining > 0)
+    while len(active):
+        along_x = side_x[active] <= side_y[active]
+        corner = active[side_x[active] == side_y[active]]
+        # The tile diagonal to the step taken at a corner
+        clear[corner] &= walls[y[corner] + step_y[corner], x[corner]] == OPEN
+        sx = active[along_x]
+        sy = active[~along_x]
+        x[sx] += step_x[sx]
+        side_x[sx] += 2 * size_y[sx]
+        y[sy] += step_y[sy]
+        side_y[sy] += 2 * size_x[sy]
+        
+        blocked = walls[y[active], x[active]] != OPEN
+        clear[active[blocked]] = False
+        remaining[active] -= 1
+        active = active[clear[active] & (remaining[active] > 0)]
+    return clear
+
+
+def build_table(walls, limit=PRECOMPUTE_LIMIT):
+    """Visibility between every pair of open tiles, as packed bit rows.
+    
+    Returns the table and the row of each tile in it (-1 for walls), or
+    (None, None) when there are more than limit open tiles.
+    """
+    ys, xs = np.nonzero(walls == OPEN)
+    count = len(xs)
+    if count > limit:
+        return None, None
+    
+    # Trace every pair once, lower index first, then mirror
+    first, second = np.triu_indices(count, 1)
+    visible = np.zeros((count, count), dtype=bool)
+    for start in range(0, len(first), BUILD_CHUNK):
+        i = first[start:start + BUILD_CHUNK]
+        j = second[start:start + BUILD_CHUNK]
+        clear = trace_lines(walls, xs[i], ys[i], xs[j], ys[j])
+        visible[i[clear], j[clear]] = True
+    visible |= visible.T
+    visible[np.arange(count), np.arange(count)] = True
+    
+    open_index = np.full(walls.shape, -1, dtype=np.int32)
+    open_index[ys, xs] = np.arange(count, dtype=np.int32)
+    return np.packbits(visible, axis=1), open_index
+
+
+class LineOfSight:
+    """Tile-to-tile visibility queries against a TileMap.
+    
+    Two tiles see each other when the line between their centers crosses
+    no wall. Small maps answer from a bitset holding every pair of open
+    tiles, built up front; larger maps trace lines on demand and keep
+    the answers in a least-recently-used cache. Either way a batch of
+    queries costs array operations plus at most one batched trace.
+    
+    Lines are always traced from the tile with the lower index, so
+    visibility is symmetric.
+    """
+    def __init__(self, tile_map, precompute_limit=PRECOMPUTE_LIMIT, cache_size=CACHE_SIZE):
+        self.tile_map = tile_map
+        self.tile_size = tile_map.tile_size
+        self.walls = tile_map.as_array()
+        self.precompute_limit = precompute_limit
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.table = None
+        self.open_index = None
+        self.dirty = True
+        # Set to rebuild the table in the background after map edits
+        self.executor = None
+        self.version = 0
+        self.pending = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build()
+    
+    @property
+    def precomputed(self):
+        if self.dirty:
+            self.build()
+        elif self.pending is not None:
+            self.poll()
+        return self.table is not None
+    
+    def build(self):
+        """Build the visibility table if the map is small enough"""
+        self.dirty = False
+        self.cache.clear()
+        self.table, self.open_index = build_table(self.walls, self.precompute_limit)
+    
+    def rebuild_async(self):
+        """Rebuild the table on self.executor; queries trace lines meanwhile"""
+        if self.pending is None:
+            future = self.executor.submit(build_table, self.walls.copy(), self.precompute_limit)
+            self.pending = (self.version, future)
+    
+    def poll(self):
+        """Install a finished background build, or start another if the map
+        changed while it ran"""
+        if self.pending is None or not self.pending[1].done():
+            return
+        version, future = self.pending
+        self.pending = None
+        if version == self.version:
+            self.table, self.open_index = future.result()
+        else:
+            self.rebuild_async()
+    
+    def tile_changed(self, x, y):
+        """Note a map edit; the table is rebuilt or the cache dropped on the next query.
+        
+        With an executor set, the table is rebuilt in the background
+        instead, and queries are answered by tracing until it is ready.
+        """
+        self.version += 1
+        if self.executor is None:
+            self.dirty = True
+            return
+        self.cache.clear()
+        self.table = None
+        self.open_index = None
+        self.rebuild_async()
+    
+    def visible(self, ax, ay, bx, by):
+        """Whether tile (ax, ay) can see tile (bx, by)"""
+        return bool(self.visible_many([ax], [ay], [bx], [by])[0])
+    
+    def visible_many(self, ax, ay, bx, by):
+        """Visibility between arrays of tiles (broadcast against each other)"""
+        ax, ay, bx, by = (np.asarray(a, dtype=np.int64) for a in np.broadcast_arrays(ax, ay, bx, by))
+        ax, ay, bx, by = ax.ravel(), ay.ravel(), bx.ravel(), by.ravel()
+        if len(ax) == 0:
+            return np.zeros(0, dtype=bool)
+        height, width = self.walls.shape
+        inside = ((ax >= 0) & (ax < width) & (ay >= 0) & (ay < height) &
+                  (bx >= 0) & (bx < width) & (by >= 0) & (by < height))
+        result = np.zeros(len(ax), dtype=bool)
+        if not inside.all():
+            ax, ay, bx, by = ax[inside], ay[inside], bx[inside], by[inside]
+        
+        if self.precomputed:
+            i = self.open_index[ay, ax]
+            j = self.open_index[by, bx]
+            open_ends = (i >= 0) & (j >= 0)
+            i, j = i[open_ends], j[open_ends]
+            bits = (self.table[i, j >> 3] >> (7 - (j & 7))) & 1
+            seen = np.zeros(len(ax), dtype=bool)
+            seen[open_ends] = bits.astype(bool)
+        else:
+            seen = self.lookup(ax, ay, bx, by)
+        result[inside] = seen
+        return result
+    
+    def lookup(self, ax, ay, bx, by):
+        """Cached visibility, tracing all cache misses in one batch"""
+        width = self.walls.shape[1]
+        a = ay * width + ax
+        b = by * width + bx
+        swap = a > b
+        ax, ay, bx, by = (np.where(swap, bx, ax), np.where(swap, by, ay),
+                          np.where(swap, ax, bx), np.where(swap, ay, by))
+        keys = (np.minimum(a, b) * (width * self.walls.shape[0]) + np.maximum(a, b)).tolist()
+        
+        cache = self.cache
+        seen = np.zeros(len(keys), dtype=bool)
+        missing = []
+        for n, key in enumerate(keys):
+            value = cache.get(key)
+            if value is None:
+                missing.append(n)
+            else:
+                cache.move_to_end(key)
+                seen[n] = value
+        self.hits += len(keys) - len(missing)
+        if missing:
+            self.misses += len(missing)
+            missing = np.array(missing)
+            clear = trace_lines(self.walls, ax[missing], ay[missing], bx[missing], by[missing])
+            seen[missing] = clear
+            for key, value in zip([keys[n] for n in missing.tolist()], clear.tolist()):
+                cache[key] = value
+            excess = len(cache) - self.cache_size
+            for _ in range(max(0, excess)):
+                cache.popitem(last=False)
+            self.evictions += max(0, excess)
+        return seen
+    
+    def can_see(self, xs, ys, target_x, target_y):
+        """Visibility from points to targets in world pixels, by their tiles"""
+        size = self.tile_size
+        return self.visible_many(np.floor_divide(xs, size), np.floor_divide(ys, size),
+                                 np.floor_divide(target_x, size), np.floor_divide(target_y, size))
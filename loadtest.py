@@ -0,0 +1,106 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+# The server simulates headless; pygame never needs a display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from fps_game import CHARACTER_STATS, InputFrame, TILE_SIZE
+from server import GameClient, GameServer, ServerGame
+from tilemap import TileMap
+
+
+async def simulated_client(host, port, seed, stop):
+    """Connect, then wander, turn and shoot at random until stop is set"""
+    rng = random.Random(seed)
+    client = GameClient()
+    await client.connect(host, port, rng.choice(list(CHARACTER_STATS)))
+    receiver = asyncio.create_task(client.receive())
+    interval = 1 / client.sim_rate
+    inputs = InputFrame()
+    tick = 0
+    while not stop.is_set():
+        if tick % 60 == 0:
+            inputs = InputFrame(up=rng.random() < 0.6, left=rng.random() < 0.3, right=rng.random() < 0.3,
+                                fire=rng.random() < 0.7)
+        inputs.mouse_dx = rng.randint(-20, 20)
+        inputs.reload = tick % 180 == 0
+        client.send_input(inputs)
+        tick += 1
+        await asyncio.sleep(interval)
+    await client.close()
+    await receiver
+    return client
+
+
+async def measure(player_count, duration, map_path=None, snapshot_interval=2, warmup=1.0, seed=1):
+    game = ServerGame(map_path=map_path, seed=seed)
+    server = GameServer(game, snapshot_interval=snapshot_interval)
+    await server.start()
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(simulated_client(server.host, server.port, seed + i, stop))
+             for i in range(player_count)]
+    await asyncio.sleep(warmup)
+    server.reset_stats()
+    await asyncio.sleep(duration)
+    stats = server.stats()
+    connections = list(server.clients.values())
+    sent = sum(client.bytes_sent for client in connections)
+    snapshots = sum(client.snapshots_sent for client in connections)
+    stats['players'] = player_count
+    stats['enemies'] = game.enemies.count
+    stats['bullets'] = game.bullets.count
+    stats['kb_per_s_per_client'] = sent / max(1, len(connections)) / duration / 1024
+    stats['snapshot_bytes_mean'] = sent / max(1, snapshots)
+    stats['snapshots_skipped'] = sum(client.snapshots_skipped for client in connections)
+    stop.set()
+    clients = await asyncio.gather(*tasks)
+    stats['missing_bases'] = sum(client.missing_bases for client in clients)
+    await server.stop()
+    return stats
+
+
+async def run_load_test(player_counts, duration, map_path=None, snapshot_interval=2):
+    print(f"{'players':>7} {'tick ms':>8} {'p95':>7} {'max':>7} {'snap ms':>8} {'late':>5} "
+          f"{'enemies':>7} {'bullets':>7} {'KB/s/client':>11} {'bytes/snap':>10}")
+    results = []
+    for count in player_counts:
+        stats = await measure(count, duration, map_path, snapshot_interval)
+        results.append(stats)
+        print(f"{count:>7} {stats['tick_ms_mean']:>8.3f} {stats['tick_ms_p95']:>7.3f} {stats['tick_ms_max']:>7.3f} "
+              f"{stats['snapshot_ms_mean']:>8.3f} {stats['late_ticks']:>5} {stats['enemies']:>7} "
+              f"{stats['bullets']:>7} {stats['kb_per_s_per_client']:>11.2f} {stats['snapshot_bytes_mean']:>10.0f}",
+              flush=True)
+    return results
+
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Load-test the game server with simulated clients on loopback")
+    parser.add_argument('--players', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--duration', type=float, default=5, help="seconds measured per player count")
+    parser.add_argument('--map', help="map file to serve")
+    parser.add_argument('--map-size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'),
+                        help="serve a generated map of this many tiles instead")
+    parser.add_argument('--snapshot-interval', type=int, default=2)
+    args = parser.parse_args(argv)
+    
+    map_path = args.map
+    if args.map_size:
+        handle, map_path = tempfile.mkstemp(suffix='.tmap')
+        os.close(handle)
+        TileMap.generate(*args.map_size, seed=1, tile_size=TILE_SIZE).save(map_path)
+    try:
+        asyncio.run(run_load_test(args.players, args.duration, map_path, args.snapshot_interval))
+    finally:
+        if args.map_size:
+            os.remove(map_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import pygame
+
+# Colors
+BLACK = (0, 0, 0)
+GRAY = (128, 128, 128)
+DARK_GRAY = (64, 64, 64)
+
+
+class MapLayer:
+    """Pre-rendered static tile layer.
+    
+    The map is cut into square chunks of chunk_tiles x chunk_tiles tiles.
+    Each chunk is rendered to an off-screen surface the first time it comes
+    into view and then blitted in one call per chunk. Chunks that leave the
+    view are kept around up to max_resident, least recently used first out.
+    """
+    def __init__(self, map_data, tile_size=64, chunk_tiles=16, max_resident=64):
+        self.map_data = map_data
+        self.tile_size = tile_size
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = tile_size * chunk_tiles
+        self.max_resident = max_resident
+        self.chunks = OrderedDict()
+        
+    @property
+    def width(self):
+        return len(self.map_data[0]) * self.tile_size
+        
+    @property
+    def height(self):
+        return len(self.map_data) * self.tile_size
+        
+    def draw_tile(self, surface, tile_x, tile_y, left, top):
+        rect = pygame.Rect(left, top, self.tile_size, self.tile_size)
+        if self.map_data[tile_y][tile_x] == 1:
+            pygame.draw.rect(surface, DARK_GRAY, rect)
+            pygame.draw.rect(surface, BLACK, rect, 2)
+        else:
+            pygame.draw.rect(surface, GRAY, rect)
+            pygame.draw.rect(surface, BLACK, rect, 1)
+            
+    def render_chunk(self, chunk_x, chunk_y):
+        rows = len(self.map_data)
+        cols = len(self.map_data[0])
+        first_x = chunk_x * self.chunk_tiles
+        first_y = chunk_y * self.chunk_tiles
+        last_x = min(first_x + self.chunk_tiles, cols)
+        last_y = min(first_y + self.chunk_tiles, rows)
+        
+        surface = pygame.Surface(((last_x - first_x) * self.tile_size, (last_y - first_y) * self.tile_size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        for tile_y in range(first_y, last_y):
+            for tile_x in range(first_x, last_x):
+                self.draw_tile(surface, tile_x, tile_y,
+                               (tile_x - first_x) * self.tile_size,
+                               (tile_y - first_y) * self.tile_size)
+        return surface
+        
+    def get_chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self.render_chunk(chunk_x, chunk_y)
+            self.chunks[key] = surface
+        else:
+            self.chunks.move_to_end(key)
+        return surface
+        
+    def invalidate_tile(self, tile_x, tile_y):
+        """Redraw a single edited tile inside its chunk, if it is resident"""
+        chunk_x = tile_x // self.chunk_tiles
+        chunk_y = tile_y // self.chunk_tiles
+        surface = self.chunks.get((chunk_x, chunk_y))
+        if surface is not None:
+            self.draw_tile(surface, tile_x, tile_y,
+                           (tile_x - chunk_x * self.chunk_tiles) * self.tile_size,
+                           (tile_y - chunk_y * self.chunk_tiles) * self.tile_size)
+            
+    def invalidate_all(self):
+        self.chunks.clear()
+        
+    def visible_chunks(self, view):
+        """Chunk coordinates overlapping the view rectangle in world space"""
+        size = self.chunk_size
+        first_x = max(0, view.left // size)
+        first_y = max(0, view.top // size)
+        last_x = min((self.width - 1) // size, (view.right - 1) // size)
+        last_y = min((self.height - 1) // size, (view.bottom - 1) // size)
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                yield chunk_x, chunk_y
+                
+    def draw_area(self, screen, rect, camera_x=0, camera_y=0):
+        """Redraw the tiles under one screen rectangle"""
+        world = pygame.Rect(rect).move(camera_x, camera_y)
+        size = self.chunk_size
+        for chunk_x, chunk_y in self.visible_chunks(world):
+            surface = self.get_chunk(chunk_x, chunk_y)
+            chunk_rect = surface.get_rect(topleft=(chunk_x * size, chunk_y * size))
+            area = world.clip(chunk_rect)
+            screen.blit(surface, (area.x - camera_x, area.y - camera_y),
+                        area.move(-chunk_rect.x, -chunk_rect.y))
+            
+    def draw(self, screen, camera_x=0, camera_y=0):
+        view = pygame.Rect(camera_x, camera_y, screen.get_width(), screen.get_height())
+        size = self.chunk_size
+        screen.blits([
+            (self.get_chunk(chunk_x, chunk_y), (chunk_x * size - camera_x, chunk_y * size - camera_y))
+            for chunk_x, chunk_y in self.visible_chunks(view)
+        ], False)
+        
+        # Drop the least recently used chunks once over budget
+        while len(self.chunks) > self.max_resident:
+            self.chunks.popitem(last=False)
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+class EntityPool:
+    """Preallocated structure-of-arrays pool for positional entities.
+    
+    Subclasses list their per-entity arrays in FIELDS. Live entities always
+    occupy the prefix [0, count) of every array, so batched systems can work
+    on plain slices. Slots are handed out with acquire() and returned with
+    release() or, for many at once, keep(). Capacity doubles when the pool
+    runs out, which shows up in stats() as a grow.
+    
+    Every acquired entity also gets a uid that is never reused, so it can
+    be followed across compactions, e.g. by network snapshots.
+    """
+    FIELDS = (
+        ('uid', np.int64),
+        ('x', np.float64),
+        ('y', np.float64),
+        # Positions before the last update, for render interpolation
+        ('prev_x', np.float64),
+        ('prev_y', np.float64),
+    )
+    
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = 0
+        self.high_water = 0
+        self.grows = 0
+        self.acquired = 0
+        self.released = 0
+        self._allocate(capacity)
+    
+    def _allocate(self, capacity):
+        n = self.count
+        for name, dtype in self.FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+        self.capacity = capacity
+    
+    def _reserve(self, count):
+        capacity = self.capacity
+        while self.count + count > capacity:
+            capacity *= 2
+        if capacity != self.capacity:
+            self._allocate(capacity)
+            self.grows += 1
+    
+    def __len__(self):
+        return self.count
+    
+    def acquire(self):
+        """Claim the next free slot and return its index"""
+        self._reserve(1)
+        index = self.count
+        self.uid[index] = self.acquired
+        self.count += 1
+        self.acquired += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return index
+    
+    def acquire_many(self, count):
+        """Claim count consecutive slots and return them as a slice"""
+        self._reserve(count)
+        start = self.count
+        self.uid[start:start + count] = np.arange(self.acquired, self.acquired + count)
+        self.count += count
+        self.acquired += count
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return slice(start, self.count)
+    
+    def release(self, index):
+        """Free one slot by moving the last live entity into it.
+        
+        This is O(1) but does not preserve order; use keep() to drop many
+        entities at once in order.
+        """
+        last = self.count - 1
+        if index != last:
+            for name, _ in self.FIELDS:
+                array = getattr(self, name)
+                array[index] = array[last]
+        self.count = last
+        self.released += 1
+    
+    def keep(self, mask):
+        """Compact the live entities down to those where mask is True"""
+        n = self.count
+        kept = int(np.count_nonzero(mask))
+        if kept == n:
+            return
+        for name, _ in self.FIELDS:
+            array = getattr(self, name)
+            array[:kept] = array[:n][mask]
+        self.count = kept
+        self.released += n - kept
+    
+    def clear(self):
+        self.released += self.count
+        self.count = 0
+    
+    def stats(self):
+        return {
+            'live': self.count,
+            'capacity': self.capacity,
+            'occupancy': self.count / self.capacity,
+            'high_water': self.high_water,
+            'grows': self.grows,
+            'acquired': self.acquired,
+            'released': self.released,
+        }
+    
+    def save_previous(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+    
+    def lerp(self, alpha):
+        """Positions blended between the previous and current update"""
+        n = self.count
+        x = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha
+        y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        return x, y
@@ -0,0 +1,230 @@
+import csv
+import json
+import time
+
+import numpy as np
+import pygame
+
+# Phases of one frame of FPSGame.run(), in the order they execute. The
+# simulation phases repeat for every tick a frame runs and are summed
+PHASES = ('events', 'input', 'enemies', 'spawn', 'bullets', 'collisions',
+          'workers', 'draw', 'overlay', 'flip', 'wait')
+
+# Phases that are not the game's own work, left out of the frame-time graph
+IDLE_PHASES = ('wait',)
+
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+YELLOW = (255, 255, 0)
+RED = (255, 0, 0)
+
+
+def _noop(*args):
+    pass
+
+
+def frame_percentiles(phases, frame_times, durations, quantiles=(50, 95, 99)):
+    """{phase: [milliseconds per quantile]}, plus 'frame' and 'busy',
+    from the arrays returned by FrameProfiler.frames()"""
+    if len(frame_times) == 0:
+        return {}
+    table = np.percentile(durations, quantiles, axis=0) * 1000
+    result = {phase: table[:, i].tolist() for i, phase in enumerate(phases)}
+    idle = [i for i, phase in enumerate(phases) if phase in IDLE_PHASES]
+    busy = frame_times - durations[:, idle].sum(axis=1)
+    result['busy'] = (np.percentile(busy, quantiles) * 1000).tolist()
+    result['frame'] = (np.percentile(frame_times, quantiles) * 1000).tolist()
+    return result
+
+
+class FrameProfiler:
+    """Per-phase frame timings kept in a fixed-size ring buffer.
+    
+    A frame is bracketed by begin_frame() and end_frame(), and lap(phase)
+    charges the time since the previous lap to that phase. While disabled
+    all three are bound to a no-op, so the instrumentation can stay in the
+    loop permanently.
+    """
+    def __init__(self, phases=PHASES, capacity=600, enabled=False):
+        self.phases = tuple(phases)
+        self.columns = {phase: i for i, phase in enumerate(self.phases)}
+        self.capacity = capacity
+        self.durations = np.zeros((capacity, len(self.phases)))
+        self.starts = np.zeros(capacity)
+        self.frame_times = np.zeros(capacity)
+        self.head = 0
+        self.count = 0
+        self.origin = time.perf_counter()
+        self._row = self.durations[0]
+        self._frame_start = self._last = self.origin
+        self.enabled = None
+        self.set_enabled(enabled)
+    
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        if enabled:
+            # Switching on mid-frame starts the frame from here
+            self._begin_frame()
+            self.begin_frame = self._begin_frame
+            self.lap = self._lap
+            self.end_frame = self._end_frame
+        else:
+            self.begin_frame = self.lap = self.end_frame = _noop
+    
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+    
+    def reset(self):
+        self.head = 0
+        self.count = 0
+    
+    def _begin_frame(self):
+        self._row = row = self.durations[self.head]
+        row[:] = 0
+        self._frame_start = self._last = time.perf_counter()
+    
+    def _lap(self, phase):
+        now = time.perf_counter()
+        self._row[self.columns[phase]] += now - self._last
+        self._last = now
+    
+    def _end_frame(self):
+        head = self.head
+        self.starts[head] = self._frame_start - self.origin
+        self.frame_times[head] = time.perf_counter() - self._frame_start
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def frames(self):
+        """(starts, frame_times, durations) of the recorded frames, oldest first, in seconds"""
+        order = (np.arange(self.head - self.count, self.head)) % self.capacity
+        return self.starts[order], self.frame_times[order], self.durations[order]
+    
+    def busy_times(self):
+        """Frame times minus the idle phases, in seconds, oldest first"""
+        _, frame_times, durations = self.frames()
+        idle = [self.columns[phase] for phase in IDLE_PHASES if phase in self.columns]
+        return frame_times - durations[:, idle].sum(axis=1)
+    
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """{phase: [milliseconds per quantile]}, plus 'frame' and 'busy'"""
+        _, frame_times, durations = self.frames()
+        return frame_percentiles(self.phases, frame_times, durations, quantiles)
+    
+    def export_csv(self, path):
+        starts, frame_times, durations = self.frames()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('frame', 'start_ms', 'frame_ms') + tuple(f'{phase}_ms' for phase in self.phases))
+            for i in range(len(starts)):
+                writer.writerow([i, f'{starts[i] * 1000:.3f}', f'{frame_times[i] * 1000:.3f}'] +
+                                [f'{value * 1000:.3f}' for value in durations[i]])
+    
+    def export_chrome_trace(self, path, pid=1, tid=1):
+        """Write trace-event JSON for chrome://tracing or Perfetto.
+        
+        Each frame becomes a complete event with its phases nested inside,
+        laid out back to back in execution order.
+        """
+        starts, frame_times, durations = self.frames()
+        events = []
+        for i in range(len(starts)):
+            ts = starts[i] * 1e6
+            events.append({'name': 'frame', 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': ts, 'dur': frame_times[i] * 1e6, 'args': {'frame': i}})
+            for phase, duration in zip(self.phases, durations[i].tolist()):
+                if duration > 0:
+                    events.append({'name': phase, 'ph': 'X', 'pid': pid, 'tid': tid,
+                                   'ts': ts, 'dur': duration * 1e6})
+                    ts += duration * 1e6
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    
+    def export(self, path):
+        """Export as CSV for a .csv path, otherwise as a Chrome trace"""
+        if str(path).endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_chrome_trace(path)
+
+
+class ProfilerOverlay:
+    """On-screen frame-time graph and per-phase percentile table.
+    
+    The table is re-rendered every refresh_frames frames; in between the
+    cached surface is blitted and only the graph is redrawn. With an
+    executor set, the percentiles behind it are computed there and the
+    table is re-rendered on the first frame after they arrive.
+    """
+    def __init__(self, profiler, pos=(None, 10), width=300, graph_height=60,
+                 budget_ms=1000 / 60, refresh_frames=15, font=None):
+        self.profiler = profiler
+        self.pos = pos
+        self.width = width
+        self.graph_height = graph_height
+        self.budget_ms = budget_ms
+        self.refresh_frames = refresh_frames
+        self.font = font or pygame.font.Font(None, 18)
+        self.table = None
+        self.frames_since_refresh = refresh_frames
+        self.executor = None
+        self.pending = None
+    
+    def render_table(self, stats=None):
+        if stats is None:
+            stats = self.profiler.percentiles()
+        line_height = self.font.get_linesize()
+        rows = [('phase', 'p50', 'p95', 'p99')]
+        for phase in ('busy', 'frame') + self.profiler.phases:
+            if phase in stats:
+                rows.append((phase,) + tuple(f'{value:.2f}' for value in stats[phase]))
+        surface = pygame.Surface((self.width, line_height * len(rows) + 4), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        columns = (4, self.width - 186, self.width - 124, self.width - 62)
+        for r, row in enumerate(rows):
+            for x, text in zip(columns, row):
+                surface.blit(self.font.render(text, True, WHITE), (x, 2 + r * line_height))
+        return surface
+    
+    def draw(self, screen):
+        x, y = self.pos
+        if x is None:
+            x = screen.get_width() - self.width - 10
+        
+        self.frames_since_refresh += 1
+        if self.table is None or self.frames_since_refresh >= self.refresh_frames:
+            self.refresh()
+        
+        # Busy time of the recent frames, one pixel column per frame, with
+        # the frame budget as a reference line
+        graph = pygame.Rect(x, y, self.width, self.graph_height)
+        screen.fill((0, 0, 0), graph)
+        busy = self.profiler.busy_times()[-self.width:] * 1000
+        if len(busy):
+            scale = self.graph_height / max(self.budget_ms * 2, float(busy.max()))
+            heights = np.minimum(busy * scale, self.graph_height).astype(int).tolist()
+            budget = self.budget_ms
+            left = graph.right - len(heights)
+            bottom = graph.bottom - 1
+            for i, (height, value) in enumerate(zip(heights, busy.tolist())):
+                color = GREEN if value <= budget * 0.5 else YELLOW if value <= budget else RED
+                pygame.draw.line(screen, color, (left + i, bottom), (left + i, bottom - height))
+            budget_y = bottom - int(budget * scale)
+            pygame.draw.line(screen, WHITE, (graph.left, budget_y), (graph.right - 1, budget_y))
+        rect = screen.blit(self.table, (x, graph.bottom))
+        return rect.union(graph)
+    
+    def refresh(self):
+        if self.executor is None or self.table is None:
+            self.table = self.render_table()
+            self.frames_since_refresh = 0
+        elif self.pending is None:
+            _, frame_times, durations = self.profiler.frames()
+            self.pending = self.executor.submit(frame_percentiles, self.profiler.phases, frame_times, durations)
+        elif self.pending.done():
+            self.table = self.render_table(self.pending.result())
+            self.pending = None
+            self.frames_since_refresh = 0
@@ -0,0 +1,234 @@
+import math
+
+import numpy as np
+import pygame
+
+CEILING = (40, 40, 48)
+FLOOR = (70, 62, 54)
+WALL = (150, 150, 150)
+
+# Walls facing north/south are drawn darker than east/west ones
+SIDE_SHADE = 0.7
+
+# Sprites closer than this many tiles to the eye are not drawn
+NEAR_PLANE = 0.5
+
+
+class Raycaster:
+    """First-person view of a TileMap, rendered one ray per screen column.
+    
+    Rays are stepped through the grid with DDA, all columns at once as
+    NumPy arrays. Wall slices are written into a frame buffer of pixels
+    already packed in the surface's format, which pygame.surfarray copies
+    to the screen as is. The per-column wall depths form a z-buffer for
+    billboard sprites.
+    """
+    def __init__(self, tile_map, surface, fov=math.pi / 3, max_depth=64, fog=0.08):
+        self.tile_map = tile_map
+        self.walls = tile_map.as_array()
+        self.width, self.height = width, height = surface.get_size()
+        
+        # Frames are packed for surface itself when it is 32-bit, otherwise
+        # for a 32-bit buffer that is then blitted across
+        self.buffer = None
+        if surface.get_bytesize() != 4:
+            self.buffer = surface = pygame.Surface((width, height), 0, 32)
+        self.shifts = surface.get_shifts()[:3]
+        self.alpha = surface.get_masks()[3]
+        self.fov = fov
+        self.max_depth = max_depth
+        self.fog = fog
+        # Cast one ray per this many columns, widening each slice to match
+        self.column_step = 1
+        
+        # Offsets of each column's ray across the camera plane, -1 to 1
+        self.camera_x = 2 * (np.arange(width) + 0.5) / width - 1
+        self.plane_scale = math.tan(fov / 2)
+        # Distance of each row's center from the horizon, in half pixels
+        self.row_offsets = np.abs(2 * np.arange(height, dtype=np.int16) + 1 - height)
+        self.zbuffer = np.full(width, np.inf)
+        
+        # Ceiling and floor, shaded toward the horizon, copied in every frame
+        horizon = height // 2
+        ceiling = 1 - 0.6 * np.arange(horizon) / horizon
+        floor = 0.4 + 0.6 * np.arange(height - horizon) / (height - horizon)
+        shades = np.concatenate([np.outer(ceiling, CEILING), np.outer(floor, FLOOR)])
+        self.background = np.tile(self.pack(shades), (width, 1))
+        self.frame = self.background.copy()
+    
+    def pack(self, colors):
+        """(n, 3) RGB values as 32-bit pixels of the target surface"""
+        colors = np.asarray(colors).astype(np.uint32)
+        r, g, b = self.shifts
+        return (colors[:, 0] << r) | (colors[:, 1] << g) | (colors[:, 2] << b) | np.uint32(self.alpha)
+    
+    def cast(self, x, y, angle, step=1):
+        """Perpendicular wall distance in tiles and hit side (0 = x, 1 = y)
+        of every step-th column"""
+        tile_size = self.tile_map.tile_size
+        camera_x = self.camera_x[::step]
+        rays = len(camera_x)
+        pos_x = x / tile_size
+        pos_y = y / tile_size
+        dir_x = math.cos(angle)
+        dir_y = math.sin(angle)
+        ray_x = dir_x - dir_y * self.plane_scale * camera_x
+        ray_y = dir_y + dir_x * self.plane_scale * camera_x
+        
+        with np.errstate(divide='ignore'):
+            delta_x = np.abs(1 / ray_x)
+            delta_y = np.abs(1 / ray_y)
+        map_x = np.full(rays, int(math.floor(pos_x)))
+        map_y = np.full(rays, int(math.floor(pos_y)))
+        step_x = np.where(ray_x < 0, -1, 1)
+        step_y = np.where(ray_y < 0, -1, 1)
+        side_x = np.where(ray_x < 0, pos_x - map_x, map_x + 1 - pos_x) * delta_x
+        side_y = np.where(ray_y < 0, pos_y - map_y, map_y + 1 - pos_y) * delta_y
+        
+        rows, columns = self.walls.shape
+        dist = np.full(rays, float(self.max_depth))
+        side = np.zeros(rays, dtype=np.int8)
+        active = np.arange(rays)
+        for _ in range(self.max_depth * 2):
+            if len(active) == 0:
+                break
+            # Step every unfinished ray across its nearest grid line
+            along_x = side_x[active] < side_y[active]
+            ax = active[along_x]
+            ay = active[~along_x]
+            map_x[ax] += step_x[ax]
+            side_x[ax] += delta_x[ax]
+            map_y[ay] += step_y[ay]
+            side_y[ay] += delta_y[ay]
+            
+            mx = map_x[active]
+            my = map_y[active]
+            outside = (mx < 0) | (mx >= columns) | (my < 0) | (my >= rows)
+            hit = outside.copy()
+            inside = ~outside
+            hit[inside] = self.walls[my[inside], mx[inside]] != 0
+            done = active[hit]
+            # Distance to the grid line just crossed
+            done_x = along_x[hit]
+            dist[done] = np.where(done_x, side_x[done] - delta_x[done], side_y[done] - delta_y[done])
+            side[done] = np.where(done_x, 0, 1)
+            active = active[~hit]
+        return np.maximum(dist, 1e-4), side
+    
+    def render(self, screen, x, y, angle, sprites=()):
+        """Draw the view from (x, y) facing angle onto screen.
+        
+        screen must have the pixel format of the surface given at
+        construction. sprites is a sequence of (xs, ys, size, color,
+        elevation) groups of billboards. Positions and size are in world
+        pixels; elevation is the height of their centers above the floor in
+        tiles, eye level being 0.5.
+        """
+        height = self.height
+        step = self.column_step
+        dist, side = self.cast(x, y, angle, step)
+        if step > 1:
+            dist = np.repeat(dist, step)[:self.width]
+            side = np.repeat(side, step)[:self.width]
+        self.zbuffer = dist
+        
+        # Wall slice of each column: centered on the horizon, height
+        # inversely proportional to distance
+        line = np.minimum(height / dist, height).astype(np.int16)
+        shade = np.where(side == 1, SIDE_SHADE, 1.0) / (1 + dist * self.fog)
+        colors = self.pack(np.outer(shade, WALL))
+        
+        frame = self.frame
+        np.copyto(frame, self.background)
+        wall = self.row_offsets < line[:, None]
+        np.copyto(frame, np.broadcast_to(colors[:, None], frame.shape), where=wall)
+        
+        self.draw_billboards(sprites, x, y, angle)
+        if self.buffer is None:
+            pygame.surfarray.blit_array(screen, frame)
+        else:
+            pygame.surfarray.blit_array(self.buffer, frame)
+            screen.blit(self.buffer, (0, 0))
+    
+    def draw_billboards(self, sprites, x, y, angle):
+        """Draw round sprites far to near, hidden behind nearer walls"""
+        sprites = [group for group in sprites if len(group[0])]
+        if not sprites:
+            return
+        xs = np.concatenate([group[0] for group in sprites])
+        ys = np.concatenate([group[1] for group in sprites])
+        sizes = np.concatenate([np.full(len(group[0]), group[2], dtype=float) for group in sprites])
+        colors = np.concatenate([np.tile(group[3], (len(group[0]), 1)) for group in sprites])
+        elevations = np.concatenate([np.full(len(group[0]), group[4], dtype=float) for group in sprites])
+        
+        # Camera space: depth along the view direction, offset across it
+        tile_size = self.tile_map.tile_size
+        dir_x = math.cos(angle)
+        dir_y = math.sin(angle)
+        plane_x = -dir_y * self.plane_scale
+        plane_y = dir_x * self.plane_scale
+        rel_x = (xs - x) / tile_size
+        rel_y = (ys - y) / tile_size
+        inv_det = 1 / (plane_x * dir_y - dir_x * plane_y)
+        across = inv_det * (dir_y * rel_x - dir_x * rel_y)
+        depth = inv_det * (-plane_y * rel_x + plane_x * rel_y)
+        ahead = depth > NEAR_PLANE
+        across = across[ahead]
+        depth = depth[ahead]
+        sizes = sizes[ahead]
+        colors = colors[ahead]
+        
+        # Screen extents of every sprite at once
+        width, height = self.width, self.height
+        center_x = width / 2 * (1 + across / depth)
+        center_y = height / 2 + (0.5 - elevations[ahead]) * height / depth
+        half = height / depth * sizes / tile_size / 2
+        x0 = np.clip(center_x - half, 0, width).astype(np.int32)
+        x1 = np.clip(center_x + half + 1, 0, width).astype(np.int32)
+        y0 = np.clip(center_y - half, 0, height).astype(np.int32)
+        y1 = np.clip(center_y + half + 1, 0, height).astype(np.int32)
+        keep = np.flatnonzero((x0 < x1) & (y0 < y1))
+        
+        # Drop sprites that are behind the wall in every column they span
+        zbuffer = self.zbuffer
+        if len(keep):
+            spans = np.empty(2 * len(keep), dtype=np.intp)
+            spans[0::2] = x0[keep]
+            spans[1::2] = x1[keep]
+            farthest = np.maximum.reduceat(np.append(zbuffer, 0), spans)[0::2]
+            keep = keep[farthest > depth[keep]]
+        if len(keep) == 0:
+            return
+        keep = keep[np.argsort(-depth[keep], kind='stable')]
+        packed = self.pack(colors[keep] / (1 + depth[keep, None] * self.fog))
+        
+        frame = self.frame
+        for i, color in zip(keep.tolist(), packed.tolist()):
+            d = depth[i]
+            columns = np.arange(x0[i], x1[i])
+            columns = columns[zbuffer[columns] > d]
+            u = (columns + 0.5 - center_x[i]) / half[i]
+            v = (np.arange(y0[i], y1[i]) + 0.5 - center_y[i]) / half[i]
+            disc = u[:, None] ** 2 + v[None, :] ** 2 <= 1
+            patch = frame[columns, y0[i]:y1[i]]
+            patch[disc] = color
+            frame[columns, y0[i]:y1[i]] = patch
+
+
+def camera_path(tile_map, start_x, start_y, frames, radius=1.0):
+    """A fixed, repeatable camera path for benchmarks.
+    
+    The camera turns one full circle while circling the start point by
+    radius tiles, staying put on steps that would enter a wall.
+    """
+    tile_size = tile_map.tile_size
+    path = []
+    x, y = start_x, start_y
+    for i in range(frames):
+        t = 2 * math.pi * i / frames
+        nx = start_x + math.cos(t) * radius * tile_size
+        ny = start_y + math.sin(t) * radius * tile_size
+        if not tile_map.is_wall_at(nx, ny):
+            x, y = nx, ny
+        path.append((x, y, t))
+    return path
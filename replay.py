@@ -0,0 +1,154 @@
+import struct
+import sys
+import time
+from array import array
+
+# Replay files: header, one 3-byte input record per tick, then checkpoints
+MAGIC = b'FPSR'
+VERSION = 1
+HEADER = struct.Struct('<4sHQH16sHI')  # magic, version, seed, sim rate, character, map path length, ticks
+INPUT = struct.Struct('<Bh')           # button flags, mouse dx
+CHECKPOINT = struct.Struct('<IQ')      # tick, state hash
+
+UP, DOWN, LEFT, RIGHT, FIRE, RELOAD = (1 << bit for bit in range(6))
+
+# Checkpoint every second of simulation at 60 Hz
+CHECKPOINT_INTERVAL = 60
+
+
+def pack_input(inputs):
+    flags = ((UP if inputs.up else 0) | (DOWN if inputs.down else 0) |
+             (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+             (FIRE if inputs.fire else 0) | (RELOAD if inputs.reload else 0))
+    return flags, inputs.mouse_dx
+
+
+def unpack_input(flags, mouse_dx):
+    from fps_game import InputFrame
+    return InputFrame(up=bool(flags & UP), down=bool(flags & DOWN),
+                      left=bool(flags & LEFT), right=bool(flags & RIGHT),
+                      mouse_dx=mouse_dx, fire=bool(flags & FIRE), reload=bool(flags & RELOAD))
+
+
+class Recorder:
+    """Collects the per-tick inputs of a game plus periodic state hashes"""
+    def __init__(self, seed, character, sim_rate=60, map_path=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.seed = seed
+        self.character = character
+        self.sim_rate = sim_rate
+        self.map_path = map_path or ''
+        self.checkpoint_interval = checkpoint_interval
+        self.flags = array('B')
+        self.mouse = array('h')
+        self.checkpoints = []
+        
+    @classmethod
+    def for_game(cls, game, map_path=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        return cls(game.seed, game.player.character, game.sim_rate, map_path, checkpoint_interval)
+        
+    def record_input(self, inputs):
+        """Store one tick of input, clamping it to what the format can hold.
+        
+        The frame is normalized in place, so the game applies exactly the
+        input that a replay will see.
+        """
+        inputs.mouse_dx = max(-32768, min(32767, int(inputs.mouse_dx)))
+        flags, mouse_dx = pack_input(inputs)
+        self.flags.append(flags)
+        self.mouse.append(mouse_dx)
+        
+    def checkpoint(self, game):
+        if game.ticks % self.checkpoint_interval == 0:
+            self.checkpoints.append((game.ticks, game.state_hash()))
+            
+    def __len__(self):
+        return len(self.flags)
+        
+    def save(self, path):
+        map_path = self.map_path.encode()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.sim_rate,
+                                self.character.encode(), len(map_path), len(self.flags)))
+            f.write(map_path)
+            f.write(b''.join(INPUT.pack(flags, mouse_dx) for flags, mouse_dx in zip(self.flags, self.mouse)))
+            f.write(struct.pack('<I', len(self.checkpoints)))
+            f.write(b''.join(CHECKPOINT.pack(tick, value) for tick, value in self.checkpoints))
+
+
+class Replay:
+    """A recorded session that can be re-simulated headless at full speed"""
+    def __init__(self, seed, character, sim_rate, map_path, inputs, checkpoints):
+        self.seed = seed
+        self.character = character
+        self.sim_rate = sim_rate
+        self.map_path = map_path or None
+        self.inputs = inputs
+        self.checkpoints = checkpoints
+        
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, sim_rate, character, map_length, ticks = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        offset = HEADER.size
+        map_path = data[offset:offset + map_length].decode()
+        offset += map_length
+        inputs = list(INPUT.iter_unpack(data[offset:offset + ticks * INPUT.size]))
+        offset += ticks * INPUT.size
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        checkpoints = list(CHECKPOINT.iter_unpack(data[offset:offset + count * CHECKPOINT.size]))
+        return cls(seed, character.rstrip(b'\0').decode(), sim_rate, map_path, inputs, checkpoints)
+        
+    @classmethod
+    def from_recorder(cls, recorder):
+        return cls(recorder.seed, recorder.character, recorder.sim_rate, recorder.map_path,
+                   list(zip(recorder.flags, recorder.mouse)), list(recorder.checkpoints))
+        
+    def new_game(self):
+        from fps_game import FPSGame
+        return FPSGame(self.character, headless=True, sim_rate=self.sim_rate,
+                       map_path=self.map_path, seed=self.seed)
+                       
+    def play(self, verify=True, stop_on_mismatch=True):
+        """Run every recorded tick and compare state hashes at checkpoints.
+        
+        Returns the finished game and a list of (tick, expected, actual)
+        mismatches.
+        """
+        game = self.new_game()
+        expected = dict(self.checkpoints) if verify else {}
+        mismatches = []
+        for flags, mouse_dx in self.inputs:
+            game.step(unpack_input(flags, mouse_dx))
+            want = expected.get(game.ticks)
+            if want is not None:
+                actual = game.state_hash()
+                if actual != want:
+                    mismatches.append((game.ticks, want, actual))
+                    if stop_on_mismatch:
+                        break
+        return game, mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless and verify it")
+    parser.add_argument('replay', help="replay file written with fps_game.py --record")
+    parser.add_argument('--no-verify', action='store_true', help="skip checkpoint hash checks")
+    args = parser.parse_args()
+    
+    replay = Replay.load(args.replay)
+    start = time.perf_counter()
+    game, mismatches = replay.play(verify=not args.no_verify)
+    elapsed = time.perf_counter() - start
+    print(f"{game.ticks} ticks in {elapsed:.3f}s ({game.ticks / max(elapsed, 1e-9):.0f} ticks/s), "
+          f"score {game.score}, {len(replay.checkpoints)} checkpoints")
+    for tick, want, actual in mismatches:
+        print(f"Mismatch at tick {tick}: expected {want:016x}, got {actual:016x}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,242 @@
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from bullets import BulletSystem
+from enemies import EnemySwarm
+from flowfield import FlowField
+from tilemap import TileMap
+
+# Save states: header, game scalars, RNG states, map tiles, then one
+# fixed-size record per player, enemy and bullet. All little endian
+MAGIC = b'FPSS'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')    # magic, version, reserved
+GAME = struct.Struct(
+    '<Q'        # seed
+    'H'         # sim rate
+    'Q'         # ticks
+    'qqqqqq'    # score, kills, shots fired, shots hit, damage dealt, damage taken
+    'qq'        # enemy spawn timer, last shot tick
+    'qqq'       # max enemies, enemy spawn delay, fire interval
+    'ddq'       # enemy speed, enemy shot chance, enemy cooldown
+)
+RANDOM = struct.Struct('<625Id')   # Mersenne Twister state, cached gauss (NaN for none)
+PCG = struct.Struct('<16s16sIq')   # NumPy PCG64 state, increment, has_uint32, uinteger
+MAP = struct.Struct('<III')        # width, height, tile size
+POOL = struct.Struct('<IQQI')      # count, acquired, released, high water
+
+PLAYER_RECORD = np.dtype([
+    ('x', '<f8'), ('y', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'), ('angle', '<f8'),
+    ('health', '<i4'), ('max_health', '<i4'), ('ammo', '<i4'), ('character', 'S16'),
+])
+
+
+def pool_record(pool_class):
+    """Fixed-size record holding every field of an entity pool"""
+    return np.dtype([(name, np.dtype(dtype).newbyteorder('<')) for name, dtype in pool_class.FIELDS])
+
+
+ENEMY_RECORD = pool_record(EnemySwarm)
+BULLET_RECORD = pool_record(BulletSystem)
+
+
+def _pack_pool(pool, dtype):
+    n = pool.count
+    records = np.empty(n, dtype)
+    for name in dtype.names:
+        records[name] = getattr(pool, name)[:n]
+    return [POOL.pack(n, pool.acquired, pool.released, pool.high_water), records.tobytes()]
+
+
+def _unpack_pool(pool, dtype, buffer, offset):
+    n, acquired, released, high_water = POOL.unpack_from(buffer, offset)
+    offset += POOL.size
+    records = np.frombuffer(buffer, dtype, n, offset)
+    pool.count = 0
+    pool._reserve(n)
+    for name in dtype.names:
+        getattr(pool, name)[:n] = records[name]
+    pool.count = n
+    pool.acquired = acquired
+    pool.released = released
+    pool.high_water = high_water
+    return offset + n * dtype.itemsize
+
+
+def save_state(game):
+    """Serialize the whole simulation state of a game to bytes.
+    
+    Derived data (flow field, spawn index, rendering caches) is not saved;
+    it is rebuilt from the map after loading.
+    """
+    enemies = game.enemies
+    parts = [
+        HEADER.pack(MAGIC, VERSION, 0),
+        GAME.pack(game.seed, game.sim_rate, game.ticks,
+                  game.score, game.kills, game.shots_fired, game.shots_hit, game.damage_dealt, game.damage_taken,
+                  game.enemy_spawn_timer, game.last_shot_tick,
+                  game.max_enemies, game.enemy_spawn_delay, game.fire_interval,
+                  enemies.speed, game.enemy_shot_chance, enemies.cooldown),
+    ]
+    
+    _, state, gauss = game.rng.getstate()
+    parts.append(RANDOM.pack(*state, math.nan if gauss is None else gauss))
+    bit_state = game.enemy_rng.bit_generator.state
+    parts.append(PCG.pack(bit_state['state']['state'].to_bytes(16, 'little'),
+                          bit_state['state']['inc'].to_bytes(16, 'little'),
+                          bit_state['has_uint32'], bit_state['uinteger']))
+    
+    tile_map = game.map_data
+    parts.append(MAP.pack(tile_map.width, tile_map.height, tile_map.tile_size))
+    parts.append(tile_map.view[:tile_map.width * tile_map.height])
+    
+    players = np.empty(len(game.players), PLAYER_RECORD)
+    for i, player in enumerate(game.players):
+        players[i] = (player.x, player.y, player.prev_x, player.prev_y, player.angle,
+                      player.health, player.max_health, player.ammo, player.character.encode())
+    parts.append(struct.pack('<I', len(players)))
+    parts.append(players.tobytes())
+    
+    parts.extend(_pack_pool(enemies, ENEMY_RECORD))
+    parts.extend(_pack_pool(game.bullets, BULLET_RECORD))
+    return b''.join(parts)
+
+
+def read_header(buffer):
+    """(seed, sim_rate, map width, map height, tile size) of a save state"""
+    magic, version, _ = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("not a save state")
+    if version != VERSION:
+        raise ValueError(f"unsupported save state version {version}")
+    fields = GAME.unpack_from(buffer, HEADER.size)
+    offset = HEADER.size + GAME.size + RANDOM.size + PCG.size
+    width, height, tile_size = MAP.unpack_from(buffer, offset)
+    return fields[0], fields[1], width, height, tile_size
+
+
+def load_state(game, buffer):
+    """Restore a game from save_state() output (bytes, memoryview or mmap).
+    
+    The game's map must have the same size as the saved one; its tiles
+    are overwritten with the saved tiles.
+    """
+    from fps_game import Player
+    
+    _, _, width, height, _ = read_header(buffer)
+    tile_map = game.map_data
+    if (width, height) != (tile_map.width, tile_map.height):
+        raise ValueError(f"save state map is {width}x{height}, game map is {tile_map.width}x{tile_map.height}")
+    
+    (seed, sim_rate, game.ticks,
+     game.score, game.kills, game.shots_fired, game.shots_hit, game.damage_dealt, game.damage_taken,
+     game.enemy_spawn_timer, game.last_shot_tick,
+     game.max_enemies, game.enemy_spawn_delay, game.fire_interval,
+     game.enemies.speed, game.enemy_shot_chance, game.enemies.cooldown) = GAME.unpack_from(buffer, HEADER.size)
+    if sim_rate != game.sim_rate:
+        raise ValueError(f"save state runs at {sim_rate} ticks/s, game at {game.sim_rate}")
+    game.seed = seed
+    offset = HEADER.size + GAME.size
+    
+    *state, gauss = RANDOM.unpack_from(buffer, offset)
+    game.rng.setstate((3, tuple(state), None if math.isnan(gauss) else gauss))
+    offset += RANDOM.size
+    pcg_state, increment, has_uint32, uinteger = PCG.unpack_from(buffer, offset)
+    game.enemy_rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(pcg_state, 'little'), 'inc': int.from_bytes(increment, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger,
+    }
+    offset += PCG.size + MAP.size
+    
+    tiles = width * height
+    tile_map.view[:tiles] = memoryview(buffer)[offset:offset + tiles]
+    offset += tiles
+    game.flow_field = FlowField(tile_map, game.flow_field.max_radius)
+    game.spawn_index.tile_changed(0, 0)
+    game.line_of_sight.tile_changed(0, 0)
+    if not game.headless:
+        game.map_layer.invalidate_all()
+        if game.renderer:
+            game.renderer.invalidate()
+    
+    count, = struct.unpack_from('<I', buffer, offset)
+    offset += 4
+    records = np.frombuffer(buffer, PLAYER_RECORD, count, offset)
+    offset += count * PLAYER_RECORD.itemsize
+    players = []
+    for i, record in enumerate(records.tolist()):
+        x, y, prev_x, prev_y, angle, health, max_health, ammo, character = record
+        character = character.decode()
+        if i < len(game.players):
+            # Existing Player objects are reused so outside references stay valid
+            player = game.players[i]
+            player.x, player.y, player.character = x, y, character
+            player.speed = player.stats[character]['speed']
+            player.color = player.stats[character]['color']
+        else:
+            player = Player(x, y, character)
+        player.prev_x, player.prev_y, player.angle = prev_x, prev_y, angle
+        player.health, player.max_health, player.ammo = health, max_health, ammo
+        players.append(player)
+    game.players[:] = players
+    if players:
+        game.player = players[0]
+    game.running = game.player.health > 0
+    
+    offset = _unpack_pool(game.enemies, ENEMY_RECORD, buffer, offset)
+    game.enemies.alive = int(np.count_nonzero(game.enemies.health[:game.enemies.count] > 0))
+    _unpack_pool(game.bullets, BULLET_RECORD, buffer, offset)
+    return game
+
+
+def write_bytes(path, data):
+    """Write a save state atomically, so a crash never leaves half a file"""
+    temp = f'{path}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+
+def write_state(game, path):
+    write_bytes(path, save_state(game))
+
+
+def read_state(game, path, use_mmap=True):
+    """Load a save state file into game, memory-mapping it by default"""
+    with open(path, 'rb') as f:
+        if not use_mmap:
+            return load_state(game, f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return load_state(game, mapped)
+
+
+def restore_game(buffer, character='soldier', **kwargs):
+    """A new headless-by-default FPSGame built from a save state, map included"""
+    from fps_game import FPSGame
+    
+    seed, sim_rate, width, height, tile_size = read_header(buffer)
+    kwargs.setdefault('headless', True)
+    game = FPSGame(character, sim_rate=sim_rate, seed=seed,
+                   tile_map=TileMap(width, height, bytearray(width * height), tile_size), **kwargs)
+    return load_state(game, buffer)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Inspect a save state file")
+    parser.add_argument('path')
+    args = parser.parse_args()
+    
+    with open(args.path, 'rb') as f:
+        data = f.read()
+    game = restore_game(data)
+    print(f"tick {game.ticks}, score {game.score}, map {game.map_data.width}x{game.map_data.height}, "
+          f"{len(game.players)} players, {game.enemies.count} enemies, {game.bullets.count} bullets, "
+          f"{len(data)} bytes")
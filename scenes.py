@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+import pygame
+
+from map_layer import MapLayer
+from sprites import SpriteCache
+
+logger = logging.getLogger(__name__)
+
+
+class Assets:
+    """Fonts, sprites and map layers shared by every scene.
+    
+    Each is loaded on first request and kept, so a scene built after a
+    preload finds what it needs already made.
+    """
+    def __init__(self):
+        self.fonts = {}
+        self.sprites = SpriteCache()
+        self.map_layers = {}
+    
+    def font(self, size, name=None):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(name, size)
+        return font
+    
+    def map_layer(self, tile_map, tile_size):
+        """The pre-rendered tile layer of one TileMap instance"""
+        entry = self.map_layers.get(id(tile_map))
+        if entry is None or entry[0] is not tile_map:
+            entry = self.map_layers[id(tile_map)] = (tile_map, MapLayer(tile_map, tile_size))
+        return entry[1]
+
+
+class SceneManager:
+    """One pygame session, display and asset registry for every scene.
+    
+    pygame is initialized and the window opened once here; scenes draw to
+    screen and load through assets, and nothing is torn down between them.
+    preload() spreads work for a later scene over the frames of the current
+    one: the preload runs as an asyncio task, one step per event-loop
+    turn, so it fills the time a scene spends waiting for its next frame.
+    
+    mark() records startup milestones; startup() turns them into timings.
+    """
+    def __init__(self, size, started=None):
+        self.started = time.perf_counter() if started is None else started
+        pygame.init()
+        self.screen = pygame.display.set_mode(size)
+        self.assets = Assets()
+        self.marks = {}
+        self.preload_task = None
+        self.preload_ms = None
+    
+    def preload(self, steps):
+        """Run a generator in the background, resuming it once per turn
+        of the event loop; preloaded() returns what it returns"""
+        self.preload_task = asyncio.ensure_future(self._preload(steps))
+    
+    async def _preload(self, steps):
+        start = time.perf_counter()
+        busy = 0.0
+        while True:
+            step_start = time.perf_counter()
+            try:
+                next(steps)
+            except StopIteration as done:
+                busy += time.perf_counter() - step_start
+                self.preload_ms = busy * 1000
+                logger.info("preloaded in %.1f ms of work over %.1f ms", busy * 1000,
+                            (time.perf_counter() - start) * 1000)
+                return done.value
+            busy += time.perf_counter() - step_start
+            await asyncio.sleep(0)
+    
+    async def preloaded(self):
+        """Wait for the preload to finish and return its result"""
+        if self.preload_task is None:
+            return None
+        return await self.preload_task
+    
+    def mark(self, name):
+        """Record when a startup milestone was first reached"""
+        self.marks.setdefault(name, time.perf_counter())
+    
+    def startup(self):
+        """Milliseconds from import to the first frame drawn, and from the
+        selection to the first frame of the game, as far as reached"""
+        marks = self.marks
+        timings = {}
+        if 'first_frame' in marks:
+            timings['import_to_first_frame'] = (marks['first_frame'] - self.started) * 1000
+        if 'selected' in marks and 'first_game_frame' in marks:
+            timings['select_to_first_game_frame'] = (marks['first_game_frame'] - marks['selected']) * 1000
+        return timings
+    
+    def report(self):
+        timings = self.startup()
+        logger.info("startup: %s", ", ".join(f"{name} {ms:.1f} ms" for name, ms in timings.items()))
+        return timings
+    
+    async def autopilot(self, key=pygame.K_1):
+        """Press key once the first scene is up and quit once the game has
+        drawn, so startup can be timed without a player"""
+        while 'first_frame' not in self.marks:
+            await asyncio.sleep(0.001)
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+        while 'first_game_frame' not in self.marks:
+            await asyncio.sleep(0.001)
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+    
+    def close(self):
+        if self.preload_task is not None:
+            self.preload_task.cancel()
+        pygame.quit()
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Browser builds (pygbag / WebAssembly) have neither threads nor processes
+WORKERS_AVAILABLE = sys.platform not in ('emscripten', 'wasi')
+
+
+class InlineExecutor:
+    """Executor stand-in that runs work at once on the calling thread.
+    
+    Used where no worker can be started, so callers can submit work and
+    poll futures the same way everywhere.
+    """
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+    
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class WorkerPool:
+    """Background executors for work that must not stall a frame.
+    
+    threads runs I/O and NumPy work; processes, if any were asked for,
+    runs pure-Python work that would otherwise hold the GIL. Those are
+    spawned rather than forked, since SDL and the threads are already
+    running and a fork would copy their locks mid-use. Work submitted with
+    a callback has it called from poll(), on the main thread, so results
+    can be installed into game state safely.
+    """
+    def __init__(self, threads=2, processes=0):
+        if WORKERS_AVAILABLE:
+            self.threads = ThreadPoolExecutor(threads, thread_name_prefix='worker')
+            self.processes = (ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+                              if processes else self.threads)
+        else:
+            self.threads = self.processes = InlineExecutor()
+        self.pending = []
+        self.completed = 0
+        self.failed = 0
+    
+    def submit(self, fn, *args, callback=None, cpu=False):
+        """Run fn(*args) in the background; cpu=True prefers a process"""
+        future = (self.processes if cpu else self.threads).submit(fn, *args)
+        self.pending.append((future, callback))
+        return future
+    
+    def poll(self):
+        """Hand finished results to their callbacks; returns how many finished"""
+        if not self.pending:
+            return 0
+        finished = [entry for entry in self.pending if entry[0].done()]
+        if not finished:
+            return 0
+        self.pending = [entry for entry in self.pending if not entry[0].done()]
+        for future, callback in finished:
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                logger.error("background work failed: %r", error)
+                continue
+            self.completed += 1
+            if callback is not None:
+                callback(future.result())
+        return len(finished)
+    
+    def shutdown(self):
+        """Finish submitted work, then stop the workers"""
+        self.threads.shutdown()
+        if self.processes is not self.threads:
+            self.processes.shutdown()
+        self.poll()
+
+
+class FramePacer:
+    """Frame timing that waits with asyncio.sleep instead of blocking.
+    
+    wait() sleeps until the next frame is due, so other tasks and a
+    browser host keep running in between frames. A late frame is not
+    followed by a burst of catch-up frames; the schedule restarts from it.
+    """
+    def __init__(self, fps):
+        self.interval = 1 / fps if fps else 0.0
+        self.last = self.deadline = time.perf_counter()
+    
+    def start(self):
+        self.last = time.perf_counter()
+        self.deadline = self.last + self.interval
+    
+    def elapsed_ms(self):
+        """Milliseconds since the previous call (or start())"""
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        return elapsed * 1000
+    
+    async def wait(self):
+        delay = self.deadline - time.perf_counter()
+        # Always yield at least once, even when the frame ran late
+        await asyncio.sleep(max(0.0, delay))
+        self.deadline = max(self.deadline + self.interval, time.perf_counter())
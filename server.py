@@ -0,0 +1,557 @@
+import asyncio
+import logging
+import math
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from fps_game import (CHARACTER_STATS, REFERENCE_RATE, SCREEN_HEIGHT, SCREEN_WIDTH, TILE_SIZE,
+                      FPSGame, InputFrame, Player)
+from replay import pack_input, unpack_input
+
+logger = logging.getLogger(__name__)
+
+# Every message is a 4-byte length followed by a payload whose first byte
+# is the message type
+FRAME = struct.Struct('<I')
+HELLO, WELCOME, INPUT, SNAPSHOT = range(1, 5)
+HELLO_MESSAGE = struct.Struct('<B16s')        # type, character
+WELCOME_MESSAGE = struct.Struct('<BIHHII')    # type, client id, sim rate, snapshot interval, world size
+INPUT_MESSAGE = struct.Struct('<BIBh')        # type, acked snapshot tick, button flags, mouse dx
+SNAPSHOT_HEADER = struct.Struct('<BIII')      # type, tick, base tick, score
+SECTION_HEADER = struct.Struct('<II')         # removed count, updated count
+
+# Base tick of a snapshot that is not a delta. Snapshots are only sent
+# after the first tick, so no real snapshot has this tick
+NO_BASE = 0
+
+# Snapshot records: positions in whole pixels, angles in 1/256 turns
+PLAYER_RECORD = np.dtype([('uid', '<u4'), ('x', '<u2'), ('y', '<u2'), ('angle', 'u1'),
+                          ('health', '<i2'), ('ammo', 'u1')])
+ENEMY_RECORD = np.dtype([('uid', '<u4'), ('x', '<u2'), ('y', '<u2'), ('angle', 'u1'), ('health', '<i2')])
+BULLET_RECORD = np.dtype([('uid', '<u4'), ('x', '<u2'), ('y', '<u2'), ('owner', 'u1')])
+SECTIONS = (('players', PLAYER_RECORD), ('enemies', ENEMY_RECORD), ('bullets', BULLET_RECORD))
+
+# Snapshots kept per client as possible delta bases
+SNAPSHOT_HISTORY = 64
+
+# Clients whose socket has this much unsent data skip snapshots
+MAX_WRITE_BUFFER = 256 * 1024
+
+MAX_CATCH_UP_TICKS = 5
+
+# Half extents of the area each client gets entities from: its screen
+# around the player, plus a tile so things don't pop in at the edge
+INTEREST = (SCREEN_WIDTH // 2 + TILE_SIZE, SCREEN_HEIGHT // 2 + TILE_SIZE)
+
+# Largest payload accepted: clients only ever send hellos and inputs; the
+# server skips any snapshot over the limit rather than send it
+MAX_CLIENT_MESSAGE = max(HELLO_MESSAGE.size, INPUT_MESSAGE.size)
+MAX_SERVER_MESSAGE = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """A peer sent a message that does not fit the protocol"""
+
+
+async def read_message(reader, limit=MAX_SERVER_MESSAGE):
+    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if not 0 < size <= limit:
+        raise ProtocolError(f"message of {size} bytes")
+    return await reader.readexactly(size)
+
+
+def write_message(writer, payload):
+    writer.write(FRAME.pack(len(payload)) + payload)
+
+
+def empty_state():
+    return {name: np.zeros(0, dtype) for name, dtype in SECTIONS}
+
+
+def quantize_angle(angle):
+    return (np.round(np.asarray(angle) * (128 / math.pi)).astype(np.int64) & 0xFF).astype(np.uint8)
+
+
+def quantize_position(value):
+    return np.clip(np.round(value), 0, 0xFFFF).astype(np.uint16)
+
+
+def diff_records(base, current):
+    """uids that left the set and records that are new or changed.
+    
+    Both arrays are sorted by uid.
+    """
+    if len(base) == 0:
+        return np.zeros(0, dtype='<u4'), current
+    position = np.minimum(np.searchsorted(base['uid'], current['uid']), len(base) - 1)
+    matched = base[position]
+    changed = (matched['uid'] != current['uid']) | (matched != current)
+    removed = base['uid'][~np.isin(base['uid'], current['uid'], assume_unique=True)]
+    return removed, current[changed]
+
+
+def apply_delta(base, removed, updated):
+    """The record set a delta turns base into, sorted by uid"""
+    drop = np.isin(base['uid'], removed) | np.isin(base['uid'], updated['uid'])
+    merged = np.concatenate((base[~drop], updated))
+    return merged[np.argsort(merged['uid'], kind='stable')]
+
+
+def encode_snapshot(tick, base_tick, score, base, current):
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT, tick, base_tick, score)]
+    for name, _ in SECTIONS:
+        removed, updated = diff_records(base[name], current[name])
+        parts.append(SECTION_HEADER.pack(len(removed), len(updated)))
+        parts.append(removed.astype('<u4').tobytes())
+        parts.append(updated.tobytes())
+    return b''.join(parts)
+
+
+def decode_snapshot(payload):
+    """(tick, base_tick, score, {section: (removed uids, updated records)})"""
+    _, tick, base_tick, score = SNAPSHOT_HEADER.unpack_from(payload)
+    offset = SNAPSHOT_HEADER.size
+    deltas = {}
+    for name, dtype in SECTIONS:
+        removed_count, updated_count = SECTION_HEADER.unpack_from(payload, offset)
+        offset += SECTION_HEADER.size
+        removed = np.frombuffer(payload, '<u4', removed_count, offset)
+        offset += removed_count * 4
+        updated = np.frombuffer(payload, dtype, updated_count, offset)
+        offset += updated_count * dtype.itemsize
+        deltas[name] = (removed, updated)
+    return tick, base_tick, score, deltas
+
+
+class ServerGame(FPSGame):
+    """Headless FPSGame shared by any number of networked players.
+    
+    Players join and leave at any time, enemies chase whichever player is
+    closest, and dead players respawn at the start point. The enemy limit
+    grows with the number of players.
+    """
+    def __init__(self, map_path=None, seed=None, sim_rate=REFERENCE_RATE, enemies_per_player=5):
+        super().__init__(headless=True, sim_rate=sim_rate, map_path=map_path, seed=seed)
+        self.start_point = (self.player.x, self.player.y)
+        self.players = []
+        self.last_shot = {}
+        self.deaths = {}
+        self.enemies.clear()
+        self.enemies_per_player = enemies_per_player
+        self.max_enemies = 0
+    
+    def add_player(self, character='soldier'):
+        player = Player(*self.start_point, character)
+        self.players.append(player)
+        self.player = self.players[0]
+        self.last_shot[player] = 0
+        self.deaths[player] = 0
+        self.max_enemies = self.enemies_per_player * len(self.players)
+        return player
+    
+    def remove_player(self, player):
+        self.players.remove(player)
+        del self.last_shot[player]
+        del self.deaths[player]
+        if self.players:
+            self.player = self.players[0]
+        self.max_enemies = self.enemies_per_player * len(self.players)
+    
+    def respawn(self, player):
+        player.x, player.y = self.start_point
+        player.health = player.max_health
+        player.ammo = 30
+        self.deaths[player] += 1
+    
+    def apply_input(self, player, inputs):
+        player.prev_x = player.x
+        player.prev_y = player.y
+        player.move(inputs, self.map_data, self.tick_scale)
+        player.rotate(inputs.mouse_dx)
+        if inputs.fire and player.ammo > 0 and self.ticks - self.last_shot[player] > self.fire_interval:
+            player.shoot()
+            self.shots_fired += 1
+            damage = player.stats[player.character]['damage']
+            self.bullets.spawn(player.x, player.y, player.angle, 'player', damage)
+            self.last_shot[player] = self.ticks
+        if inputs.reload and player.ammo < 30:
+            player.ammo = 30
+    
+    def update_enemies(self):
+        enemies = self.enemies
+        enemies.remove_dead()
+        n = enemies.count
+        
+        # Each enemy seeks its nearest player
+        player_x = np.array([player.x for player in self.players])
+        player_y = np.array([player.y for player in self.players])
+        dx = enemies.x[:n, None] - player_x
+        dy = enemies.y[:n, None] - player_y
+        nearest = np.argmin(dx * dx + dy * dy, axis=1)
+        target_x = player_x[nearest]
+        target_y = player_y[nearest]
+        enemies.update(target_x, target_y, None, self.wall_grid, TILE_SIZE)
+        
+        # Each shoots at that player if it has a line of sight
+        shooters = enemies.choose_shooters(
+            self.enemy_rng, chance=self.enemy_shot_chance,
+            can_see=lambda i: self.line_of_sight.can_see(enemies.x[i], enemies.y[i], target_x[i], target_y[i]))
+        self.bullets.spawn_many(enemies.x[shooters], enemies.y[shooters], enemies.angle[shooters], 'enemy')
+    
+    def update_spawning(self):
+        # One enemy per player every spawn delay, up to the limit
+        room = self.max_enemies - self.enemies.alive_count()
+        if room > 0:
+            self.enemy_spawn_timer += 1
+            if self.enemy_spawn_timer >= self.enemy_spawn_delay:
+                self.spawn_wave(min(room, len(self.players)))
+                self.enemy_spawn_timer = 0
+        else:
+            self.enemy_spawn_timer = 0
+            
+    def step(self, commands):
+        """Advance one tick with {player: InputFrame} for this tick"""
+        if self.players:
+            idle = InputFrame()
+            for player in self.players:
+                self.apply_input(player, commands.get(player, idle))
+            self.enemies.save_previous()
+            self.bullets.save_previous()
+            self.update_enemies()
+            self.update_spawning()
+            self.bullets.update()
+            self.check_bullet_collisions()
+            for player in self.players:
+                if player.health <= 0:
+                    self.respawn(player)
+        self.ticks += 1
+        return True
+
+
+class ClientConnection:
+    """Server-side state of one connected client"""
+    def __init__(self, client_id, player, writer):
+        self.id = client_id
+        self.player = player
+        self.writer = writer
+        self.held = InputFrame()
+        self.pending_turn = 0
+        self.acked = NO_BASE
+        self.history = {}
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.snapshots_skipped = 0
+    
+    def receive_input(self, acked, flags, mouse_dx):
+        # A client that lost its base asks for a full snapshot; acks of
+        # snapshots we no longer keep cannot serve as a base
+        if acked == NO_BASE:
+            self.acked = NO_BASE
+        elif acked in self.history and acked > self.acked:
+            self.acked = acked
+            for tick in [tick for tick in self.history if tick < acked]:
+                del self.history[tick]
+        self.held = unpack_input(flags, 0)
+        self.pending_turn += mouse_dx
+    
+    def take_input(self):
+        """Input for the next tick: held buttons plus all turning since the last tick"""
+        inputs = self.held
+        inputs.mouse_dx = self.pending_turn
+        self.pending_turn = 0
+        return inputs
+    
+    def send_snapshot(self, tick, score, current):
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.snapshots_skipped += 1
+            return
+        base = self.history.get(self.acked)
+        if base is None:
+            self.acked = NO_BASE
+            base = empty_state()
+        payload = encode_snapshot(tick, self.acked, score, base, current)
+        if len(payload) > MAX_SERVER_MESSAGE:
+            self.snapshots_skipped += 1
+            logger.warning("skipped a %d byte snapshot for client %d", len(payload), self.id)
+            return
+        write_message(self.writer, payload)
+        self.bytes_sent += FRAME.size + len(payload)
+        self.snapshots_sent += 1
+        self.history[tick] = current
+        if len(self.history) > SNAPSHOT_HISTORY:
+            del self.history[min(self.history)]
+
+
+class GameServer:
+    """Authoritative server running a ServerGame at a fixed tick over TCP.
+    
+    Clients send their input every tick along with the newest snapshot
+    they have. Every snapshot_interval ticks each client gets the players,
+    enemies and bullets within its interest area (half width and half
+    height around the player), encoded as a delta against the last
+    snapshot it acknowledged.
+    """
+    def __init__(self, game, host='127.0.0.1', port=0, snapshot_interval=2, interest=INTEREST):
+        self.game = game
+        self.host = host
+        self.port = port
+        self.snapshot_interval = snapshot_interval
+        self.interest = interest
+        self.clients = {}
+        self.next_client_id = 1
+        self.server = None
+        self.task = None
+        self.running = False
+        self.tick_times = deque(maxlen=600)
+        self.snapshot_times = deque(maxlen=600)
+        self.late_ticks = 0
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.running = True
+        self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        self.running = False
+        if self.task:
+            await self.task
+        self.server.close()
+        for client in list(self.clients.values()):
+            client.writer.close()
+        await self.server.wait_closed()
+    
+    async def handle_client(self, reader, writer):
+        client = None
+        try:
+            payload = await read_message(reader, MAX_CLIENT_MESSAGE)
+            if len(payload) != HELLO_MESSAGE.size:
+                raise ProtocolError(f"hello of {len(payload)} bytes")
+            kind, character = HELLO_MESSAGE.unpack(payload)
+            character = character.rstrip(b'\0').decode()
+            if kind != HELLO or character not in CHARACTER_STATS:
+                return
+            game = self.game
+            client = ClientConnection(self.next_client_id, game.add_player(character), writer)
+            self.next_client_id += 1
+            self.clients[client.id] = client
+            write_message(writer, WELCOME_MESSAGE.pack(WELCOME, client.id, game.sim_rate, self.snapshot_interval,
+                                                       game.map_data.pixel_width, game.map_data.pixel_height))
+            while True:
+                payload = await read_message(reader, MAX_CLIENT_MESSAGE)
+                if payload[0] == INPUT:
+                    if len(payload) != INPUT_MESSAGE.size:
+                        raise ProtocolError(f"input of {len(payload)} bytes")
+                    _, acked, flags, mouse_dx = INPUT_MESSAGE.unpack(payload)
+                    client.receive_input(acked, flags, mouse_dx)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ProtocolError, UnicodeDecodeError) as exc:
+            logger.warning("dropping client %s: %s", writer.get_extra_info('peername'), exc)
+        finally:
+            if client is not None:
+                del self.clients[client.id]
+                self.game.remove_player(client.player)
+            writer.close()
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.game.sim_rate
+        next_tick = loop.time()
+        while self.running:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                # Past the catch-up limit the backlog is dropped
+                if delay < -interval * MAX_CATCH_UP_TICKS:
+                    next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+    
+    def tick(self):
+        game = self.game
+        start = time.perf_counter()
+        game.step({client.player: client.take_input() for client in self.clients.values()})
+        self.tick_times.append(time.perf_counter() - start)
+        if game.ticks % self.snapshot_interval == 0 and self.clients:
+            start = time.perf_counter()
+            self.broadcast()
+            self.snapshot_times.append(time.perf_counter() - start)
+    
+    def world(self):
+        """Quantized records of every entity, sorted by uid, plus their positions"""
+        game = self.game
+        clients = sorted(self.clients.values(), key=lambda client: client.id)
+        players = np.zeros(len(clients), PLAYER_RECORD)
+        player_x = np.array([client.player.x for client in clients])
+        player_y = np.array([client.player.y for client in clients])
+        players['uid'] = [client.id for client in clients]
+        players['x'] = quantize_position(player_x)
+        players['y'] = quantize_position(player_y)
+        players['angle'] = quantize_angle([client.player.angle for client in clients])
+        players['health'] = [client.player.health for client in clients]
+        players['ammo'] = [client.player.ammo for client in clients]
+        world = {'players': (players, player_x, player_y)}
+        
+        for name, pool, dtype in (('enemies', game.enemies, ENEMY_RECORD), ('bullets', game.bullets, BULLET_RECORD)):
+            n = pool.count
+            order = np.argsort(pool.uid[:n], kind='stable')
+            x = pool.x[:n][order]
+            y = pool.y[:n][order]
+            records = np.zeros(n, dtype)
+            records['uid'] = pool.uid[:n][order]
+            records['x'] = quantize_position(x)
+            records['y'] = quantize_position(y)
+            if name == 'enemies':
+                records['angle'] = quantize_angle(pool.angle[:n][order])
+                records['health'] = pool.health[:n][order]
+            else:
+                records['owner'] = pool.owner[:n][order]
+            world[name] = (records, x, y)
+        return world
+    
+    def broadcast(self):
+        world = self.world()
+        half_width, half_height = self.interest
+        score = self.game.score
+        tick = self.game.ticks
+        for client in self.clients.values():
+            px = client.player.x
+            py = client.player.y
+            current = {}
+            for name, (records, x, y) in world.items():
+                near = (np.abs(x - px) <= half_width) & (np.abs(y - py) <= half_height)
+                current[name] = records[near]
+            client.send_snapshot(tick, score, current)
+    
+    def stats(self):
+        tick_ms = np.array(self.tick_times) * 1000
+        snapshot_ms = np.array(self.snapshot_times) * 1000
+        return {
+            'clients': len(self.clients),
+            'tick_ms_mean': float(tick_ms.mean()) if len(tick_ms) else 0.0,
+            'tick_ms_p95': float(np.percentile(tick_ms, 95)) if len(tick_ms) else 0.0,
+            'tick_ms_max': float(tick_ms.max()) if len(tick_ms) else 0.0,
+            'snapshot_ms_mean': float(snapshot_ms.mean()) if len(snapshot_ms) else 0.0,
+            'snapshot_ms_p95': float(np.percentile(snapshot_ms, 95)) if len(snapshot_ms) else 0.0,
+            'late_ticks': self.late_ticks,
+        }
+    
+    def reset_stats(self):
+        self.tick_times.clear()
+        self.snapshot_times.clear()
+        self.late_ticks = 0
+        for client in self.clients.values():
+            client.bytes_sent = 0
+            client.snapshots_sent = 0
+            client.snapshots_skipped = 0
+
+
+class GameClient:
+    """Minimal client: sends inputs and rebuilds the world from snapshot deltas"""
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.id = None
+        self.sim_rate = None
+        self.world_size = None
+        self.states = {}
+        self.acked = NO_BASE
+        self.state = empty_state()
+        self.score = 0
+        self.snapshots = 0
+        self.bytes_received = 0
+        self.missing_bases = 0
+    
+    async def connect(self, host, port, character='soldier'):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        write_message(self.writer, HELLO_MESSAGE.pack(HELLO, character.encode()))
+        payload = await read_message(self.reader)
+        _, self.id, self.sim_rate, self.snapshot_interval, width, height = WELCOME_MESSAGE.unpack(payload)
+        self.world_size = (width, height)
+    
+    def send_input(self, inputs):
+        flags, mouse_dx = pack_input(inputs)
+        mouse_dx = max(-32768, min(32767, int(mouse_dx)))
+        write_message(self.writer, INPUT_MESSAGE.pack(INPUT, self.acked, flags, mouse_dx))
+    
+    def handle_snapshot(self, payload):
+        tick, base_tick, score, deltas = decode_snapshot(payload)
+        if base_tick == NO_BASE:
+            base = empty_state()
+        else:
+            base = self.states.get(base_tick)
+            if base is None:
+                # Ask for a full snapshot by acknowledging nothing
+                self.missing_bases += 1
+                self.acked = NO_BASE
+                return
+        state = {name: apply_delta(base[name], *deltas[name]) for name, _ in SECTIONS}
+        self.states[tick] = state
+        for old in [old for old in self.states if old < base_tick]:
+            del self.states[old]
+        self.state = state
+        self.acked = tick
+        self.score = score
+        self.snapshots += 1
+    
+    async def receive(self):
+        """Apply snapshots until the server disconnects"""
+        try:
+            while True:
+                payload = await read_message(self.reader)
+                self.bytes_received += FRAME.size + len(payload)
+                if payload[0] == SNAPSHOT:
+                    self.handle_snapshot(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ProtocolError as exc:
+            logger.warning("server sent a bad message: %s", exc)
+    
+    def player(self):
+        """This client's own record from the latest snapshot, or None"""
+        players = self.state['players']
+        mine = players[players['uid'] == self.id]
+        return mine[0] if len(mine) else None
+    
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(host, port, map_path=None, seed=None, snapshot_interval=2):
+    game = ServerGame(map_path=map_path, seed=seed)
+    server = GameServer(game, host, port, snapshot_interval)
+    await server.start()
+    print(f"Serving on {host}:{server.port} at {game.sim_rate} ticks/s")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            stats = server.stats()
+            print(f"{stats['clients']} clients, tick {stats['tick_ms_mean']:.2f} ms "
+                  f"(p95 {stats['tick_ms_p95']:.2f}), snapshots {stats['snapshot_ms_mean']:.2f} ms")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Authoritative multiplayer game server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--map', help="map file to serve")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--snapshot-interval', type=int, default=2, help="ticks between snapshots")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.map, args.seed, args.snapshot_interval))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+import numpy as np
+
+OPEN = 0
+
+
+class SpawnIndex:
+    """Open spawn tiles bucketed on a coarse grid.
+    
+    The valid tiles of the spawn regions are collected once from the map.
+    A query for tiles at least min_distance (and at most max_distance) from
+    a point first sorts whole buckets into inside, outside or straddling
+    the distance band, checks only the tiles of straddling buckets, and
+    then picks uniformly among the survivors, so there is no rejection
+    loop however crowded or large the map is.
+    
+    regions is 'edges' (tiles within edge_tiles of the map border), 'all',
+    a boolean (height, width) mask, or a list of (x0, y0, x1, y1) tile
+    rectangles, end exclusive.
+    """
+    def __init__(self, tile_map, regions='edges', edge_tiles=2, bucket_size=8):
+        self.tile_map = tile_map
+        self.tile_size = tile_map.tile_size
+        self.regions = regions
+        self.edge_tiles = edge_tiles
+        self.bucket_size = bucket_size
+        self.dirty = True
+        self.build()
+    
+    def region_mask(self):
+        height, width = self.tile_map.height, self.tile_map.width
+        regions = self.regions
+        if isinstance(regions, str):
+            if regions == 'all':
+                mask = np.ones((height, width), dtype=bool)
+            elif regions == 'edges':
+                d = self.edge_tiles
+                mask = np.zeros((height, width), dtype=bool)
+                mask[:d, :] = mask[-d:, :] = True
+                mask[:, :d] = mask[:, -d:] = True
+            else:
+                raise ValueError(f"unknown spawn region {regions!r}")
+        elif isinstance(regions, np.ndarray):
+            mask = regions.astype(bool)
+        else:
+            mask = np.zeros((height, width), dtype=bool)
+            for x0, y0, x1, y1 in regions:
+                mask[max(0, y0):y1, max(0, x0):x1] = True
+        return mask
+    
+    def build(self):
+        """Collect and bucket the open tiles of the spawn regions"""
+        open_tiles = self.tile_map.as_array() == OPEN
+        ys, xs = np.nonzero(self.region_mask() & open_tiles)
+        if len(xs) == 0:
+            # Regions that are all wall fall back to any open tile
+            ys, xs = np.nonzero(open_tiles)
+            if len(xs) == 0:
+                raise ValueError("map has no open tiles to spawn on")
+        
+        size = self.bucket_size
+        columns = -(-self.tile_map.width // size)
+        keys = (ys // size) * columns + xs // size
+        order = np.argsort(keys, kind='stable')
+        self.tile_x = xs[order]
+        self.tile_y = ys[order]
+        buckets, self.bucket_start, self.bucket_count = np.unique(keys[order], return_index=True,
+                                                                  return_counts=True)
+        
+        # Bucket bounds in world pixels
+        pixels = size * self.tile_size
+        self.bucket_left = (buckets % columns) * pixels
+        self.bucket_top = (buckets // columns) * pixels
+        self.bucket_right = self.bucket_left + pixels
+        self.bucket_bottom = self.bucket_top + pixels
+        self.dirty = False
+    
+    def tile_changed(self, x, y):
+        """Note a map edit; the index is rebuilt on the next query"""
+        self.dirty = True
+    
+    def __len__(self):
+        if self.dirty:
+            self.build()
+        return len(self.tile_x)
+    
+    def centers(self, indices):
+        half = self.tile_size / 2
+        return (self.tile_x[indices] * self.tile_size + half,
+                self.tile_y[indices] * self.tile_size + half)
+    
+    def candidates(self, x, y, min_distance, max_distance=None):
+        """Buckets wholly inside the distance band plus single tiles that are.
+        
+        Returns (starts, counts, tiles): the tile ranges of the fully valid
+        buckets and the indices of valid tiles from straddling buckets.
+        """
+        if self.dirty:
+            self.build()
+        gap_x = np.maximum(np.maximum(self.bucket_left - x, x - self.bucket_right), 0)
+        gap_y = np.maximum(np.maximum(self.bucket_top - y, y - self.bucket_bottom), 0)
+        near_sq = gap_x * gap_x + gap_y * gap_y
+        reach_x = np.maximum(np.abs(x - self.bucket_left), np.abs(x - self.bucket_right))
+        reach_y = np.maximum(np.abs(y - self.bucket_top), np.abs(y - self.bucket_bottom))
+        far_sq = reach_x * reach_x + reach_y * reach_y
+        
+        low = min_distance * min_distance
+        inside = near_sq >= low
+        outside = far_sq < low
+        if max_distance is not None:
+            high = max_distance * max_distance
+            inside &= far_sq <= high
+            outside |= near_sq > high
+        straddling = np.flatnonzero(~inside & ~outside)
+        
+        # Exact distance checks for the tiles of straddling buckets only
+        starts = self.bucket_start[straddling]
+        counts = self.bucket_count[straddling]
+        tiles = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        tile_x, tile_y = self.centers(tiles)
+        dist_sq = (tile_x - x) ** 2 + (tile_y - y) ** 2
+        valid = dist_sq >= low
+        if max_distance is not None:
+            valid &= dist_sq <= high
+        return self.bucket_start[inside], self.bucket_count[inside], tiles[valid]
+    
+    def sample(self, rng, x, y, min_distance, max_distance=None, count=1):
+        """Pixel centers (xs, ys) of count random valid spawn tiles.
+        
+        Tiles are drawn uniformly, with replacement, from those in the
+        distance band around (x, y). Without any, max_distance is dropped,
+        and if every tile is closer than min_distance the farthest is used.
+        rng is a random.Random, so spawns follow the game's seed.
+        """
+        starts, counts, tiles = self.candidates(x, y, min_distance, max_distance)
+        bucketed = int(counts.sum())
+        total = bucketed + len(tiles)
+        if total == 0:
+            if max_distance is not None:
+                return self.sample(rng, x, y, min_distance, None, count)
+            tile_x, tile_y = self.centers(slice(None))
+            farthest = np.argmax((tile_x - x) ** 2 + (tile_y - y) ** 2)
+            return self.centers(np.full(count, farthest))
+        
+        picks = np.array([rng.randrange(total) for _ in range(count)], dtype=np.int64)
+        ends = np.cumsum(counts)
+        in_bucket = picks < bucketed
+        bucket = np.searchsorted(ends, picks[in_bucket], 'right')
+        chosen = np.empty(count, dtype=np.int64)
+        chosen[in_bucket] = starts[bucket] + picks[in_bucket] - (ends[bucket] - counts[bucket])
+        chosen[~in_bucket] = tiles[picks[~in_bucket] - bucketed]
+        return self.centers(chosen)
+    
+    def choose(self, rng, x, y, min_distance, max_distance=None):
+        """One random valid spawn point as (x, y) pixels"""
+        xs, ys = self.sample(rng, x, y, min_distance, max_distance)
+        return float(xs[0]), float(ys[0])
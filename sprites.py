@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+import pygame
+
+# Transparent color of sprite surfaces; never used by an entity
+COLOR_KEY = (255, 0, 255)
+
+# Facing angles pre-rendered per rotating sprite
+DEFAULT_ANGLES = 64
+
+
+def _finish(surface):
+    """Crop a sprite to what was drawn on it and make it fast to blit.
+    
+    Returns the cropped surface and the offset of its top-left corner from
+    the sprite's center.
+    """
+    center = surface.get_width() // 2
+    bounds = surface.get_bounding_rect()
+    cropped = surface.subsurface(bounds).copy()
+    if pygame.display.get_surface() is not None:
+        cropped = cropped.convert()
+    cropped.set_colorkey(COLOR_KEY, pygame.RLEACCEL)
+    return cropped, bounds.x - center, bounds.y - center
+
+
+def _canvas(half):
+    surface = pygame.Surface((2 * half + 1, 2 * half + 1))
+    surface.fill(COLOR_KEY)
+    surface.set_colorkey(COLOR_KEY)
+    return surface
+
+
+class Sprite:
+    """A disc drawn once, for entities that don't face anywhere"""
+    def __init__(self, color, radius):
+        surface = _canvas(radius + 1)
+        center = radius + 1
+        pygame.draw.circle(surface, color, (center, center), radius)
+        self.surface, self.offset_x, self.offset_y = _finish(surface)
+    
+    def draw_many(self, screen, xs, ys, angles=None):
+        """Blit the sprite centered on every (x, y) in one blits() call.
+        
+        angles is accepted so a Sprite can stand in for a RotatedSprite;
+        a disc looks the same facing any way.
+        """
+        xs = (np.asarray(xs) + self.offset_x).astype(np.int32).tolist()
+        ys = (np.asarray(ys) + self.offset_y).astype(np.int32).tolist()
+        surface = self.surface
+        return screen.blits([(surface, position) for position in zip(xs, ys)])
+
+
+class RotatedSprite:
+    """A disc with a barrel line, pre-rendered at evenly spaced angles.
+    
+    Each frame is drawn with the same draw calls an entity would use at
+    that exact angle, then cropped, so drawing an entity is an angle
+    lookup and a blit.
+    """
+    def __init__(self, color, radius, barrel=30, barrel_width=3, angles=DEFAULT_ANGLES):
+        self.angles = angles
+        half = max(radius, barrel) + barrel_width
+        frames = []
+        for i in range(angles):
+            angle = 2 * math.pi * i / angles
+            surface = _canvas(half)
+            pygame.draw.circle(surface, color, (half, half), radius)
+            pygame.draw.line(surface, color, (half, half),
+                             (half + math.cos(angle) * barrel, half + math.sin(angle) * barrel), barrel_width)
+            frames.append(_finish(surface))
+        self.frames = [frame[0] for frame in frames]
+        self.offset_x = np.array([frame[1] for frame in frames])
+        self.offset_y = np.array([frame[2] for frame in frames])
+    
+    def frame_indices(self, angles):
+        return np.rint(np.asarray(angles) * (self.angles / (2 * math.pi))).astype(np.int64) % self.angles
+    
+    def draw_many(self, screen, xs, ys, angles):
+        """Blit one frame per entity, chosen by its angle, in one blits() call"""
+        index = self.frame_indices(angles)
+        xs = (np.asarray(xs) + self.offset_x[index]).astype(np.int32).tolist()
+        ys = (np.asarray(ys) + self.offset_y[index]).astype(np.int32).tolist()
+        frames = self.frames
+        return screen.blits([(frames[i], position) for i, position in zip(index.tolist(), zip(xs, ys))])
+
+
+class SpriteCache:
+    """Sprites built on first request and shared by everything that draws them"""
+    def __init__(self, angles=DEFAULT_ANGLES):
+        self.angles = angles
+        self.sprites = {}
+    
+    def disc(self, color, radius):
+        key = ('disc', tuple(color), radius)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = Sprite(color, radius)
+        return sprite
+    
+    def rotated(self, color, radius, barrel=30, barrel_width=3):
+        key = ('rotated', tuple(color), radius, barrel, barrel_width)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = RotatedSprite(color, radius, barrel, barrel_width, self.angles)
+        return sprite
+    
+    def __len__(self):
+        return len(self.sprites)
@@ -0,0 +1,250 @@
+import csv
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Workers only simulate, so pygame never needs a real display or sound
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+
+from enemies import ENEMY_COOLDOWN, ENEMY_SPEED
+from fps_game import CHARACTER_STATS, REFERENCE_RATE, FPSGame, InputFrame
+
+# Parameters varied by a sweep, then the measured results, in column order
+PARAMETERS = ('character', 'enemy_speed', 'enemy_cooldown', 'max_enemies', 'seed')
+RESULTS = ('ticks', 'survival_seconds', 'died', 'score', 'kills', 'shots_fired',
+           'shots_hit', 'accuracy', 'damage_dealt', 'damage_taken')
+COLUMNS = PARAMETERS + RESULTS
+
+COLUMN_TYPES = {
+    'character': str,
+    'enemy_speed': float,
+    'enemy_cooldown': int,
+    'max_enemies': int,
+    'seed': int,
+    'ticks': int,
+    'survival_seconds': float,
+    'died': int,
+    'score': int,
+    'kills': int,
+    'shots_fired': int,
+    'shots_hit': int,
+    'accuracy': float,
+    'damage_dealt': int,
+    'damage_taken': int,
+}
+
+
+class BotPlayer:
+    """Scripted player that turns toward the nearest enemy and shoots.
+    
+    It keeps its distance by backing off from enemies that get close,
+    closes in on distant ones and strafes in between, reloading whenever
+    it runs dry. Decisions only depend on the game state, so a seeded game
+    plays out the same way every time.
+    """
+    def __init__(self, aim_tolerance=0.15, near=150, far=350, strafe_ticks=90, max_turn=200):
+        self.aim_tolerance = aim_tolerance
+        self.near = near
+        self.far = far
+        self.strafe_ticks = strafe_ticks
+        self.max_turn = max_turn
+    
+    def inputs(self, game):
+        player = game.player
+        enemies = game.enemies
+        n = enemies.count
+        alive = np.flatnonzero(enemies.health[:n] > 0)
+        if len(alive) == 0:
+            return InputFrame(reload=player.ammo < 30)
+        
+        dx = enemies.x[alive] - player.x
+        dy = enemies.y[alive] - player.y
+        nearest = int(np.argmin(dx * dx + dy * dy))
+        target_dx = float(dx[nearest])
+        target_dy = float(dy[nearest])
+        dist = math.hypot(target_dx, target_dy)
+        
+        # Turn toward the target by the shortest way round
+        turn = (math.atan2(target_dy, target_dx) - player.angle + math.pi) % (2 * math.pi) - math.pi
+        mouse_dx = int(max(-self.max_turn, min(self.max_turn, round(turn / player.sensitivity))))
+        on_target = abs(turn) < self.aim_tolerance
+        
+        strafe_left = (game.ticks // self.strafe_ticks) % 2 == 0
+        return InputFrame(
+            up=dist > self.far,
+            down=dist < self.near,
+            left=self.near <= dist <= self.far and strafe_left,
+            right=self.near <= dist <= self.far and not strafe_left,
+            mouse_dx=mouse_dx,
+            fire=on_target and player.ammo > 0,
+            reload=player.ammo == 0,
+        )
+
+
+def job_key(job):
+    return tuple(str(job[name]) for name in PARAMETERS)
+
+
+def make_jobs(characters, enemy_speeds, enemy_cooldowns, max_enemies, seeds, base_seed=0):
+    """One job per parameter combination and seed.
+    
+    Every combination runs the same seeds, so differences between
+    combinations are not down to luck of the draw.
+    """
+    jobs = []
+    for character, speed, cooldown, limit in itertools.product(characters, enemy_speeds,
+                                                               enemy_cooldowns, max_enemies):
+        for seed in range(base_seed, base_seed + seeds):
+            jobs.append({'character': character, 'enemy_speed': speed, 'enemy_cooldown': cooldown,
+                         'max_enemies': limit, 'seed': seed})
+    return jobs
+
+
+def run_job(job, max_ticks):
+    """Play one headless game with the bot and return its result row"""
+    game = FPSGame(job['character'], headless=True, seed=job['seed'])
+    game.enemies.speed = job['enemy_speed'] * game.tick_scale
+    game.enemies.cooldown = game.to_ticks(job['enemy_cooldown'])
+    game.max_enemies = job['max_enemies']
+    
+    bot = BotPlayer()
+    while game.ticks < max_ticks and game.step(bot.inputs(game)):
+        pass
+    
+    row = dict(job)
+    row.update({
+        'ticks': game.ticks,
+        'survival_seconds': game.ticks / game.sim_rate,
+        'died': int(game.player.health <= 0),
+        'score': game.score,
+        'kills': game.kills,
+        'shots_fired': game.shots_fired,
+        'shots_hit': game.shots_hit,
+        'accuracy': game.shots_hit / game.shots_fired if game.shots_fired else 0.0,
+        'damage_dealt': game.damage_dealt,
+        'damage_taken': game.damage_taken,
+    })
+    return row
+
+
+def read_completed(path):
+    """Keys of the jobs already in a results file.
+    
+    A row cut short by an interrupted write is dropped from the file so
+    the sweep can append after it.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            f.truncate(end)
+    with open(path, newline='') as f:
+        return {job_key(row) for row in csv.DictReader(f)}
+
+
+def load_results(path):
+    """Read a results file into {column: NumPy array}"""
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    columns = {}
+    for name in COLUMNS:
+        kind = COLUMN_TYPES[name]
+        values = [kind(row[name]) for row in rows]
+        columns[name] = np.array(values, dtype=object if kind is str else kind)
+    return columns
+
+
+def summarize(columns, by=PARAMETERS[:-1]):
+    """Mean results per parameter combination, averaged over seeds"""
+    keys = list(zip(*(columns[name].tolist() for name in by)))
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    summary = []
+    for key, rows in sorted(groups.items()):
+        rows = np.array(rows)
+        entry = dict(zip(by, key))
+        entry['runs'] = len(rows)
+        for name in ('survival_seconds', 'died', 'score', 'kills', 'accuracy', 'damage_dealt', 'damage_taken'):
+            entry[name] = float(columns[name][rows].mean())
+        summary.append(entry)
+    return summary
+
+
+def run_sweep(jobs, path, max_ticks, workers=None, progress=True):
+    """Run the jobs not yet in path on a process pool, appending each result as it arrives"""
+    completed = read_completed(path)
+    pending = [job for job in jobs if job_key(job) not in completed]
+    if progress:
+        print(f"{len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+    if not pending:
+        return 0
+    
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    start = time.perf_counter()
+    done = 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        if new_file:
+            writer.writeheader()
+            f.flush()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [executor.submit(run_job, job, max_ticks) for job in pending]
+            try:
+                for future in as_completed(futures):
+                    writer.writerow(future.result())
+                    f.flush()
+                    done += 1
+                    if progress and (done % 10 == 0 or done == len(pending)):
+                        rate = done / (time.perf_counter() - start)
+                        print(f"  {done}/{len(pending)} jobs ({rate:.1f}/s)", flush=True)
+            except KeyboardInterrupt:
+                # Finished rows are already on disk; the next run resumes
+                for future in futures:
+                    future.cancel()
+                raise
+    return done
+
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Sweep game balance parameters over headless bot games")
+    parser.add_argument('output', help="results CSV; existing rows are kept and their jobs skipped")
+    parser.add_argument('--characters', nargs='+', default=list(CHARACTER_STATS),
+                        choices=list(CHARACTER_STATS))
+    parser.add_argument('--enemy-speed', type=float, nargs='+', default=[ENEMY_SPEED])
+    parser.add_argument('--enemy-cooldown', type=int, nargs='+', default=[ENEMY_COOLDOWN],
+                        help="frames at 60 FPS between enemy shots")
+    parser.add_argument('--max-enemies', type=int, nargs='+', default=[10])
+    parser.add_argument('--seeds', type=int, default=20, help="games per parameter combination")
+    parser.add_argument('--base-seed', type=int, default=0)
+    parser.add_argument('--max-seconds', type=float, default=180, help="simulated time limit per game")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args(argv)
+    
+    jobs = make_jobs(args.characters, args.enemy_speed, args.enemy_cooldown, args.max_enemies,
+                     args.seeds, args.base_seed)
+    try:
+        run_sweep(jobs, args.output, int(args.max_seconds * REFERENCE_RATE), args.workers)
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume {args.output}")
+        return 130
+    
+    for entry in summarize(load_results(args.output)):
+        params = ' '.join(f"{name}={entry[name]}" for name in PARAMETERS[:-1])
+        print(f"{params}  runs {entry['runs']}  survived {entry['survival_seconds']:.1f}s  "
+              f"died {entry['died']:.0%}  score {entry['score']:.0f}  accuracy {entry['accuracy']:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
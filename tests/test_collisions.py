@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from bullets import OWNER_PLAYER
+from fps_game import TILE_SIZE, FPSGame
+
+
+def crowded_game(seed, enemies, bullets, spread):
+    """A game with enemies and bullets packed into one area of the map"""
+    rng = np.random.default_rng(seed)
+    game = FPSGame('soldier', headless=True, seed=seed)
+    game.enemies.clear()
+    game.bullets.clear()
+    
+    # Enemies may overlap each other and sit across tile borders, and have
+    # mixed health so some bullets kill and some only wound
+    center = game.map_data.pixel_width / 2, game.map_data.pixel_height / 2
+    game.enemies.spawn_many(rng.uniform(-spread, spread, enemies) + center[0],
+                            rng.uniform(-spread, spread, enemies) + center[1])
+    for i in range(enemies):
+        game.enemies.set_health(i, int(rng.integers(-10, 120)))
+    for owner in ('player', 'enemy'):
+        count = bullets if owner == 'player' else bullets // 10
+        game.bullets.spawn_many(rng.uniform(-spread, spread, count) + center[0],
+                                rng.uniform(-spread, spread, count) + center[1],
+                                rng.uniform(0, 2 * np.pi, count), owner)
+    game.bullets.damage[:game.bullets.count] = np.where(
+        game.bullets.owner[:game.bullets.count] == OWNER_PLAYER,
+        rng.integers(5, 80, game.bullets.count), game.bullets.damage[:game.bullets.count])
+    return game
+
+
+def naive_collisions(game):
+    """Reference: every bullet in index order against every enemy in index order"""
+    bullets = game.bullets
+    enemies = game.enemies
+    n = bullets.count
+    dead = bullets.dead_mask(game.wall_grid, game.map_data.pixel_width, game.map_data.pixel_height, TILE_SIZE)
+    for i in range(n):
+        if dead[i]:
+            continue
+        x, y, damage = float(bullets.x[i]), float(bullets.y[i]), int(bullets.damage[i])
+        if bullets.owner[i] != OWNER_PLAYER:
+            for player in game.players:
+                if (x - player.x) ** 2 + (y - player.y) ** 2 < player.width * player.width:
+                    player.health -= damage
+                    game.damage_taken += damage
+                    dead[i] = True
+                    break
+            continue
+        for j in range(enemies.count):
+            health = int(enemies.health[j])
+            if health > 0 and (x - enemies.x[j]) ** 2 + (y - enemies.y[j]) ** 2 < enemies.width * enemies.width:
+                game.shots_hit += 1
+                game.damage_dealt += min(damage, health)
+                if enemies.damage(j, damage):
+                    game.score += 100
+                    game.kills += 1
+                dead[i] = True
+                break
+    bullets.keep(~dead)
+
+
+def outcome(game):
+    bullets = game.bullets
+    n = bullets.count
+    return (game.score, game.kills, game.shots_hit, game.damage_dealt, game.damage_taken,
+            game.player.health, game.enemies.alive, game.enemies.health[:game.enemies.count].tolist(),
+            bullets.x[:n].tolist(), bullets.y[:n].tolist())
+
+
+@pytest.mark.parametrize('seed', range(12))
+@pytest.mark.parametrize('enemies, bullets, spread', [
+    (30, 400, 400),       # sparse: few bullets reach an enemy
+    (150, 2000, 150),     # dense: many bullets per enemy, lots of kills
+    (5, 300, 40),         # a tight cluster fought over by every bullet
+])
+def test_matches_a_naive_loop(seed, enemies, bullets, spread):
+    expected = crowded_game(seed, enemies, bullets, spread)
+    naive_collisions(expected)
+    game = crowded_game(seed, enemies, bullets, spread)
+    game.check_bullet_collisions()
+    assert outcome(game) == outcome(expected)
+    assert game.kills > 0 or spread == 400
+
+
+def test_no_living_enemies():
+    game = crowded_game(0, 20, 200, 100)
+    game.enemies.health[:game.enemies.count] = 0
+    game.enemies.alive = 0
+    expected = crowded_game(0, 20, 200, 100)
+    expected.enemies.health[:expected.enemies.count] = 0
+    expected.enemies.alive = 0
+    naive_collisions(expected)
+    game.check_bullet_collisions()
+    assert outcome(game) == outcome(expected)
+    assert game.shots_hit == 0
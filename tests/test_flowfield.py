@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pytest
+
+from flowfield import FlowField, build_field
+from tilemap import OPEN, WALL, TileMap
+
+
+def assert_matches_fresh_build(field):
+    walls, width, height, goal, origin = field.snapshot(*field.goal)
+    assert (width, height, origin) == (field.width, field.height, field.origin)
+    assert bytes(field.walls) == walls
+    assert field.dist == build_field(walls, width, height, goal)
+    
+    fresh = FlowField(field.tile_map, field.max_radius)
+    fresh.compute(*field.goal)
+    assert np.array_equal(field.next_x, fresh.next_x)
+    assert np.array_equal(field.next_y, fresh.next_y)
+    assert np.array_equal(field.reachable, fresh.reachable)
+
+
+def edit(field, x, y, value):
+    field.tile_map.set(x, y, value)
+    field.tile_changed(x, y)
+
+
+@pytest.mark.parametrize('max_radius', [None, 6])
+@pytest.mark.parametrize('seed', range(4))
+def test_random_edits_match_a_rebuild(seed, max_radius):
+    rng = random.Random(seed)
+    tile_map = TileMap.generate(24, 18, seed=seed, density=0.2)
+    goal = tile_map.nearest_open(12, 9)
+    field = FlowField(tile_map, max_radius)
+    field.compute(*goal)
+    for _ in range(60):
+        x = rng.randrange(1, tile_map.width - 1)
+        y = rng.randrange(1, tile_map.height - 1)
+        if (x, y) == goal:
+            continue
+        edit(field, x, y, OPEN if tile_map.is_wall(x, y) else WALL)
+        assert_matches_fresh_build(field)
+
+
+def test_sealing_and_opening_a_room():
+    tile_map = TileMap.from_text('''
+        ##########
+        #........#
+        #........#
+        #...##...#
+        #........#
+        ##########
+    '''.replace(' ', ''))
+    field = FlowField(tile_map)
+    field.compute(1, 1)
+    
+    # A wall across the middle cuts the right half off, then a gap reopens it
+    for y in range(1, 5):
+        edit(field, 5, y, WALL)
+        assert_matches_fresh_build(field)
+    assert not field.reachable[1, 7]
+    edit(field, 5, 2, OPEN)
+    assert_matches_fresh_build(field)
+    assert field.reachable[1, 7]
+
+
+def test_walling_in_the_goal():
+    tile_map = TileMap.generate(12, 12, seed=7, density=0.0)
+    field = FlowField(tile_map)
+    field.compute(5, 5)
+    edit(field, 5, 5, WALL)
+    assert_matches_fresh_build(field)
+    assert not field.reachable.any()
+    edit(field, 5, 5, OPEN)
+    assert_matches_fresh_build(field)
+    assert field.reachable.sum() == 10 * 10
+
+
+def test_edits_outside_the_window_are_ignored():
+    tile_map = TileMap.generate(40, 40, seed=3, density=0.0)
+    field = FlowField(tile_map, max_radius=5)
+    field.compute(10, 10)
+    dist = list(field.dist)
+    edit(field, 30, 30, WALL)
+    assert field.dist == dist
+    assert_matches_fresh_build(field)
@@ -0,0 +1,50 @@
+from fps_game import FPSGame
+from governor import FrameGovernor, LoadLevel
+from replay import Recorder
+
+
+def make_levels(helps):
+    """Levels named after their index that record each switch in calls"""
+    calls = []
+    levels = [LoadLevel(str(i), '', lambda on, i=i: calls.append((i, on)), effective)
+              for i, effective in enumerate(helps)]
+    return levels, calls
+
+
+def test_sheds_and_restores_in_order():
+    levels, calls = make_levels([None, None, None])
+    governor = FrameGovernor(levels, 10, window=2, hold_frames=0)
+    for _ in range(6):
+        governor.record(20)
+    assert governor.active == ['0', '1', '2']
+    for _ in range(6):
+        governor.record(1)
+    assert governor.level == 0
+    assert calls == [(0, True), (1, True), (2, True), (2, False), (1, False), (0, False)]
+
+
+def test_levels_without_effect_are_passed_over():
+    first_person = [False]
+    levels, calls = make_levels([None, lambda: first_person[0], None])
+    governor = FrameGovernor(levels, 10, window=2, hold_frames=0)
+    for _ in range(4):
+        governor.record(20)
+    # Two steps reached the third level, switching the second on the way
+    assert governor.level == 3
+    assert [decision['passed'] for decision in governor.decisions] == [[], ['1']]
+    
+    for _ in range(4):
+        governor.record(1)
+    assert governor.level == 0
+    assert calls[-3:] == [(2, False), (1, False), (0, False)]
+
+
+def test_recorded_games_pass_over_spawn_throttling():
+    game = FPSGame('soldier', seed=2)
+    game.recorder = Recorder.for_game(game)
+    governor = FrameGovernor(game.load_levels(), 10, window=2)
+    governor.record(20)
+    governor.record(20)
+    assert governor.active == ['spawns', 'hud']
+    assert governor.decisions[-1]['passed'] == ['spawns']
+    assert game.spawn_throttle == 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from line_of_sight import LineOfSight, trace_lines
+from scheduling import InlineExecutor
+from tilemap import OPEN, WALL, TileMap
+
+
+def random_points(rng, tile_map, count):
+    """Pixel positions anywhere inside random open tiles"""
+    ys, xs = np.nonzero(tile_map.as_array() == OPEN)
+    pick = rng.integers(0, len(xs), count)
+    size = tile_map.tile_size
+    return xs[pick] * size + rng.uniform(0, size, count), ys[pick] * size + rng.uniform(0, size, count)
+
+
+def traced(walls, xs, ys, target_x, target_y, size):
+    """can_see worked out directly: trace each line from its lower-index tile"""
+    ax, ay = (np.floor_divide(v, size).astype(np.int64) for v in (xs, ys))
+    bx, by = (np.floor_divide(v, size).astype(np.int64) for v in (target_x, target_y))
+    width = walls.shape[1]
+    swap = ay * width + ax > by * width + bx
+    return trace_lines(walls, np.where(swap, bx, ax), np.where(swap, by, ay),
+                       np.where(swap, ax, bx), np.where(swap, ay, by))
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('width, height', [(16, 12), (60, 50)])
+def test_can_see_matches_trace_lines(seed, width, height):
+    rng = np.random.default_rng(seed)
+    tile_map = TileMap.generate(width, height, seed=seed, density=0.25)
+    sight = LineOfSight(tile_map)
+    # The small map is answered from the table, the large one by tracing
+    assert sight.precomputed == (width * height <= 16 * 12)
+    xs, ys = random_points(rng, tile_map, 3000)
+    target_x, target_y = random_points(rng, tile_map, 3000)
+    expected = traced(sight.walls, xs, ys, target_x, target_y, tile_map.tile_size)
+    assert expected.any() and not expected.all()
+    assert np.array_equal(sight.can_see(xs, ys, target_x, target_y), expected)
+    # Visibility is symmetric, whichever end asks
+    assert np.array_equal(sight.can_see(target_x, target_y, xs, ys), expected)
+
+
+@pytest.mark.parametrize('executor', [None, InlineExecutor()])
+def test_map_edits_change_what_is_seen(executor):
+    tile_map = TileMap.from_text('''
+        ##########
+        #........#
+        #........#
+        #........#
+        ##########
+    '''.replace(' ', ''))
+    sight = LineOfSight(tile_map)
+    sight.executor = executor
+    size = tile_map.tile_size
+    assert sight.can_see([1.5 * size], [2.5 * size], 8.5 * size, 2.5 * size)[0]
+    for y in range(1, 4):
+        tile_map.set(5, y, WALL)
+        sight.tile_changed(5, y)
+    assert not sight.can_see([1.5 * size], [2.5 * size], 8.5 * size, 2.5 * size)[0]
+    tile_map.set(5, 2, OPEN)
+    sight.tile_changed(5, 2)
+    assert sight.can_see([1.5 * size], [2.5 * size], 8.5 * size, 2.5 * size)[0]
+
+
+def test_points_off_the_map_see_nothing():
+    tile_map = TileMap.generate(10, 10, seed=1, density=0.0)
+    sight = LineOfSight(tile_map)
+    size = tile_map.tile_size
+    seen = sight.can_see([-5.0, 3 * size, 3 * size], [3 * size, 3 * size, 20 * size], 4 * size, 4 * size)
+    assert seen.tolist() == [False, True, False]
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from fps_game import FPSGame, InputFrame
+from replay import Recorder, Replay
+
+
+def record(tmp_path, seed, sim_rate=60, ticks=900):
+    """Play random input with a recorder attached; returns the game and the replay file"""
+    rng = random.Random(seed)
+    game = FPSGame('tank', headless=True, sim_rate=sim_rate, seed=seed)
+    game.recorder = Recorder.for_game(game, checkpoint_interval=30)
+    inputs = InputFrame()
+    for tick in range(ticks):
+        if tick % 10 == 0:
+            # Mouse turns beyond the format's range are clamped when recorded
+            inputs = InputFrame(up=rng.random() < 0.6, down=rng.random() < 0.1, left=rng.random() < 0.3,
+                                right=rng.random() < 0.3, mouse_dx=rng.choice((-40000, -12, 0, 9, 50000)),
+                                fire=rng.random() < 0.7, reload=rng.random() < 0.05)
+        game.step(InputFrame(inputs.up, inputs.down, inputs.left, inputs.right, inputs.mouse_dx,
+                             inputs.fire, inputs.reload))
+    path = tmp_path / 'session.rep'
+    game.recorder.save(path)
+    return game, path
+
+
+@pytest.mark.parametrize('seed, sim_rate', [(1, 60), (2, 60), (3, 30), (4, 120)])
+def test_replay_reproduces_the_recording(tmp_path, seed, sim_rate):
+    game, path = record(tmp_path, seed, sim_rate)
+    replay = Replay.load(path)
+    assert len(replay.checkpoints) == 900 // 30
+    played, mismatches = replay.play()
+    assert mismatches == []
+    assert played.ticks == game.ticks
+    assert played.state_hash() == game.state_hash()
+    assert played.shots_fired == game.shots_fired > 0
+
+
+def test_changed_input_is_caught(tmp_path):
+    _, path = record(tmp_path, 5)
+    replay = Replay.load(path)
+    flags, mouse_dx = replay.inputs[100]
+    replay.inputs[100] = (flags, mouse_dx + 1)
+    _, mismatches = replay.play()
+    assert len(mismatches) == 1
+    assert mismatches[0][0] == 120
@@ -0,0 +1,78 @@
+import pytest
+
+from fps_game import FPSGame, InputFrame
+from savestate import load_state, read_state, restore_game, save_state, write_state
+
+
+def play(game, ticks):
+    """Run a fixed, busy input pattern: strafe, turn and fire"""
+    for tick in range(ticks):
+        game.step(InputFrame(up=tick % 40 < 20, left=tick % 60 < 15, mouse_dx=7 if tick % 30 < 10 else -3,
+                             fire=tick % 3 == 0, reload=tick % 200 == 199))
+
+
+@pytest.fixture
+def game():
+    game = FPSGame('soldier', headless=True, seed=1234)
+    play(game, 240)
+    return game
+
+
+def test_load_restores_state_hash(game):
+    data = save_state(game)
+    saved = game.state_hash()
+    play(game, 120)
+    assert game.state_hash() != saved
+    load_state(game, data)
+    assert game.state_hash() == saved
+
+
+def test_restored_game_plays_on_identically(game):
+    restored = restore_game(save_state(game))
+    assert restored.state_hash() == game.state_hash()
+    play(game, 300)
+    play(restored, 300)
+    assert restored.state_hash() == game.state_hash()
+
+
+def test_file_round_trip(game, tmp_path):
+    path = tmp_path / 'quick.sav'
+    write_state(game, path)
+    saved = game.state_hash()
+    play(game, 60)
+    read_state(game, path)
+    assert game.state_hash() == saved
+    play(game, 60)
+    read_state(game, path, use_mmap=False)
+    assert game.state_hash() == saved
+
+
+def test_map_edits_are_saved(game):
+    game.set_tile(3, 3, 1)
+    restored = restore_game(save_state(game))
+    assert restored.map_data.is_wall(3, 3)
+    assert restored.state_hash() == game.state_hash()
+
+
+def round_trips(game, tmp_path):
+    """Whether restoring game by every route reproduces its state hash"""
+    data = save_state(game)
+    path = tmp_path / 'state.sav'
+    write_state(game, path)
+    expected = game.state_hash()
+    return [restore_game(data).state_hash() == expected,
+            load_state(FPSGame('soldier', headless=True, seed=1), data).state_hash() == expected,
+            read_state(FPSGame('soldier', headless=True, seed=1), path).state_hash() == expected]
+
+
+def test_round_trip_before_the_player_moves(tmp_path):
+    game = FPSGame('soldier', headless=True, seed=1234)
+    assert round_trips(game, tmp_path) == [True, True, True]
+
+
+def test_round_trip_after_only_firing_and_turning(tmp_path):
+    game = FPSGame('soldier', headless=True, seed=1234)
+    for tick in range(500):
+        game.step(InputFrame(mouse_dx=4, fire=tick % 3 == 0))
+    assert (game.player.x, game.player.y) == (game.player.prev_x, game.player.prev_y)
+    assert round_trips(game, tmp_path) == [True, True, True]
@@ -0,0 +1,176 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from fps_game import InputFrame
+from replay import pack_input
+from server import (BULLET_RECORD, ENEMY_RECORD, FRAME, INTEREST, MAX_CLIENT_MESSAGE, NO_BASE, SECTIONS,
+                    ClientConnection, GameClient, GameServer, ProtocolError, ServerGame, apply_delta,
+                    decode_snapshot, empty_state, encode_snapshot, read_message)
+
+
+class Link:
+    """Stands in for a client's StreamWriter, keeping what was sent"""
+    def __init__(self):
+        self.transport = self
+        self.sent = []
+    
+    def get_write_buffer_size(self):
+        return 0
+    
+    def write(self, data):
+        self.sent.append(data[FRAME.size:])
+    
+    def take(self):
+        sent, self.sent = self.sent, []
+        return sent
+
+
+def connect(server, character='soldier'):
+    connection = ClientConnection(server.next_client_id, server.game.add_player(character), Link())
+    server.clients[connection.id] = connection
+    server.next_client_id += 1
+    return connection
+
+
+def assert_same_state(state, expected):
+    for name, _ in SECTIONS:
+        assert np.array_equal(state[name], expected[name]), name
+
+
+@pytest.fixture
+def server():
+    return GameServer(ServerGame(seed=99), snapshot_interval=2)
+
+
+def play(server, connection, client, ticks, deliver=lambda index: True):
+    """Tick the server with a moving, firing player; returns the snapshots sent"""
+    sent = []
+    for tick in range(ticks):
+        flags, mouse_dx = pack_input(InputFrame(up=tick % 50 < 25, fire=tick % 4 == 0, mouse_dx=5))
+        connection.receive_input(client.acked, flags, mouse_dx)
+        server.tick()
+        for payload in connection.writer.take():
+            sent.append(payload)
+            if deliver(len(sent) - 1):
+                client.handle_snapshot(payload)
+                if client.acked != NO_BASE:
+                    assert_same_state(client.state, connection.history[client.acked])
+    return sent
+
+
+def base_ticks(sent):
+    return [decode_snapshot(payload)[1] for payload in sent]
+
+
+def test_deltas_rebuild_every_snapshot(server):
+    connection = connect(server)
+    client = GameClient()
+    sent = play(server, connection, client, 300)
+    bases = base_ticks(sent)
+    assert bases[0] == NO_BASE
+    assert all(base != NO_BASE for base in bases[1:])
+    assert client.snapshots == len(sent)
+
+
+def test_lost_snapshots_use_the_last_acked_base(server):
+    connection = connect(server)
+    client = GameClient()
+    sent = play(server, connection, client, 300, deliver=lambda index: index % 3 != 1)
+    assert client.missing_bases == 0
+    assert client.acked == decode_snapshot(sent[-1])[0]
+
+
+def test_missing_base_gets_a_full_snapshot(server):
+    connection = connect(server)
+    client = GameClient()
+    play(server, connection, client, 40)
+    
+    # The client forgets every base, so the next delta can't be applied
+    client.states.clear()
+    sent = play(server, connection, client, 2)
+    assert client.missing_bases == 1
+    assert client.acked == NO_BASE
+    
+    sent = play(server, connection, client, 2)
+    assert base_ticks(sent) == [NO_BASE]
+    assert client.acked == decode_snapshot(sent[0])[0]
+    sent = play(server, connection, client, 20)
+    assert NO_BASE not in base_ticks(sent)
+
+
+def test_snapshots_only_hold_entities_near_the_player(server):
+    connection = connect(server)
+    player = connection.player
+    enemies = server.game.enemies
+    half_width, half_height = INTEREST
+    near = enemies.spawn(player.x + half_width - 10, player.y)
+    off_screen = enemies.spawn(player.x + half_width + 100, player.y)
+    below = enemies.spawn(player.x, player.y + half_height + 100)
+    server.broadcast()
+    
+    _, _, _, deltas = decode_snapshot(connection.writer.take()[0])
+    uids = set(deltas['enemies'][1]['uid'].tolist())
+    assert int(enemies.uid[near]) in uids
+    assert int(enemies.uid[off_screen]) not in uids
+    assert int(enemies.uid[below]) not in uids
+
+
+def test_delta_with_removed_and_changed_records():
+    base = np.zeros(5, ENEMY_RECORD)
+    base['uid'] = [2, 3, 5, 8, 13]
+    base['health'] = 100
+    current = np.zeros(4, ENEMY_RECORD)
+    current['uid'] = [3, 5, 13, 21]
+    current['health'] = [100, 40, 100, 100]
+    bases = empty_state()
+    bases['enemies'] = base
+    state = empty_state()
+    state['enemies'] = current
+    
+    payload = encode_snapshot(7, 5, 0, bases, state)
+    tick, base_tick, _, deltas = decode_snapshot(payload)
+    assert (tick, base_tick) == (7, 5)
+    removed, updated = deltas['enemies']
+    assert sorted(removed) == [2, 8]
+    assert sorted(updated['uid']) == [5, 21]
+    assert np.array_equal(apply_delta(base, removed, updated), current)
+    
+    # A full snapshot is a delta against nothing
+    payload = encode_snapshot(7, NO_BASE, 0, empty_state(), state)
+    _, base_tick, _, deltas = decode_snapshot(payload)
+    assert base_tick == NO_BASE
+    assert np.array_equal(apply_delta(empty_state()['enemies'], *deltas['enemies']), current)
+
+
+def test_sections_over_65535_records():
+    base = np.zeros(70000, BULLET_RECORD)
+    base['uid'] = np.arange(70000)
+    current = np.zeros(80000, BULLET_RECORD)
+    current['uid'] = np.arange(70000, 150000)
+    bases = empty_state()
+    bases['bullets'] = base
+    state = empty_state()
+    state['bullets'] = current
+    
+    _, _, _, deltas = decode_snapshot(encode_snapshot(2, 1, 0, bases, state))
+    removed, updated = deltas['bullets']
+    assert len(removed) == 70000
+    assert np.array_equal(apply_delta(base, removed, updated), current)
+
+
+@pytest.mark.parametrize('data', [
+    FRAME.pack(0),
+    FRAME.pack(MAX_CLIENT_MESSAGE + 1) + bytes(MAX_CLIENT_MESSAGE + 1),
+    FRAME.pack(0xFFFFFFFF),
+])
+def test_read_message_rejects_bad_sizes(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_message(reader, MAX_CLIENT_MESSAGE)
+    
+    with pytest.raises(ProtocolError):
+        asyncio.run(read())
@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from spawning import SpawnIndex
+from tilemap import OPEN, WALL, TileMap
+
+
+def band_tiles(index, x, y, min_distance, max_distance):
+    """Every spawn tile in the distance band, found by checking them all"""
+    tile_x, tile_y = index.centers(slice(None))
+    dist_sq = (tile_x - x) ** 2 + (tile_y - y) ** 2
+    valid = (dist_sq >= min_distance ** 2) & (dist_sq <= max_distance ** 2)
+    return set(zip(tile_x[valid].tolist(), tile_y[valid].tolist()))
+
+
+@pytest.mark.parametrize('regions', ['edges', 'all', [(5, 5, 20, 12)]])
+@pytest.mark.parametrize('seed', range(3))
+def test_samples_come_from_the_distance_band(regions, seed):
+    tile_map = TileMap.generate(48, 36, seed=seed, density=0.2, tile_size=32)
+    index = SpawnIndex(tile_map, regions, bucket_size=4)
+    rng = random.Random(seed)
+    # The band cuts through every region, so some buckets straddle it
+    x, y = 24 * 32 + rng.uniform(-40, 40), 18 * 32 + rng.uniform(-40, 40)
+    expected = band_tiles(index, x, y, 250, 600)
+    assert expected
+    
+    starts, counts, tiles = index.candidates(x, y, 250, 600)
+    assert len(tiles) and len(starts)
+    assert int(counts.sum()) + len(tiles) == len(expected)
+    xs, ys = index.sample(rng, x, y, 250, 600, count=5000)
+    assert set(zip(xs.tolist(), ys.tolist())) == expected
+
+
+def test_spawn_tiles_are_open_and_inside_the_regions():
+    tile_map = TileMap.generate(30, 30, seed=4, density=0.3, tile_size=32)
+    index = SpawnIndex(tile_map, 'edges', edge_tiles=3)
+    walls = tile_map.as_array()
+    assert (walls[index.tile_y, index.tile_x] == OPEN).all()
+    edge = np.minimum(np.minimum(index.tile_x, 29 - index.tile_x), np.minimum(index.tile_y, 29 - index.tile_y))
+    assert (edge < 3).all()
+
+
+def test_fallbacks_when_the_band_is_empty():
+    tile_map = TileMap.generate(20, 20, seed=1, density=0.0, tile_size=32)
+    index = SpawnIndex(tile_map, 'all')
+    rng = random.Random(1)
+    # Nothing that far away: the farthest tile is used
+    xs, ys = index.sample(rng, 16, 16, 10000, count=3)
+    assert set(zip(xs.tolist(), ys.tolist())) == {(18.5 * 32, 18.5 * 32)}
+    # Nothing within the band: the upper bound is dropped
+    x, y = index.choose(rng, 16, 16, 500, 510)
+    assert (x - 16) ** 2 + (y - 16) ** 2 >= 500 ** 2
+
+
+def test_edits_are_picked_up():
+    tile_map = TileMap.generate(20, 20, seed=2, density=0.0, tile_size=32)
+    index = SpawnIndex(tile_map, [(1, 1, 3, 3)])
+    assert len(index) == 4
+    tile_map.set(1, 1, WALL)
+    index.tile_changed(1, 1)
+    assert len(index) == 3
+    assert (1.5 * 32, 1.5 * 32) not in set(zip(*(v.tolist() for v in index.centers(slice(None)))))
+
+
+def test_a_map_without_open_tiles_is_rejected():
+    with pytest.raises(ValueError):
+        SpawnIndex(TileMap(4, 4, bytearray([WALL] * 16), 32))
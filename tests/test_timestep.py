@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from fps_game import MAX_CATCH_UP_TICKS, FPSGame, InputFrame, TILE_SIZE
+from tilemap import TileMap
+
+
+def open_game(sim_rate=60):
+    return FPSGame('soldier', headless=True, sim_rate=sim_rate, seed=3,
+                   tile_map=TileMap.generate(40, 40, seed=3, density=0.0, tile_size=TILE_SIZE))
+
+
+def test_ticks_follow_elapsed_time():
+    game = open_game()
+    tick_ms = 1000 / 60
+    assert game.simulate(InputFrame(), tick_ms * 0.5) == pytest.approx(0.5)
+    assert game.ticks == 0
+    assert game.simulate(InputFrame(), tick_ms * 2) == pytest.approx(0.5)
+    assert game.ticks == 2
+
+
+def test_backlog_past_the_catch_up_limit_is_dropped():
+    game = open_game()
+    assert game.simulate(InputFrame(), 1000) == 0.0
+    assert game.ticks == MAX_CATCH_UP_TICKS
+
+
+def test_mouse_turn_is_applied_once_per_frame():
+    game = open_game()
+    game.pending_turn = 100
+    game.simulate(InputFrame(), 1000 / 60 * 3.5)
+    assert game.ticks == 3
+    assert game.player.angle == pytest.approx(100 * game.player.sensitivity)
+
+
+@pytest.mark.parametrize('sim_rate', [30, 60, 120])
+def test_movement_speed_does_not_depend_on_the_tick_rate(sim_rate):
+    game = open_game(sim_rate)
+    start_x = game.player.x = game.player.y = 20 * TILE_SIZE
+    for _ in range(sim_rate // 2):
+        game.step(InputFrame(up=True))
+    assert game.player.x - start_x == pytest.approx(game.player.speed * 30)
+    assert math.isclose(game.player.y, 20 * TILE_SIZE)
+
+
+def test_interpolation_blends_the_last_two_ticks():
+    game = open_game()
+    game.player.x = game.player.y = 20 * TILE_SIZE
+    game.step(InputFrame(up=True))
+    player = game.player
+    x, _ = game.player_position(0.25)
+    assert x == pytest.approx(player.prev_x + (player.x - player.prev_x) * 0.25)
+    xs, ys = game.enemies.lerp(0.0)
+    assert xs.tolist() == game.enemies.prev_x[:game.enemies.count].tolist()
@@ -0,0 +1,175 @@
+import mmap
+import random
+import struct
+
+import numpy as np
+
+# Binary map files: header followed by width * height tile bytes, row major
+MAGIC = b'TMAP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')  # magic, version, reserved, width, height
+
+WALL = 1
+OPEN = 0
+
+
+class TileMap:
+    """Flat, row-major tile grid backed by a bytearray or memory map.
+    
+    Supports map_data[y][x] indexing and len() like the old list-of-lists
+    map, but bounds-checked lookups should go through is_wall(), which
+    treats everything outside the map as solid.
+    """
+    def __init__(self, width, height, tiles=None, tile_size=64):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        if tiles is None:
+            tiles = bytearray(width * height)
+        if len(tiles) < width * height:
+            raise ValueError(f"expected {width * height} tiles, got {len(tiles)}")
+        self.tiles = tiles
+        self.view = memoryview(tiles)
+        
+    @classmethod
+    def from_rows(cls, rows, tile_size=64):
+        height = len(rows)
+        width = len(rows[0])
+        tiles = bytearray(width * height)
+        for y, row in enumerate(rows):
+            if len(row) != width:
+                raise ValueError(f"row {y} has {len(row)} tiles, expected {width}")
+            tiles[y * width:(y + 1) * width] = bytes(row)
+        return cls(width, height, tiles, tile_size)
+        
+    @classmethod
+    def from_text(cls, text, tile_size=64):
+        """Parse a map drawn with '#' for walls and '.' for open tiles"""
+        lines = [line.rstrip('\n') for line in text.splitlines() if line.strip()]
+        return cls.from_rows([[WALL if char == '#' else OPEN for char in line] for line in lines], tile_size)
+        
+    @classmethod
+    def generate(cls, width, height, seed=None, density=0.08, tile_size=64):
+        """Random test map: a solid border and scattered wall segments"""
+        rng = random.Random(seed)
+        tile_map = cls(width, height, tile_size=tile_size)
+        for x in range(width):
+            tile_map.set(x, 0, WALL)
+            tile_map.set(x, height - 1, WALL)
+        for y in range(height):
+            tile_map.set(0, y, WALL)
+            tile_map.set(width - 1, y, WALL)
+        for _ in range(int(width * height * density / 4)):
+            x = rng.randrange(1, width - 1)
+            y = rng.randrange(1, height - 1)
+            dx, dy = rng.choice(((1, 0), (0, 1)))
+            for i in range(rng.randint(2, 6)):
+                if 0 < x + dx * i < width - 1 and 0 < y + dy * i < height - 1:
+                    tile_map.set(x + dx * i, y + dy * i, WALL)
+        return tile_map
+        
+    @classmethod
+    def load(cls, path, use_mmap=True, tile_size=64):
+        """Load a binary .tmap file, or a text map for any other extension.
+        
+        Binary maps are memory-mapped copy-on-write by default, so even very
+        large maps load instantly and edits never touch the file.
+        """
+        if not str(path).endswith('.tmap'):
+            with open(path) as f:
+                return cls.from_text(f.read(), tile_size)
+                
+        with open(path, 'rb') as f:
+            magic, version, _, width, height = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a tile map")
+            if version != VERSION:
+                raise ValueError(f"unsupported tile map version {version}")
+            if use_mmap:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                tiles = memoryview(mapped)[HEADER.size:HEADER.size + width * height]
+            else:
+                tiles = bytearray(f.read(width * height))
+        return cls(width, height, tiles, tile_size)
+        
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, self.width, self.height))
+            f.write(self.view[:self.width * self.height])
+            
+    def __len__(self):
+        return self.height
+        
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        return self.row(y)
+        
+    @property
+    def pixel_width(self):
+        return self.width * self.tile_size
+        
+    @property
+    def pixel_height(self):
+        return self.height * self.tile_size
+        
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+        
+    def is_wall(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.view[y * self.width + x] == WALL
+        return True
+        
+    def is_wall_at(self, px, py):
+        """Wall test for a point in world pixels"""
+        return self.is_wall(int(px // self.tile_size), int(py // self.tile_size))
+        
+    def set(self, x, y, value):
+        self.view[y * self.width + x] = value
+        
+    def row(self, y):
+        start = y * self.width
+        return self.view[start:start + self.width]
+        
+    def region(self, x0, y0, x1, y1):
+        """Rows of the half-open tile rectangle [x0, x1) x [y0, y1), clipped"""
+        x0 = max(0, x0)
+        y0 = max(0, y0)
+        x1 = min(self.width, x1)
+        y1 = min(self.height, y1)
+        return [self.view[y * self.width + x0:y * self.width + x1] for y in range(y0, y1)]
+        
+    def as_array(self):
+        """NumPy (height, width) view sharing memory with the map"""
+        return np.frombuffer(self.tiles, dtype=np.uint8, count=self.width * self.height).reshape(self.height, self.width)
+        
+    def nearest_open(self, x, y, max_radius=64):
+        """Closest open tile to (x, y), searching outward ring by ring"""
+        if not self.is_wall(x, y):
+            return x, y
+        for radius in range(1, max_radius + 1):
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    if max(abs(dx), abs(dy)) == radius and not self.is_wall(x + dx, y + dy):
+                        return x + dx, y + dy
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Create binary tile maps")
+    parser.add_argument('output', help="output .tmap file")
+    parser.add_argument('--from-text', help="convert a '#'/'.' text map")
+    parser.add_argument('--size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), default=(1000, 1000),
+                        help="size of a randomly generated map")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    
+    if args.from_text:
+        tile_map = TileMap.load(args.from_text)
+    else:
+        tile_map = TileMap.generate(*args.size, seed=args.seed)
+    tile_map.save(args.output)
+    print(f"Wrote {tile_map.width}x{tile_map.height} map to {args.output}")